@@ -8,8 +8,9 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app import db
 from models import Sample, Compound, Analysis, BatchJob
-from model import load_model
-from batch_processor import process_batch
+from model_serving import NoModelPublished, get_model_server
+from micro_batching import get_micro_batcher
+from job_queue import submit_batch_job, cancel_batch_job
 from monitoring import record_request_duration
 
 logger = logging.getLogger(__name__)
@@ -53,7 +54,7 @@ def health_check():
         'timestamp': datetime.utcnow().isoformat(),
         'components': {
             'database': db_status,
-            'model': 'loaded'  # Could check model availability here
+            'model': get_model_server().status()
         }
     })
 
@@ -77,6 +78,9 @@ def process_data():
             parameters:
               type: object
               description: Processing parameters
+            explain:
+              type: boolean
+              description: Include per-row feature attributions (SHAP values)
     responses:
       200:
         description: Processing results
@@ -91,6 +95,8 @@ def process_data():
               example: success
             results:
               type: object
+      503:
+        description: No model has been published for serving
     """
     data = request.json
     
@@ -101,9 +107,16 @@ def process_data():
         }), 400
     
     try:
-        # Load the model
-        model = load_model()
-        
+        # Use this worker's warm model; new published versions are swapped in without reloading per request
+        served = get_model_server().get_served()
+    except NoModelPublished as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 503
+    model = served.model
+    
+    try:
         # Create a new analysis record
         sample = Sample(
             name=data.get('sample_name', 'API Sample'),
@@ -124,9 +137,11 @@ def process_data():
         db.session.add(analysis)
         db.session.commit()
         
-        # Process the data with the model
+        # Process the data with the model, batched with concurrent requests into one predict call
         input_features = prepare_features(data['input_data'], data.get('parameters', {}))
-        prediction_results = model.predict(input_features)
+        prediction_results = get_micro_batcher().predict(
+            model, input_features, explain=bool(data.get('explain', False))
+        ).to_dict()
         
         # Extract compounds if present
         if 'compounds' in data:
@@ -151,6 +166,7 @@ def process_data():
         return jsonify({
             'status': 'success',
             'analysis_id': analysis.id,
+            'model_version': served.version,
             'results': prediction_results
         })
         
@@ -416,9 +432,16 @@ def create_batch_job():
               required: true
             parameters:
               type: object
+              description: Processing parameters, e.g. streaming, chunk_size or workers
+                (number of processes to score shards of the input on)
+            priority:
+              type: integer
+              description: Jobs with a higher priority are processed first
     responses:
-      201:
-        description: Batch job created
+      200:
+        description: An identical submission has completed; its results are returned
+      202:
+        description: Batch job queued, or an identical queued or running job is returned
       400:
         description: Invalid input
     """
@@ -430,57 +453,51 @@ def create_batch_job():
             'message': 'input_file is required for creating a batch job'
         }), 400
     
+    priority = data.get('priority', 0)
+    if isinstance(priority, str) and priority.strip().lstrip('-').isdigit():
+        priority = int(priority)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        return jsonify({
+            'status': 'error',
+            'message': 'priority must be an integer'
+        }), 400
+    
     try:
-        # Create a new batch job record
-        batch_job = BatchJob(
+        batch_job, cached = submit_batch_job(
             name=data.get('name', f'Batch Job {datetime.utcnow().isoformat()}'),
             description=data.get('description'),
             input_file=data['input_file'],
             parameters=data.get('parameters', {}),
-            status='queued'
+            priority=priority
         )
         
-        db.session.add(batch_job)
-        db.session.commit()
-        
-        # In a production environment, you would queue this job for async processing
-        # For now, we'll simulate this with simple processing
-        
-        # Start the batch job
-        batch_job.status = 'processing'
-        batch_job.start_time = datetime.utcnow()
-        db.session.commit()
+        if cached and batch_job.status == 'completed':
+            return jsonify({
+                'status': 'success',
+                'message': 'Identical batch job found; returning its results',
+                'batch_job_id': batch_job.id,
+                'job_status': batch_job.status,
+                'output_file': batch_job.output_file,
+                'cached': True
+            }), 200
         
-        # Process the batch
-        try:
-            result = process_batch(data['input_file'], batch_job.id, data.get('parameters', {}))
-            output_file = f"results/batch_{batch_job.id}_results.csv"
-            
-            # Save the results to a file
-            with open(output_file, 'w') as f:
-                f.write(result.to_csv())
-            
-            # Update the batch job record
-            batch_job.status = 'completed'
-            batch_job.end_time = datetime.utcnow()
-            batch_job.output_file = output_file
-            batch_job.total_records = len(result)
-            batch_job.processed_records = len(result)
-            db.session.commit()
-            
-        except Exception as e:
-            batch_job.status = 'failed'
-            batch_job.end_time = datetime.utcnow()
-            batch_job.error_message = str(e)
-            db.session.commit()
-            raise
+        if cached:
+            # An identical job is still queued or running; the submission shares it
+            return jsonify({
+                'status': 'success',
+                'message': f'Identical batch job already {batch_job.status}; returning that job',
+                'batch_job_id': batch_job.id,
+                'job_status': batch_job.status,
+                'cached': False,
+                'existing_job': True
+            }), 202
         
         return jsonify({
             'status': 'success',
-            'message': 'Batch job created and processed',
+            'message': 'Batch job queued for processing',
             'batch_job_id': batch_job.id,
-            'status': batch_job.status
-        }), 201
+            'job_status': batch_job.status
+        }), 202
     
     except Exception as e:
         db.session.rollback()
@@ -491,6 +508,58 @@ def create_batch_job():
         }), 500
 
 
+@api_bp.route('/batch/<int:job_id>/cancel', methods=['POST'])
+@record_request_duration
+def cancel_batch(job_id):
+    """
+    Cancel a batch processing job
+    ---
+    parameters:
+      - name: job_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Job cancelled or cancellation requested
+      404:
+        description: Batch job not found
+      409:
+        description: Batch job already finished
+    """
+    try:
+        job = BatchJob.query.get(job_id)
+        
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': f'Batch job with ID {job_id} not found'
+            }), 404
+        
+        if job.is_finished:
+            return jsonify({
+                'status': 'error',
+                'message': f'Batch job {job_id} already {job.status}'
+            }), 409
+        
+        job = cancel_batch_job(job_id)
+        
+        return jsonify({
+            'status': 'success',
+            'batch_job_id': job.id,
+            'job_status': job.status,
+            'cancel_requested': job.cancel_requested
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error cancelling batch job: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
 @api_bp.route('/batch/<int:job_id>', methods=['GET'])
 @record_request_duration
 def get_batch_job(job_id):
@@ -532,6 +601,12 @@ def get_batch_job(job_id):
                 'error_message': job.error_message,
                 'total_records': job.total_records,
                 'processed_records': job.processed_records,
+                'priority': job.priority,
+                'cancel_requested': job.cancel_requested,
+                'worker_id': job.worker_id,
+                'attempts': job.attempts,
+                'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+                'cache_key': job.cache_key,
                 'created_at': job.created_at.isoformat()
             }
         })
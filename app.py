@@ -94,7 +94,9 @@ def create_app(config_object=active_config):
     # Setup database tables
     with app.app_context():
         import models  # Import models to register them with SQLAlchemy
+        from schema_upgrades import upgrade_schema
         db.create_all()
+        upgrade_schema(db.engine)  # create_all never adds columns to existing tables
     
     # Add Prometheus metrics endpoint if enabled
     if config_object.ENABLE_METRICS:
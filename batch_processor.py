@@ -1,18 +1,208 @@
 import os
+import io
+import json
+import shutil
+import tempfile
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import logging
-from typing import Dict, Any, Union, Optional
+from typing import Dict, Any, List, Tuple, Union, Optional, Callable
 from datetime import datetime
 
-from model import load_model
+from model import MycolModel, PredictionResult, load_model
+from feature_encoding import CATEGORICAL_FEATURES, CategoricalEncoder
+from model_registry import get_model_registry
 
 logger = logging.getLogger(__name__)
 
+# Bioactivity weights used to derive the training target
+BIOACTIVITY_WEIGHTS = {
+    'Antitumor': 0.9,
+    'Hepatoprotective': 0.8, 
+    'Cardioprotective': 0.7,
+    'Neuroprotective': 0.8,
+    'Immunomodulatory': 0.6,
+    'Antioxidant': 0.5,
+    'Anti-inflammatory': 0.6
+}
+
+DEFAULT_PARAMETERS = {
+    'model_type': 'regressor',
+    'normalization': True,
+    'drop_na': True,
+    'feature_columns': None,  # If None, all numeric columns except target
+    'target_column': None,  # If None, prediction only mode
+    'output_prefix': 'pred_',
+    'interval_method': 'normal',  # Per-row regressor intervals: 'normal' or 'quantile'
+    'interval_confidence': 0.95,
+    'explain': False  # Add per-row feature attribution (SHAP) columns
+}
+
+# Rows per chunk in streaming mode
+DEFAULT_CHUNK_SIZE = 100000
+
+# Rows the model is fitted on in streaming and sharded modes, unless the job
+# sets 'training_rows'; independent of the chunk size so that changing how a
+# job is chunked never changes the model it is scored with
+DEFAULT_TRAINING_ROWS = 100000
+
+# Output formats that can be written incrementally, chunk by chunk
+STREAMING_FORMATS = ('csv', 'parquet', 'feather')
+
+# File extension for each output format
+RESULT_EXTENSIONS = {
+    'csv': 'csv',
+    'excel': 'xlsx',
+    'xlsx': 'xlsx',
+    'parquet': 'parquet',
+    'feather': 'feather'
+}
+
+# Default codecs for columnar output
+DEFAULT_COMPRESSION = {
+    'parquet': 'zstd',
+    'feather': 'lz4'
+}
+
+# Maximum rows per Parquet row group / Feather record batch
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+
+def _resolve_parameters(parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge user parameters over the defaults."""
+    params = dict(DEFAULT_PARAMETERS)
+    if parameters:
+        params.update(parameters)
+    return params
+
+
+def _attach_predictions(df: pd.DataFrame, predictions: PredictionResult, params: Dict[str, Any]) -> None:
+    """Add prediction columns to a results DataFrame in place."""
+    if params['model_type'] == 'regressor':
+        df[f"{params['output_prefix']}bioactivity"] = predictions.scores
+        df[f"{params['output_prefix']}ci_low"] = predictions.lower
+        df[f"{params['output_prefix']}ci_high"] = predictions.upper
+    else:
+        df[f"{params['output_prefix']}category"] = predictions.categories
+        df[f"{params['output_prefix']}probability"] = predictions.probabilities
+    if predictions.contributions is not None:
+        # One column per feature, named after the model feature
+        for j, name in enumerate(predictions.feature_names):
+            df[f"{params['output_prefix']}shap_{name}"] = predictions.contributions[:, j]
+        df[f"{params['output_prefix']}shap_base_value"] = predictions.base_values
+
+
+def _select_feature_columns(df: pd.DataFrame, params: Dict[str, Any]) -> List[str]:
+    """Determine the numeric feature columns used when no categorical features exist."""
+    if params['feature_columns']:
+        feature_cols = params['feature_columns']
+        # Validate columns exist
+        missing_cols = [col for col in feature_cols if col not in df.columns]
+        if missing_cols:
+            logger.warning(f"Missing columns in input file: {missing_cols}")
+            feature_cols = [col for col in feature_cols if col in df.columns]
+    else:
+        # Use all numeric columns except target as features
+        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        if params['target_column'] and params['target_column'] in numeric_cols:
+            numeric_cols.remove(params['target_column'])
+        feature_cols = numeric_cols
+    return feature_cols
+
+
+def _resolve_model(
+    params: Dict[str, Any],
+    X: Optional[pd.DataFrame],
+    y: Optional[pd.Series],
+    encoder: CategoricalEncoder = None
+) -> Tuple[str, MycolModel]:
+    """
+    Pick the model to score a batch with.
+    
+    An explicit ``model_key`` or ``predict_only`` selects an already registered
+    model without any training. Otherwise the latest registered model with the
+    batch's feature schema is reused; a model is only fitted on the batch when
+    ``retrain`` is set or no model with that schema has been registered yet.
+    
+    Args:
+        params: Resolved processing parameters
+        X: Training features (may be None in predict-only mode)
+        y: Training target (may be None in predict-only mode)
+        encoder: Categorical encoder that produced X, stored with the model
+        
+    Returns:
+        Tuple of (registry key, fitted model)
+    """
+    registry = get_model_registry()
+    
+    if params.get('model_key'):
+        model = registry.get(params['model_key'])
+        if model is None:
+            raise ValueError(f"Model {params['model_key']} is not registered")
+        return params['model_key'], model
+    
+    if params.get('predict_only'):
+        latest = registry.latest(params['model_type'])
+        if latest is None:
+            raise ValueError(f"No registered {params['model_type']} model available for predict-only mode")
+        return latest
+    
+    if y is None:
+        raise ValueError("Input has no target to train on; pass model_key or predict_only to use a registered model")
+    
+    return registry.get_or_fit(params['model_type'], X, y, retrain=bool(params.get('retrain')), encoder=encoder)
+
+
+def _bioactivity_target(df: pd.DataFrame) -> Optional[pd.Series]:
+    """Derive the training target from the Bioactivity column, if present."""
+    if 'Bioactivity' not in df.columns:
+        return None
+    return df['Bioactivity'].map(BIOACTIVITY_WEIGHTS).fillna(0.5)
+
+
+def _resolve_encoded_model(
+    params: Dict[str, Any],
+    df: pd.DataFrame,
+    encoder: CategoricalEncoder = None
+) -> Tuple[str, MycolModel, CategoricalEncoder]:
+    """
+    Resolve the model and categorical encoder for data with categorical columns.
+    
+    Registered models carry the encoder they were trained with, so predict-only
+    runs encode new files against the training vocabulary. When training, the
+    encoder is fitted on ``df`` unless an already fitted one is passed in.
+    
+    Args:
+        params: Resolved processing parameters
+        df: Training data (or the batch itself in predict-only mode)
+        encoder: Optional pre-fitted encoder (e.g. from a streaming scan)
+        
+    Returns:
+        Tuple of (registry key, fitted model, encoder matching the model)
+    """
+    if params.get('model_key') or params.get('predict_only'):
+        model_key, model = _resolve_model(params, None, None)
+        if model.encoder is None:
+            model.encoder = encoder or CategoricalEncoder().fit(df)
+        return model_key, model, model.encoder
+    
+    if encoder is None:
+        encoder = CategoricalEncoder().fit(df)
+    X_train = encoder.transform_frame(df)
+    model_key, model = _resolve_model(params, X_train, _bioactivity_target(df), encoder)
+    return model_key, model, encoder
+
+
 def process_batch(
     input_file: str, 
     job_id: int = None, 
-    parameters: Dict[str, Any] = None
+    parameters: Dict[str, Any] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None
 ) -> pd.DataFrame:
     """
     Process a batch of data from a CSV file.
@@ -21,25 +211,15 @@ def process_batch(
         input_file: Path to the input CSV file
         job_id: ID of the batch job (for tracking)
         parameters: Processing parameters
+        progress_callback: Optional callable receiving (processed_records, total_records);
+            it may raise to abort processing (e.g. when the job is cancelled)
         
     Returns:
         DataFrame with processed results
     """
     logger.info(f"Starting batch processing job {job_id} with file {input_file}")
     
-    # Default parameters
-    params = {
-        'model_type': 'regressor',
-        'normalization': True,
-        'drop_na': True,
-        'feature_columns': None,  # If None, all numeric columns except target
-        'target_column': None,  # If None, prediction only mode
-        'output_prefix': 'pred_'
-    }
-    
-    # Update with provided parameters
-    if parameters:
-        params.update(parameters)
+    params = _resolve_parameters(parameters)
     
     # Read input file
     try:
@@ -56,20 +236,11 @@ def process_batch(
         if len(df) < original_len:
             logger.info(f"Dropped {original_len - len(df)} rows with NA values")
     
+    if progress_callback:
+        progress_callback(0, len(df))
+    
     # Determine feature columns
-    if params['feature_columns']:
-        feature_cols = params['feature_columns']
-        # Validate columns exist
-        missing_cols = [col for col in feature_cols if col not in df.columns]
-        if missing_cols:
-            logger.warning(f"Missing columns in input file: {missing_cols}")
-            feature_cols = [col for col in feature_cols if col in df.columns]
-    else:
-        # Use all numeric columns except target as features
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        if params['target_column'] and params['target_column'] in numeric_cols:
-            numeric_cols.remove(params['target_column'])
-        feature_cols = numeric_cols
+    feature_cols = _select_feature_columns(df, params)
     
     # Extract features
     X = df[feature_cols]
@@ -79,100 +250,854 @@ def process_batch(
     if params['target_column'] and params['target_column'] in df.columns:
         y = df[params['target_column']]
     
-    # Load model and train on authentic bioactivity data
-    model = load_model(model_type=params['model_type'])
-    
-    # Train model on your authentic bioactivity dataset
-    logger.info(f"Training model on authentic bioactivity data with {len(df)} samples")
-    
-    # Create bioactivity features from your real data structure
-    feature_data = df.copy()
-    
-    # Encode categorical features from your authentic dataset
-    if 'Species' in feature_data.columns:
-        species_dummies = pd.get_dummies(feature_data['Species'], prefix='species')
-        feature_data = pd.concat([feature_data, species_dummies], axis=1)
-    
-    if 'Compound Class' in feature_data.columns:
-        class_dummies = pd.get_dummies(feature_data['Compound Class'], prefix='class')
-        feature_data = pd.concat([feature_data, class_dummies], axis=1)
-    
-    if 'Target Pathway' in feature_data.columns:
-        pathway_dummies = pd.get_dummies(feature_data['Target Pathway'], prefix='pathway')
-        feature_data = pd.concat([feature_data, pathway_dummies], axis=1)
-    
-    if 'Extraction Method' in feature_data.columns:
-        method_dummies = pd.get_dummies(feature_data['Extraction Method'], prefix='method')
-        feature_data = pd.concat([feature_data, method_dummies], axis=1)
-    
-    # Create bioactivity target from your real data
-    bioactivity_weights = {
-        'Antitumor': 0.9,
-        'Hepatoprotective': 0.8, 
-        'Cardioprotective': 0.7,
-        'Neuroprotective': 0.8,
-        'Immunomodulatory': 0.6,
-        'Antioxidant': 0.5,
-        'Anti-inflammatory': 0.6
-    }
-    
-    if 'Bioactivity' in feature_data.columns:
-        feature_data['bioactivity_target'] = feature_data['Bioactivity'].map(bioactivity_weights).fillna(0.5)
-    
-    # Select feature columns (encoded categorical variables)
-    feature_cols = [col for col in feature_data.columns if col.startswith(('species_', 'class_', 'pathway_', 'method_'))]
-    
-    if feature_cols:
-        X_train = feature_data[feature_cols].fillna(0)
-        y_train = feature_data['bioactivity_target']
-        
-        # Train model with authentic data
-        model.fit(X_train, y_train)
-        logger.info(f"Model trained on authentic bioactivity data with {len(feature_cols)} features")
+    model_key = None
+    if any(col in df.columns for col in CATEGORICAL_FEATURES):
+        # Encode categorical features in a single pass against a fixed vocabulary
+        model_key, model, encoder = _resolve_encoded_model(params, df)
+        X_encoded = encoder.transform_frame(df, feature_names=model.feature_names)
         
         # Make predictions using the trained model
-        logger.info(f"Making authentic bioactivity predictions on {len(X_train)} samples")
-        predictions = model.predict(X_train)
+        logger.info(f"Making authentic bioactivity predictions on {len(X_encoded)} samples with model {model_key}")
+        predictions = model.predict_arrays(
+            X_encoded, interval_method=params['interval_method'], confidence=params['interval_confidence'],
+            explain=params['explain']
+        )
     else:
         # Fallback if no categorical features available
         logger.warning("No categorical features found, using available numeric features")
-        if y is not None:
-            model.fit(X, y)
-        predictions = model.predict(X)
+        if y is not None or params.get('model_key') or params.get('predict_only'):
+            model_key, model = _resolve_model(params, X, y)
+        else:
+            model = load_model(model_type=params['model_type'])
+        predictions = model.predict_arrays(
+            X, interval_method=params['interval_method'], confidence=params['interval_confidence'],
+            explain=params['explain']
+        )
     
     # Add predictions to the dataframe
-    if params['model_type'] == 'regressor':
-        df[f"{params['output_prefix']}bioactivity"] = predictions['bioactivity_scores']
-        
-        # Add confidence intervals
-        ci_low = [ci[0] for ci in predictions['confidence_intervals']]
-        ci_high = [ci[1] for ci in predictions['confidence_intervals']]
-        df[f"{params['output_prefix']}ci_low"] = ci_low
-        df[f"{params['output_prefix']}ci_high"] = ci_high
-    else:
-        df[f"{params['output_prefix']}category"] = predictions['categories']
-        df[f"{params['output_prefix']}probability"] = predictions['probabilities']
+    _attach_predictions(df, predictions, params)
     
     # Add feature importance as a separate dataframe
     feature_importance = pd.DataFrame({
-        'feature': list(predictions['feature_importance'].keys()),
-        'importance': list(predictions['feature_importance'].values())
+        'feature': list(predictions.feature_importance.keys()),
+        'importance': list(predictions.feature_importance.values())
     }).sort_values('importance', ascending=False)
     
     # Add timestamp and job info
     df['processed_timestamp'] = datetime.utcnow().isoformat()
     if job_id:
         df['batch_job_id'] = job_id
+    df.attrs['model_key'] = model_key
     
     logger.info(f"Batch processing completed for job {job_id}")
     
+    if progress_callback:
+        progress_callback(len(df), len(df))
+    
     return df
 
 
+def _scan_input(
+    input_file: str,
+    encoder: CategoricalEncoder,
+    chunk_size: int
+) -> int:
+    """
+    Fit the encoder vocabulary and count records in one low-memory pass.
+    
+    Only the categorical columns are parsed, so this pass is much cheaper
+    than reading the full file.
+    
+    Args:
+        input_file: Path to the input CSV file
+        encoder: Encoder whose vocabulary is extended chunk by chunk
+        chunk_size: Rows per chunk
+        
+    Returns:
+        Total number of records in the file
+    """
+    header = pd.read_csv(input_file, nrows=0).columns
+    columns = [col for col in encoder.columns if col in header]
+    total_records = 0
+    
+    for chunk in pd.read_csv(input_file, usecols=columns or [0], chunksize=chunk_size):
+        total_records += len(chunk)
+        if columns:
+            encoder.partial_fit(chunk)
+    
+    return total_records
+
+
+def _prepare_chunk_model(
+    input_file: str,
+    params: Dict[str, Any],
+    chunk_size: int,
+    training_rows: int
+) -> Tuple[Optional[str], MycolModel, Optional[CategoricalEncoder], Optional[List[str]], int]:
+    """
+    Resolve one model and encoder for scoring a file chunk by chunk.
+    
+    Args:
+        input_file: Path to the input CSV file
+        params: Resolved processing parameters
+        chunk_size: Rows per chunk for the vocabulary scan
+        training_rows: Rows read from the start of the file to train on
+        
+    Returns:
+        Tuple of (registry key, model, encoder or None, numeric feature
+        columns or None, total number of records)
+    """
+    encoder = CategoricalEncoder()
+    total_records = _scan_input(input_file, encoder, chunk_size)
+    logger.info(f"Scanned {total_records} records from {input_file}")
+    
+    # Resolve a single model from a bounded training sample
+    sample = pd.read_csv(input_file, nrows=training_rows)
+    if params['drop_na']:
+        sample = sample.dropna()
+    
+    if encoder.is_fitted:
+        model_key, model, encoder = _resolve_encoded_model(params, sample, encoder)
+        return model_key, model, encoder, None, total_records
+    
+    logger.warning("No categorical features found, using available numeric features")
+    feature_cols = _select_feature_columns(sample, params)
+    target = params['target_column']
+    y_train = sample[target] if target and target in sample.columns else None
+    model_key = None
+    if y_train is not None or params.get('model_key') or params.get('predict_only'):
+        model_key, model = _resolve_model(params, sample[feature_cols], y_train)
+    else:
+        model = load_model(model_type=params['model_type'])
+    return model_key, model, None, feature_cols, total_records
+
+
+def _score_chunk(
+    chunk: pd.DataFrame,
+    model: MycolModel,
+    encoder: Optional[CategoricalEncoder],
+    feature_cols: Optional[List[str]],
+    params: Dict[str, Any],
+    timestamp: str,
+    job_id: int = None
+) -> pd.DataFrame:
+    """Score one chunk of input rows and return it with prediction columns added."""
+    if params['drop_na']:
+        chunk = chunk.dropna()
+    
+    if not len(chunk):
+        return chunk
+    
+    if feature_cols is None:
+        X = encoder.transform_frame(chunk, feature_names=model.feature_names)
+    else:
+        X = chunk[feature_cols]
+    predictions = model.predict_arrays(
+        X, interval_method=params['interval_method'], confidence=params['interval_confidence'],
+        explain=params['explain']
+    )
+    _attach_predictions(chunk, predictions, params)
+    
+    chunk['processed_timestamp'] = timestamp
+    if job_id:
+        chunk['batch_job_id'] = job_id
+    return chunk
+
+
+class BatchCheckpoint:
+    """
+    On-disk progress of a chunked batch run, used to resume it after a crash.
+    
+    A checkpoint directory holds the model as a memory-mappable artifact,
+    one part file per completed chunk or shard, and a ``manifest.json``
+    recording the input file identity, the model key and version, the chunk
+    offset reached and the part files written so far.
+    """
+    
+    MANIFEST_FILENAME = 'manifest.json'
+    MODEL_FILENAME = 'model'
+    
+    def __init__(self, directory: str):
+        """
+        Initialize the checkpoint.
+        
+        Args:
+            directory: Directory holding this run's checkpoint files
+        """
+        self.directory = directory
+    
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.directory, self.MODEL_FILENAME)
+    
+    def path(self, name: str) -> str:
+        """Absolute path of a file inside the checkpoint directory."""
+        return os.path.join(self.directory, name)
+    
+    @staticmethod
+    def _input_identity(input_file: str) -> Dict[str, Any]:
+        stat = os.stat(input_file)
+        return {'path': os.path.abspath(input_file), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Read the manifest, or None if there is no usable checkpoint."""
+        try:
+            with open(self.path(self.MANIFEST_FILENAME), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring corrupt checkpoint manifest in {self.directory}: {str(e)}")
+            return None
+    
+    def save(self, state: Dict[str, Any]) -> None:
+        """Atomically write the manifest."""
+        state['updated_at'] = datetime.utcnow().isoformat()
+        manifest_path = self.path(self.MANIFEST_FILENAME)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    
+    def clear(self) -> None:
+        """Delete the checkpoint directory."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def resume(self, input_file: str, **settings) -> Optional[Dict[str, Any]]:
+        """
+        Return the saved state if it belongs to this input and these settings.
+        
+        A checkpoint left by a different input file, a modified input file or
+        different settings is discarded.
+        
+        Args:
+            input_file: Path to the input file
+            **settings: Run settings that must match the checkpointed run
+            
+        Returns:
+            The checkpoint state, or None if the run must start from scratch
+        """
+        state = self.load()
+        if state is None:
+            return None
+        
+        matches = (
+            state.get('input') == self._input_identity(input_file)
+            and all(state.get(key) == value for key, value in settings.items())
+            and os.path.exists(self.model_path)
+        )
+        if not matches:
+            logger.info(f"Discarding stale checkpoint in {self.directory}")
+            self.clear()
+            return None
+        return state
+    
+    def start(self, input_file: str, model: MycolModel, model_key: Optional[str], **fields) -> Dict[str, Any]:
+        """
+        Start a fresh checkpoint: save the model and an initial manifest.
+        
+        Args:
+            input_file: Path to the input file
+            model: Model every chunk is scored with
+            model_key: Registry key of the model, if registered
+            **fields: Run settings and initial progress stored in the manifest
+            
+        Returns:
+            The initial checkpoint state
+        """
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        model.save(self.model_path)
+        
+        state = {
+            'input': self._input_identity(input_file),
+            'model_key': model_key,
+            'model_version': model.version,
+            'created_at': datetime.utcnow().isoformat(),
+            **fields
+        }
+        self.save(state)
+        return state
+
+
+def _checkpoint_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameters as they round-trip through the JSON manifest."""
+    return json.loads(json.dumps(params, sort_keys=True, default=str))
+
+
+def _part_format(format: str) -> str:
+    """Format of intermediate part files: CSV for CSV output, Arrow otherwise."""
+    return 'csv' if format == 'csv' else 'feather'
+
+
+def _write_part(part_file: str, part_format: str, chunk: pd.DataFrame) -> None:
+    """Write one scored chunk to an uncompressed part file."""
+    compression = 'none' if part_format == 'feather' else None
+    with ResultWriter(part_file, part_format, compression=compression) as writer:
+        writer.write(chunk)
+
+
+def process_batch_streaming(
+    input_file: str,
+    output_file: str,
+    job_id: int = None,
+    parameters: Dict[str, Any] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    format: str = 'csv',
+    checkpoint_dir: str = None
+) -> int:
+    """
+    Process a large CSV file chunk by chunk, appending results to an output file.
+    
+    The encoder vocabulary is collected in a first pass over the categorical
+    columns only. The model is fitted once on the first ``training_rows`` rows
+    (``DEFAULT_TRAINING_ROWS`` by default) and every chunk is then encoded
+    and scored with the same encoder and model, so peak memory is bounded by
+    the chunk size rather than the file size.
+    
+    With a checkpoint directory, every scored chunk is written to its own
+    part file and recorded in a manifest before the next chunk is read. A
+    run interrupted part way resumes from the last completed chunk with the
+    same model; the parts are merged into the output file at the end.
+    
+    Args:
+        input_file: Path to the input CSV file
+        output_file: Path of the file to write results to
+        job_id: ID of the batch job (for tracking)
+        parameters: Processing parameters (see process_batch). 'compression' and
+            'row_group_size' configure columnar output.
+        chunk_size: Number of rows read and scored at a time
+        progress_callback: Optional callable receiving (processed_records, total_records)
+            after every chunk
+        format: Output format ('csv', 'parquet' or 'feather')
+        checkpoint_dir: Directory for resumable per-chunk checkpoints
+        
+    Returns:
+        Number of result rows written
+    """
+    params = _resolve_parameters(parameters)
+    training_rows = params.get('training_rows') or DEFAULT_TRAINING_ROWS
+    logger.info(f"Starting streaming batch job {job_id} with file {input_file} (chunk size {chunk_size})")
+    
+    checkpoint = BatchCheckpoint(checkpoint_dir) if checkpoint_dir else None
+    settings = {
+        'mode': 'streaming',
+        'chunk_size': chunk_size,
+        'format': format,
+        'parameters': _checkpoint_parameters(params)
+    }
+    state = checkpoint.resume(input_file, **settings) if checkpoint else None
+    
+    if state:
+        model = MycolModel.load(checkpoint.model_path)
+        model_key, encoder, feature_cols = state['model_key'], model.encoder, state['feature_cols']
+        total_records, timestamp = state['total_records'], state['timestamp']
+        logger.info(f"Resuming streaming batch job {job_id} after {state['processed_records']} records")
+    else:
+        model_key, model, encoder, feature_cols, total_records = _prepare_chunk_model(
+            input_file, params, chunk_size, training_rows
+        )
+        timestamp = datetime.utcnow().isoformat()
+        if checkpoint:
+            model.encoder = encoder
+            state = checkpoint.start(
+                input_file, model, model_key,
+                feature_cols=feature_cols,
+                total_records=total_records,
+                timestamp=timestamp,
+                completed_chunks=0,
+                processed_records=0,
+                written_records=0,
+                parts=[],
+                **settings
+            )
+    logger.info(f"Scoring chunks with model {model_key}")
+    
+    if checkpoint is None:
+        if progress_callback:
+            progress_callback(0, total_records)
+        
+        processed_records = 0
+        with _open_result_writer(output_file, format, params) as writer:
+            for chunk in pd.read_csv(input_file, chunksize=chunk_size):
+                processed_records += len(chunk)
+                
+                chunk = _score_chunk(chunk, model, encoder, feature_cols, params, timestamp, job_id)
+                if len(chunk):
+                    writer.write(chunk)
+                
+                if progress_callback:
+                    progress_callback(processed_records, total_records)
+        written_records = writer.rows_written
+    else:
+        if progress_callback:
+            progress_callback(state['processed_records'], total_records)
+        
+        part_format = _part_format(format)
+        # Re-read with the same chunking and drop the completed chunks. Skipping physical lines
+        # instead would miscount records across blank lines or quoted fields with newlines.
+        chunks = pd.read_csv(input_file, chunksize=chunk_size)
+        
+        for chunk in itertools.islice(chunks, state['completed_chunks'], None):
+            read_records = len(chunk)
+            chunk = _score_chunk(chunk, model, encoder, feature_cols, params, timestamp, job_id)
+            
+            if len(chunk):
+                part_name = f"part_{state['completed_chunks']:06d}.{part_format}"
+                _write_part(checkpoint.path(part_name), part_format, chunk)
+                state['parts'].append(part_name)
+            state['completed_chunks'] += 1
+            state['processed_records'] += read_records
+            state['written_records'] += len(chunk)
+            checkpoint.save(state)
+            
+            if progress_callback:
+                progress_callback(state['processed_records'], total_records)
+        
+        _merge_part_files([checkpoint.path(name) for name in state['parts']], output_file, format, params)
+        written_records = state['written_records']
+        checkpoint.clear()
+    
+    logger.info(f"Streaming batch job {job_id} wrote {written_records} records to {output_file}")
+    return written_records
+
+
+def _open_result_writer(output_file: str, format: str, params: Dict[str, Any]) -> 'ResultWriter':
+    """Create a ResultWriter configured from batch parameters."""
+    return ResultWriter(
+        output_file,
+        format,
+        compression=params.get('compression'),
+        row_group_size=params.get('row_group_size') or DEFAULT_ROW_GROUP_SIZE
+    )
+
+
+class ResultWriter:
+    """
+    Incremental writer for batch results in CSV, Parquet or Feather format.
+    
+    Parquet files are written with per-column min/max statistics on every row
+    group, so readers can skip row groups and read only the columns they
+    need. Feather files are Arrow IPC files made of compressed record batches
+    that can be memory-mapped. The Arrow schema is fixed by the first chunk
+    and later chunks are cast to it.
+    """
+    
+    def __init__(
+        self,
+        output_file: str,
+        format: str = 'csv',
+        compression: Optional[str] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+    ):
+        """
+        Initialize the writer.
+        
+        Args:
+            output_file: Path of the file to write, replaced if it exists
+            format: Output format ('csv', 'parquet' or 'feather')
+            compression: Codec for columnar formats, e.g. 'zstd', 'lz4', 'snappy'
+                or 'none' (default: DEFAULT_COMPRESSION for the format)
+            row_group_size: Maximum rows per Parquet row group or Feather record batch
+        """
+        self.format = format.lower()
+        if self.format not in STREAMING_FORMATS:
+            raise ValueError(f"Unsupported streaming output format: {format}")
+        if self.format == 'csv' and compression not in (None, 'none'):
+            raise ValueError("Compression is only supported for parquet and feather output")
+        
+        self.output_file = output_file
+        self.compression = compression or DEFAULT_COMPRESSION.get(self.format)
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self.schema: Optional[pa.Schema] = None
+        self._handle = None
+        self._writer = None
+        
+        output_dir = os.path.dirname(output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+    
+    def _open_columnar(self, schema: pa.Schema) -> None:
+        self.schema = schema
+        if self.format == 'parquet':
+            self._writer = pq.ParquetWriter(
+                self.output_file,
+                schema,
+                compression=self.compression,
+                write_statistics=True
+            )
+        else:
+            self._handle = pa.OSFile(self.output_file, 'wb')
+            options = pa.ipc.IpcWriteOptions(
+                compression=None if self.compression == 'none' else self.compression
+            )
+            self._writer = pa.ipc.new_file(self._handle, schema, options=options)
+    
+    def _to_table(self, df: pd.DataFrame) -> pa.Table:
+        if self.schema is None:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        try:
+            return pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # e.g. a column that is entirely missing in this chunk
+            return pa.Table.from_pandas(df, preserve_index=False).select(self.schema.names).cast(self.schema)
+    
+    def write_table(self, table: pa.Table) -> None:
+        """
+        Append an Arrow table.
+        
+        Args:
+            table: Rows to append, with the same columns as earlier writes
+        """
+        if self.format == 'csv':
+            self.write(table.to_pandas())
+            return
+        
+        if self._writer is None:
+            self._open_columnar(table.schema)
+        elif not table.schema.equals(self.schema):
+            table = table.select(self.schema.names).cast(self.schema)
+        
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows_written += table.num_rows
+    
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a chunk of results.
+        
+        Args:
+            df: Rows to append, with the same columns as earlier writes
+        """
+        if self.format == 'csv':
+            if self._handle is None:
+                self._handle = open(self.output_file, 'w', newline='')
+            df.to_csv(self._handle, header=(self.rows_written == 0), index=False)
+            self.rows_written += len(df)
+        else:
+            self.write_table(self._to_table(df))
+    
+    def close(self) -> None:
+        """Finalize the file. Columnar files are only readable after closing."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self.rows_written == 0 and not os.path.exists(self.output_file):
+            # Leave an empty file behind rather than nothing at all
+            open(self.output_file, 'wb').close()
+    
+    def __enter__(self) -> 'ResultWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class _ShardReader(io.RawIOBase):
+    """Read-only stream of a CSV header followed by one byte range of the file."""
+    
+    def __init__(self, path: str, header: bytes, start: int, end: int):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._header = header
+        self._remaining = end - start
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._header:
+            n = min(len(buffer), len(self._header))
+            buffer[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        
+        if self._remaining <= 0:
+            return 0
+        
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+    
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _shard_byte_ranges(input_file: str, shards: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Split a CSV file into contiguous byte ranges that start on line boundaries.
+    
+    Records must not contain embedded newlines inside quoted fields.
+    
+    Args:
+        input_file: Path to the input CSV file
+        shards: Desired number of shards
+        
+    Returns:
+        Tuple of (header line bytes, list of (start, end) byte offsets)
+    """
+    size = os.path.getsize(input_file)
+    
+    with open(input_file, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        
+        boundaries = [data_start]
+        for i in range(1, shards):
+            target = data_start + (size - data_start) * i // shards
+            if target <= boundaries[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()  # Advance to the start of the next line
+            position = f.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+        boundaries.append(size)
+    
+    ranges = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+    return header, ranges
+
+
+def _score_shard(
+    input_file: str,
+    header: bytes,
+    start: int,
+    end: int,
+    model_path: str,
+    feature_cols: Optional[List[str]],
+    params: Dict[str, Any],
+    part_file: str,
+    part_format: str,
+    chunk_size: int,
+    timestamp: str,
+    job_id: int = None
+) -> Tuple[int, int]:
+    """
+    Score one shard of the input file in a worker process.
+    
+    The model's tree arrays are memory-mapped read-only from a shared
+    artifact, so every worker scores from the same physical pages.
+    
+    Returns:
+        Tuple of (records read, records written)
+    """
+    model = MycolModel.load(model_path)
+    # One shard per core; nested parallelism would oversubscribe the machine
+    if hasattr(model.model, 'n_jobs'):
+        model.model.n_jobs = 1
+    
+    read_records = 0
+    # Columnar parts are uncompressed Arrow; compression happens once, in the merge
+    compression = 'none' if part_format == 'feather' else None
+    
+    with io.BufferedReader(_ShardReader(input_file, header, start, end)) as stream, \
+            ResultWriter(part_file, part_format, compression=compression) as writer:
+        for chunk in pd.read_csv(stream, chunksize=chunk_size):
+            read_records += len(chunk)
+            chunk = _score_chunk(chunk, model, model.encoder, feature_cols, params, timestamp, job_id)
+            if len(chunk):
+                writer.write(chunk)
+    
+    return read_records, writer.rows_written
+
+
+def _merge_part_files(
+    part_files: List[str],
+    output_file: str,
+    format: str = 'csv',
+    params: Dict[str, Any] = None
+) -> None:
+    """
+    Merge shard part files in order into the final output file.
+    
+    CSV parts are concatenated byte for byte, keeping only the first header.
+    Arrow parts are re-read batch by batch through a ResultWriter.
+    """
+    if format != 'csv':
+        with _open_result_writer(output_file, format, params or {}) as writer:
+            for part_file in part_files:
+                if not os.path.getsize(part_file):
+                    continue
+                with pa.memory_map(part_file) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        writer.write_table(pa.Table.from_batches([reader.get_batch(i)]))
+        return
+    
+    with open(output_file, 'wb') as out:
+        header_written = False
+        for part_file in part_files:
+            if not os.path.exists(part_file) or not os.path.getsize(part_file):
+                continue
+            with open(part_file, 'rb') as part:
+                header = part.readline()
+                if not header_written:
+                    out.write(header)
+                    header_written = True
+                shutil.copyfileobj(part, out, length=16 * 1024 * 1024)
+
+
+def process_batch_sharded(
+    input_file: str,
+    output_file: str,
+    job_id: int = None,
+    parameters: Dict[str, Any] = None,
+    workers: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    format: str = 'csv',
+    checkpoint_dir: str = None
+) -> int:
+    """
+    Score a CSV file on several cores by splitting it into shards.
+    
+    The model is resolved once, exactly as in streaming mode, and saved as a
+    model artifact whose tree arrays every worker process memory-maps
+    read-only. Each worker scores one contiguous shard of the input in chunks
+    and writes a part file; part files are merged in input order.
+    
+    With a checkpoint directory, the model artifact, shard boundaries and
+    every completed shard are recorded there, so a run interrupted part way
+    only re-scores the shards that had not finished.
+    
+    Args:
+        input_file: Path to the input CSV file
+        output_file: Path of the CSV file to write results to
+        job_id: ID of the batch job (for tracking)
+        parameters: Processing parameters (see process_batch)
+        workers: Number of worker processes (default: all cores)
+        chunk_size: Rows per chunk within each shard
+        progress_callback: Optional callable receiving (processed_records, total_records)
+            as shards complete
+        format: Output format ('csv', 'parquet' or 'feather')
+        checkpoint_dir: Directory for resumable per-shard checkpoints
+        
+    Returns:
+        Number of result rows written
+    """
+    params = _resolve_parameters(parameters)
+    workers = max(1, workers or os.cpu_count() or 1)
+    training_rows = params.get('training_rows') or DEFAULT_TRAINING_ROWS
+    logger.info(f"Starting sharded batch job {job_id} with file {input_file} on {workers} workers")
+    
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    checkpoint = BatchCheckpoint(checkpoint_dir) if checkpoint_dir else None
+    settings = {
+        'mode': 'sharded',
+        'chunk_size': chunk_size,
+        'format': format,
+        'parameters': _checkpoint_parameters(params)
+    }
+    state = checkpoint.resume(input_file, **settings) if checkpoint else None
+    
+    if state:
+        model_key, feature_cols = state['model_key'], state['feature_cols']
+        total_records, timestamp = state['total_records'], state['timestamp']
+        ranges = [tuple(byte_range) for byte_range in state['ranges']]
+        header = _shard_byte_ranges(input_file, 1)[0]
+        logger.info(f"Resuming sharded batch job {job_id} with "
+                    f"{len(state['completed_shards'])}/{len(ranges)} shards done")
+    else:
+        model_key, model, encoder, feature_cols, total_records = _prepare_chunk_model(
+            input_file, params, chunk_size, training_rows
+        )
+        model.encoder = encoder
+        header, ranges = _shard_byte_ranges(input_file, workers)
+        timestamp = datetime.utcnow().isoformat()
+        if checkpoint:
+            state = checkpoint.start(
+                input_file, model, model_key,
+                feature_cols=feature_cols,
+                total_records=total_records,
+                timestamp=timestamp,
+                ranges=ranges,
+                completed_shards={},
+                **settings
+            )
+    
+    if checkpoint:
+        work_dir = checkpoint.directory
+        model_path = checkpoint.model_path
+        completed_shards = state['completed_shards']
+    else:
+        work_dir = tempfile.mkdtemp(prefix='shards_', dir=output_dir or None)
+        model_path = os.path.join(work_dir, BatchCheckpoint.MODEL_FILENAME)
+        model.save(model_path)
+        completed_shards = {}
+    
+    processed_records = sum(read for read, _ in completed_shards.values())
+    written_records = sum(written for _, written in completed_shards.values())
+    if progress_callback:
+        progress_callback(processed_records, total_records)
+    
+    try:
+        part_format = _part_format(format)
+        part_files = [
+            os.path.join(work_dir, f"part_{i:05d}.{part_format}") for i in range(len(ranges))
+        ]
+        pending = [i for i in range(len(ranges)) if str(i) not in completed_shards]
+        
+        # Fork keeps worker start-up cheap and avoids re-importing the caller's __main__
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context) as executor:
+                futures = {
+                    executor.submit(
+                        _score_shard, input_file, header, ranges[i][0], ranges[i][1], model_path,
+                        feature_cols, params, part_files[i], part_format, chunk_size, timestamp, job_id
+                    ): i
+                    for i in pending
+                }
+                
+                try:
+                    for future in as_completed(futures):
+                        read, written = future.result()
+                        processed_records += read
+                        written_records += written
+                        if checkpoint:
+                            completed_shards[str(futures[future])] = [read, written]
+                            checkpoint.save(state)
+                        if progress_callback:
+                            progress_callback(processed_records, total_records)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        
+        _merge_part_files(part_files, output_file, format, params)
+    finally:
+        if checkpoint is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if checkpoint:
+        checkpoint.clear()
+    
+    logger.info(f"Sharded batch job {job_id} wrote {written_records} records to {output_file} "
+                f"using model {model_key}")
+    return written_records
+
+
 def save_batch_results(
     results: pd.DataFrame,
     output_file: str,
-    format: str = 'csv'
+    format: str = 'csv',
+    compression: Optional[str] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE
 ) -> str:
     """
     Save batch processing results to a file.
@@ -180,7 +1105,9 @@ def save_batch_results(
     Args:
         results: DataFrame with results
         output_file: Path to save the results
-        format: Output format ('csv' or 'excel')
+        format: Output format ('csv', 'excel', 'parquet' or 'feather')
+        compression: Codec for parquet/feather output (default: zstd/lz4)
+        row_group_size: Maximum rows per Parquet row group or Feather record batch
         
     Returns:
         Path to the saved file
@@ -191,8 +1118,10 @@ def save_batch_results(
         os.makedirs(output_dir)
     
     # Save based on format
-    if format.lower() == 'csv':
-        results.to_csv(output_file, index=False)
+    if format.lower() in STREAMING_FORMATS:
+        with ResultWriter(output_file, format, compression, row_group_size) as writer:
+            for start in range(0, len(results), row_group_size):
+                writer.write(results.iloc[start:start + row_group_size])
     elif format.lower() in ('excel', 'xlsx'):
         results.to_excel(output_file, index=False)
     else:
@@ -216,8 +1145,19 @@ if __name__ == "__main__":
                         help='Disable data normalization')
     parser.add_argument('--keep-na', action='store_false', dest='drop_na',
                         help='Keep rows with NA values')
-    parser.add_argument('--format', choices=['csv', 'excel'], default='csv',
+    parser.add_argument('--format', choices=['csv', 'excel', 'parquet', 'feather'], default='csv',
                         help='Output file format')
+    parser.add_argument('--model-key', help='Score with this registered model instead of training')
+    parser.add_argument('--retrain', action='store_true',
+                        help='Fit a model on this data instead of reusing the latest registered one')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process the input in chunks to bound memory use (not for excel output)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Rows per chunk in streaming mode')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Score shards of the input on this many processes')
+    parser.add_argument('--compression',
+                        help='Codec for parquet/feather output (default: zstd for parquet, lz4 for feather)')
     
     # Parse arguments
     args = parser.parse_args()
@@ -226,20 +1166,33 @@ if __name__ == "__main__":
     parameters = {
         'model_type': args.model_type,
         'normalization': args.normalization,
-        'drop_na': args.drop_na
+        'drop_na': args.drop_na,
+        'model_key': args.model_key,
+        'retrain': args.retrain,
+        'compression': args.compression
     }
     
-    # Process the batch
-    results = process_batch(args.input_file, args.job_id, parameters)
-    
     # Determine output file path if not provided
     if not args.output_file:
         input_name = os.path.splitext(os.path.basename(args.input_file))[0]
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        output_file = f"{input_name}_results_{timestamp}.{args.format}"
+        output_file = f"{input_name}_results_{timestamp}.{RESULT_EXTENSIONS[args.format]}"
     else:
         output_file = args.output_file
     
-    # Save results
-    save_batch_results(results, output_file, args.format)
+    if (args.workers > 1 or args.stream) and args.format not in STREAMING_FORMATS:
+        parser.error(f"--workers and --stream support {', '.join(STREAMING_FORMATS)} output")
+    
+    if args.workers > 1:
+        process_batch_sharded(args.input_file, output_file, args.job_id, parameters,
+                              args.workers, args.chunk_size, format=args.format)
+    elif args.stream:
+        process_batch_streaming(args.input_file, output_file, args.job_id, parameters,
+                                args.chunk_size, format=args.format)
+    else:
+        # Process the batch
+        results = process_batch(args.input_file, args.job_id, parameters)
+        
+        # Save results
+        save_batch_results(results, output_file, args.format, args.compression)
     print(f"Results saved to {output_file}")
@@ -0,0 +1,604 @@
+"""
+Throughput benchmarks for batch processing.
+
+Generates synthetic bioactivity CSVs shaped like real batch inputs and times
+each stage of the batch pipeline on them: reading, categorical encoding,
+model fitting and prediction, result saving and the end-to-end batch run.
+Every stage reports wall time, rows per second and peak resident memory,
+and the results are written as JSON so runs can be compared across
+releases. With ``--engines``, MycolModel engines are also compared on
+holdout accuracy, prediction latency and saved model size.
+
+Usage:
+    python benchmark.py --sizes 1k 100k 1M --output benchmark_results.json
+    python benchmark.py --sizes --engines random_forest hist_gradient_boosting \
+        --engine-input bioactivity.csv
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from model import ENGINES, MycolModel
+from feature_encoding import CategoricalEncoder
+from model_registry import configure_model_registry
+from batch_processor import (
+    BIOACTIVITY_WEIGHTS, RESULT_EXTENSIONS, _bioactivity_target,
+    process_batch, process_batch_streaming, save_batch_results
+)
+
+# Vocabulary of the synthetic data, with sampling weights roughly matching real submissions
+SPECIES = {
+    'Hericium erinaceus': 0.18,
+    'Ganoderma lucidum': 0.2,
+    'Trametes versicolor': 0.14,
+    'Cordyceps militaris': 0.12,
+    'Inonotus obliquus': 0.1,
+    'Lentinula edodes': 0.08,
+    'Grifola frondosa': 0.07,
+    'Pleurotus ostreatus': 0.06,
+    'Agaricus blazei': 0.03,
+    'Phellinus linteus': 0.02
+}
+COMPOUND_CLASSES = {
+    'Polysaccharide': 0.35,
+    'Terpenoid': 0.25,
+    'Sterol': 0.12,
+    'Phenolic': 0.1,
+    'Nucleoside': 0.08,
+    'Alkaloid': 0.05,
+    'Peptide': 0.05
+}
+TARGET_PATHWAYS = {
+    'NF-kB': 0.22,
+    'MAPK': 0.18,
+    'PI3K/Akt': 0.15,
+    'Nrf2': 0.12,
+    'AMPK': 0.1,
+    'NGF/TrkA': 0.09,
+    'JAK/STAT': 0.08,
+    'Apoptosis': 0.06
+}
+EXTRACTION_METHODS = {
+    'Hot water': 0.4,
+    'Ethanol': 0.3,
+    'Dual extraction': 0.2,
+    'Supercritical CO2': 0.1
+}
+
+# Fraction of rows with a missing Target Pathway, exercising NA handling
+MISSING_RATE = 0.005
+
+# Bioactivities each species, compound class and target pathway make more likely,
+# so the synthetic target can be learned from the categorical features
+BIOACTIVITY_ASSOCIATIONS = {
+    'Species': {
+        'Hericium erinaceus': ['Neuroprotective'],
+        'Ganoderma lucidum': ['Immunomodulatory', 'Hepatoprotective'],
+        'Trametes versicolor': ['Antitumor', 'Immunomodulatory'],
+        'Cordyceps militaris': ['Cardioprotective', 'Antitumor'],
+        'Inonotus obliquus': ['Antioxidant'],
+        'Lentinula edodes': ['Immunomodulatory'],
+        'Grifola frondosa': ['Antitumor'],
+        'Pleurotus ostreatus': ['Cardioprotective', 'Antioxidant'],
+        'Agaricus blazei': ['Antitumor', 'Immunomodulatory'],
+        'Phellinus linteus': ['Anti-inflammatory']
+    },
+    'Compound Class': {
+        'Polysaccharide': ['Immunomodulatory', 'Antitumor'],
+        'Terpenoid': ['Hepatoprotective', 'Anti-inflammatory'],
+        'Sterol': ['Cardioprotective'],
+        'Phenolic': ['Antioxidant'],
+        'Nucleoside': ['Antitumor'],
+        'Alkaloid': ['Neuroprotective'],
+        'Peptide': ['Cardioprotective']
+    },
+    'Target Pathway': {
+        'NF-kB': ['Anti-inflammatory'],
+        'MAPK': ['Antitumor'],
+        'PI3K/Akt': ['Antitumor'],
+        'Nrf2': ['Antioxidant', 'Hepatoprotective'],
+        'AMPK': ['Cardioprotective'],
+        'NGF/TrkA': ['Neuroprotective'],
+        'JAK/STAT': ['Immunomodulatory'],
+        'Apoptosis': ['Antitumor']
+    }
+}
+
+# Log-odds added to each associated bioactivity; the rest of the draw is noise
+ASSOCIATION_STRENGTH = 2.5
+
+SIZE_SUFFIXES = {'k': 1000, 'm': 1000000}
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a row count such as '1000', '10k' or '10M'.
+
+    Args:
+        value: Row count, optionally suffixed with k or M
+
+    Returns:
+        Number of rows
+    """
+    value = str(value).strip().lower().replace('_', '')
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def _sample(rng: np.random.Generator, weights: Dict[str, float], n: int) -> np.ndarray:
+    values = np.array(list(weights.keys()), dtype=object)
+    p = np.array(list(weights.values()), dtype=float)
+    return values[rng.choice(len(values), size=n, p=p / p.sum())]
+
+
+def _draw_bioactivities(rng: np.random.Generator, frame: pd.DataFrame) -> np.ndarray:
+    """
+    Draw each record's bioactivity from a softmax over log-odds raised by
+    the bioactivities associated with its species, compound class and pathway.
+    """
+    bioactivities = list(BIOACTIVITY_WEIGHTS)
+    logits = np.zeros((len(frame), len(bioactivities)))
+    for column, associations in BIOACTIVITY_ASSOCIATIONS.items():
+        values = list(associations)
+        effects = np.zeros((len(values) + 1, len(bioactivities)))  # Last row: unknown or missing value
+        for i, value in enumerate(values):
+            for bioactivity in associations[value]:
+                effects[i, bioactivities.index(bioactivity)] = ASSOCIATION_STRENGTH
+        codes = pd.Categorical(frame[column], categories=values).codes
+        logits += effects[codes]  # Code -1 selects the last row
+
+    # Gumbel-max trick: one categorical draw per row from softmax(logits)
+    draws = np.argmax(logits + rng.gumbel(size=logits.shape), axis=1)
+    return np.array(bioactivities, dtype=object)[draws]
+
+
+def generate_bioactivity_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate synthetic bioactivity records.
+
+    The bioactivity depends on the species, compound class and target
+    pathway (see BIOACTIVITY_ASSOCIATIONS) plus noise, so models trained on
+    the records have a signal to learn; extraction method and yield are
+    independent of it.
+
+    Args:
+        rows: Number of records
+        seed: Random seed
+
+    Returns:
+        DataFrame with Species, Compound Class, Target Pathway,
+        Extraction Method, Bioactivity and Yield columns
+    """
+    rng = np.random.default_rng(seed)
+    pathways = _sample(rng, TARGET_PATHWAYS, rows)
+    pathways[rng.random(rows) < MISSING_RATE] = None
+
+    frame = pd.DataFrame({
+        'Species': _sample(rng, SPECIES, rows),
+        'Compound Class': _sample(rng, COMPOUND_CLASSES, rows),
+        'Target Pathway': pathways,
+        'Extraction Method': _sample(rng, EXTRACTION_METHODS, rows)
+    })
+    frame['Bioactivity'] = _draw_bioactivities(rng, frame)
+    frame['Yield'] = np.round(rng.gamma(2.0, 1.5, rows), 3)
+    return frame
+
+
+def generate_bioactivity_csv(
+    output_file: str,
+    rows: int,
+    seed: int = 0,
+    chunk_rows: int = 1000000
+) -> str:
+    """
+    Write a synthetic bioactivity CSV, generating it in chunks to bound memory.
+
+    Args:
+        output_file: Path of the CSV file to write
+        rows: Number of records
+        seed: Random seed
+        chunk_rows: Records generated per chunk
+
+    Returns:
+        Path to the written file
+    """
+    with open(output_file, 'w', newline='') as f:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            chunk = generate_bioactivity_frame(min(chunk_rows, rows - start), seed=seed + i)
+            chunk.to_csv(f, header=(i == 0), index=False)
+    return output_file
+
+
+def _current_rss() -> int:
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        import resource
+        # ru_maxrss is the lifetime peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class PeakMemoryMonitor:
+    """Samples this process's resident set size in a thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.peak_rss = max(self.peak_rss, _current_rss())
+            self._stop_event.wait(self.interval)
+
+    def __enter__(self) -> 'PeakMemoryMonitor':
+        self.peak_rss = _current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, _current_rss())
+
+
+class StageTimer:
+    """Collects wall time, throughput and peak memory of named stages."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, name: str, rows: int, func, *args, **kwargs):
+        """
+        Time a stage.
+
+        Args:
+            name: Stage name
+            rows: Rows processed by the stage, for rows/sec
+            func: Callable running the stage
+
+        Returns:
+            The stage's return value
+        """
+        with PeakMemoryMonitor() as memory:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+
+        self.stages[name] = {
+            'seconds': round(seconds, 4),
+            'rows': rows,
+            'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+            'peak_rss_mb': round(memory.peak_rss / (1024 * 1024), 1)
+        }
+        print(f"  {name:<24} {seconds:9.3f}s  {self.stages[name]['rows_per_sec'] or 0:>14,.0f} rows/s  "
+              f"{self.stages[name]['peak_rss_mb']:8.1f} MB")
+        return result
+
+
+def benchmark_size(
+    rows: int,
+    work_dir: str,
+    formats: List[str],
+    fit_rows: int = 100000,
+    chunk_size: int = 100000,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Benchmark every batch stage on one synthetic input size.
+
+    Args:
+        rows: Number of input records
+        work_dir: Scratch directory for inputs, outputs and models
+        formats: Output formats to time save_batch_results with
+        fit_rows: Maximum records the model is fitted on. process_batch fits
+            on its whole input, so larger inputs are run end to end through
+            process_batch_streaming instead.
+        chunk_size: Rows per chunk in streaming mode
+        seed: Random seed of the synthetic data
+
+    Returns:
+        Dictionary of per-stage results for this size
+    """
+    print(f"Benchmarking {rows:,} rows")
+    timer = StageTimer()
+    input_file = os.path.join(work_dir, f"bioactivity_{rows}.csv")
+
+    timer.run('generate', rows, generate_bioactivity_csv, input_file, rows, seed)
+    df = timer.run('read_csv', rows, pd.read_csv, input_file)
+    df = df.dropna()
+
+    encoder = CategoricalEncoder()
+    timer.run('encoder_fit', len(df), encoder.fit, df)
+    X = timer.run('encode', len(df), encoder.transform_frame, df)
+
+    train = df.iloc[:fit_rows]
+    y = train['Bioactivity'].map(BIOACTIVITY_WEIGHTS).fillna(0.5)
+    model = MycolModel(model_type='regressor')
+    model.encoder = encoder
+    timer.run('model_fit', len(train), model.fit, X.iloc[:fit_rows], y)
+    predictions = timer.run('model_predict', len(X), model.predict_arrays, X)
+
+    results = df
+    results['pred_bioactivity'] = predictions.scores
+    results['pred_ci_low'] = predictions.lower
+    results['pred_ci_high'] = predictions.upper
+    for format in formats:
+        output_file = os.path.join(work_dir, f"results_{rows}.{RESULT_EXTENSIONS[format]}")
+        timer.run(f"save_{format}", len(results), save_batch_results, results, output_file, format)
+        timer.stages[f"save_{format}"]['file_mb'] = round(os.path.getsize(output_file) / (1024 * 1024), 2)
+    del X, predictions, results, df
+
+    # End to end, fitting a fresh model every time
+    parameters = {'retrain': True, 'training_rows': fit_rows}
+    if rows <= fit_rows:
+        timer.run('process_batch', rows, process_batch, input_file, None, parameters)
+    else:
+        output_file = os.path.join(work_dir, f"streamed_{rows}.csv")
+        timer.run('process_batch_streaming', rows, process_batch_streaming,
+                  input_file, output_file, None, parameters, chunk_size)
+
+    return {
+        'rows': rows,
+        'input_mb': round(os.path.getsize(input_file) / (1024 * 1024), 2),
+        'peak_rss_mb': max(stage['peak_rss_mb'] for stage in timer.stages.values()),
+        'stages': timer.stages
+    }
+
+
+def _directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+def benchmark_engines(
+    engines: List[str],
+    work_dir: str,
+    input_file: str = None,
+    rows: int = 100000,
+    test_fraction: float = 0.2,
+    latency_requests: int = 500,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Compare MycolModel engines on the same bioactivity data.
+
+    Each engine is fitted on the same training rows, saved as an artifact and
+    loaded back the way the API serves it, then measured on the held-out
+    rows: accuracy, batch throughput, single-row latency and model size.
+
+    Args:
+        engines: Engines to compare (see model.ENGINES)
+        work_dir: Scratch directory for the saved models
+        input_file: Bioactivity CSV with a Bioactivity column (default:
+            synthetic records, whose target depends on the species, compound
+            class and pathway plus noise)
+        rows: Number of synthetic records when no input file is given
+        test_fraction: Fraction of rows held out for accuracy and latency
+        latency_requests: Single-row predictions timed per engine
+        seed: Random seed of the synthetic data and the split
+
+    Returns:
+        Dictionary with the data sizes and one result entry per engine
+    """
+    df = pd.read_csv(input_file) if input_file else generate_bioactivity_frame(rows, seed)
+    y = _bioactivity_target(df)
+    if y is None:
+        raise ValueError("Engine comparison needs a Bioactivity column to derive the target from")
+
+    encoder = CategoricalEncoder().fit(df)
+    X = encoder.transform_frame(df)
+    y = y.loc[X.index].to_numpy()
+
+    # A stream separate from the generator's: the same seed's first draws picked each row's pathway,
+    # which made the holdout rows exactly the pathways drawn below test_fraction
+    test = np.random.default_rng([seed, 1]).random(len(X)) < test_fraction
+    X_train, y_train = X[~test], y[~test]
+    X_test, y_test = X[test].reset_index(drop=True), y[test]
+    single_rows = [X_test.iloc[[i % len(X_test)]] for i in range(latency_requests)]
+
+    print(f"Comparing engines on {len(X_train):,} training and {len(X_test):,} test rows")
+    results = []
+    for engine in engines:
+        model = MycolModel(model_type='regressor', engine=engine)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        model_path = os.path.join(work_dir, f"engine_{engine}.model")
+        model.save(model_path)
+        start = time.perf_counter()
+        model = MycolModel.load(model_path)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictions = model.predict_arrays(X_test)
+        predict_seconds = time.perf_counter() - start
+
+        latencies = []
+        for row in single_rows:
+            start = time.perf_counter()
+            model.predict_arrays(row)
+            latencies.append(time.perf_counter() - start)
+        latencies_ms = np.array(latencies) * 1000
+
+        coverage = np.mean((y_test >= predictions.lower) & (y_test <= predictions.upper))
+        result = {
+            'engine': engine,
+            'fit_seconds': round(fit_seconds, 4),
+            'r2': round(float(r2_score(y_test, predictions.scores)), 4),
+            'mae': round(float(mean_absolute_error(y_test, predictions.scores)), 4),
+            'interval_coverage': round(float(coverage), 4),
+            'predict_rows_per_sec': round(len(X_test) / predict_seconds, 1),
+            'single_row_p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+            'single_row_p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+            'load_seconds': round(load_seconds, 4),
+            'model_mb': round(_directory_size(model_path) / (1024 * 1024), 3)
+        }
+        results.append(result)
+        print(f"  {engine:<24} r2 {result['r2']:7.4f}  mae {result['mae']:.4f}  "
+              f"{result['predict_rows_per_sec']:>12,.0f} rows/s  p50 {result['single_row_p50_ms']:7.3f} ms  "
+              f"{result['model_mb']:9.3f} MB")
+
+    return {
+        'input_file': input_file,
+        'train_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'engines': results
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    sizes: List[int],
+    output_file: str = None,
+    formats: List[str] = None,
+    fit_rows: int = 100000,
+    chunk_size: int = 100000,
+    work_dir: str = None,
+    seed: int = 0,
+    engines: List[str] = None,
+    engine_input: str = None,
+    engine_rows: int = 100000
+) -> Dict[str, Any]:
+    """
+    Run the benchmark suite over several input sizes.
+
+    Args:
+        sizes: Input sizes in rows
+        output_file: Path of the JSON report (optional)
+        formats: Output formats to benchmark (default: csv and parquet)
+        fit_rows: Maximum records models are fitted on
+        chunk_size: Rows per chunk in streaming mode
+        work_dir: Scratch directory to keep (default: a temporary directory)
+        seed: Random seed of the synthetic data
+        engines: MycolModel engines to compare (optional, see benchmark_engines)
+        engine_input: Bioactivity CSV for the engine comparison (default: synthetic)
+        engine_rows: Synthetic records for the engine comparison
+
+    Returns:
+        The benchmark report
+    """
+    formats = formats or ['csv', 'parquet']
+    scratch_dir = work_dir or tempfile.mkdtemp(prefix='mycol_benchmark_')
+    os.makedirs(scratch_dir, exist_ok=True)
+    # Keep benchmark models out of the real registry
+    configure_model_registry(os.path.join(scratch_dir, 'model_registry'))
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'git_revision': _git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit_learn': sklearn.__version__
+        },
+        'settings': {
+            'formats': formats,
+            'fit_rows': fit_rows,
+            'chunk_size': chunk_size,
+            'seed': seed
+        },
+        'results': []
+    }
+
+    try:
+        for rows in sizes:
+            report['results'].append(benchmark_size(
+                rows, scratch_dir, formats, fit_rows, chunk_size, seed
+            ))
+            if output_file:
+                # Rewrite after every size so a long run leaves partial results behind
+                with open(output_file, 'w') as f:
+                    json.dump(report, f, indent=2)
+
+        if engines:
+            report['engine_comparison'] = benchmark_engines(
+                engines, scratch_dir, input_file=engine_input, rows=engine_rows, seed=seed
+            )
+            if output_file:
+                with open(output_file, 'w') as f:
+                    json.dump(report, f, indent=2)
+    finally:
+        if work_dir is None:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return report
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark batch processing throughput')
+    parser.add_argument('--sizes', nargs='*', default=['1k', '10k', '100k'],
+                        help='Input sizes in rows, e.g. 1k 100k 10M (default: 1k 10k 100k); '
+                             'pass no sizes to run only the engine comparison')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='Path of the JSON report (default: benchmark_results.json)')
+    parser.add_argument('--formats', nargs='+', default=['csv', 'parquet'],
+                        choices=['csv', 'excel', 'parquet', 'feather'],
+                        help='Output formats to benchmark (default: csv parquet)')
+    parser.add_argument('--fit-rows', type=int, default=100000,
+                        help='Maximum rows models are fitted on; larger inputs are run end to end '
+                             'in streaming mode (default: 100000)')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='Rows per chunk in streaming mode (default: 100000)')
+    parser.add_argument('--work-dir', help='Keep generated inputs and outputs in this directory')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES,
+                        help='Compare these model engines on accuracy, latency and size')
+    parser.add_argument('--engine-input', help='Bioactivity CSV for the engine comparison (default: synthetic data)')
+    parser.add_argument('--engine-rows', default='100k',
+                        help='Synthetic records for the engine comparison (default: 100k)')
+    args = parser.parse_args(argv)
+
+    run_benchmarks(
+        [parse_size(size) for size in args.sizes],
+        output_file=args.output,
+        formats=args.formats,
+        fit_rows=args.fit_rows,
+        chunk_size=args.chunk_size,
+        work_dir=args.work_dir,
+        seed=args.seed,
+        engines=args.engines,
+        engine_input=args.engine_input,
+        engine_rows=parse_size(args.engine_rows)
+    )
+    print(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,7 @@ import pandas as pd
 from typing import Dict, List, Tuple, Union, Optional, Any
 import logging
 from scientific_databases import ScientificDataIntegrator, search_all_databases
+from feature_store import register_feature_set, get_feature_store
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -30,6 +31,17 @@ FEATURE_EXTRACTION_MODEL = os.path.join(MODEL_PATH, 'feature_extractor.pkl')
 SPECIES_CLASSIFIER_MODEL = os.path.join(MODEL_PATH, 'species_classifier.pkl')
 COLOR_REFERENCE_FILE = os.path.join(MODEL_PATH, 'color_references.json')
 
+# Feature set of the bioactivity model's vision features in the feature store;
+# bump the version whenever vision_model_features changes so stored rows are recomputed
+VISION_FEATURE_SET = 'vision'
+VISION_FEATURE_VERSION = '1'
+
+# Features every stored vision row has: morphology and color of the segmented mushroom
+VISION_STORED_FEATURES = (
+    'shape_circularity', 'edge_density', 'texture_contrast',
+    'color_intensity_r', 'color_intensity_g', 'color_intensity_b'
+)
+
 
 class ImageProcessor:
     """Base class for image processing operations."""
@@ -393,6 +405,13 @@ class MorphologicalAnalyzer(ImageProcessor):
             hull_area = cv2.contourArea(hull)
             convexity = area / hull_area if hull_area > 0 else 0
             
+            # Calculate texture inside the mushroom, before anything is drawn on the image
+            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+            inside = self.mask > 0
+            edges = cv2.Canny(gray, 50, 150)
+            edge_density = float(np.mean(edges[inside] > 0)) if inside.any() else 0.0
+            texture_contrast = min(1.0, float(np.std(gray[inside])) / 128) if inside.any() else 0.0
+            
             # Draw results on image (for visualization)
             result_image = self.image.copy()
             cv2.drawContours(result_image, [contour], 0, (0, 255, 0), 2)
@@ -416,6 +435,10 @@ class MorphologicalAnalyzer(ImageProcessor):
                     "elongation": round(elongation, 3),
                     "convexity": round(convexity, 3)
                 },
+                "texture_features": {
+                    "edge_density": round(edge_density, 3),
+                    "contrast": round(texture_contrast, 3)
+                },
                 "position": {
                     "center_x": round(center_x, 2),
                     "center_y": round(center_y, 2),
@@ -766,13 +789,87 @@ class GrowthStageAnalyzer(ImageProcessor):
             return 0
 
 
+def vision_model_features(
+    morphology_results: Optional[Dict[str, Any]],
+    color_results: Optional[Dict[str, Any]]
+) -> Dict[str, float]:
+    """
+    Map analyzer outputs onto the bioactivity model's vision features.
+    
+    Args:
+        morphology_results: Output of MorphologicalAnalyzer.measure_features
+        color_results: Output of ColorAnalyzer.analyze_colors
+        
+    Returns:
+        Model feature values (see ml_bioactivity.VISION_FEATURES); features the
+        analyzers don't measure are left out so the model's defaults apply
+    """
+    features = {}
+    if morphology_results and "error" not in morphology_results:
+        features["shape_circularity"] = float(morphology_results["shape_features"]["circularity"])
+        texture = morphology_results.get("texture_features", {})
+        if "edge_density" in texture:
+            features["edge_density"] = float(texture["edge_density"])
+        if "contrast" in texture:
+            features["texture_contrast"] = float(texture["contrast"])
+    if color_results and "error" not in color_results:
+        rgb = color_results["means"]["rgb"]
+        features["color_intensity_r"] = float(rgb["r"]) / 255
+        features["color_intensity_g"] = float(rgb["g"]) / 255
+        features["color_intensity_b"] = float(rgb["b"]) / 255
+    return features
+
+
+def compute_vision_features(image_path: str) -> Optional[Dict[str, float]]:
+    """
+    Compute the bioactivity model's vision features from an image.
+    
+    This is the registered extractor of the vision feature set, used by the
+    feature store to recompute stale rows.
+    
+    Args:
+        image_path: Path to the image file
+        
+    Returns:
+        Values of all VISION_STORED_FEATURES, or None if the image can't be
+        segmented or fully analyzed
+    """
+    morpho_analyzer = MorphologicalAnalyzer()
+    if not morpho_analyzer.load_image(image_path) or not morpho_analyzer.segment_mushroom():
+        return None
+    morphology_results = morpho_analyzer.measure_features()
+    
+    color_analyzer = ColorAnalyzer()
+    color_results = None
+    if color_analyzer.load_image(image_path):
+        color_analyzer.set_mask(morpho_analyzer.mask)
+        color_results = color_analyzer.analyze_colors()
+    
+    return _complete_vision_features(morphology_results, color_results)
+
+
+def _complete_vision_features(
+    morphology_results: Optional[Dict[str, Any]],
+    masked_color_results: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, float]]:
+    """Vision features as stored, or None unless every stored feature was measured."""
+    features = vision_model_features(morphology_results, masked_color_results)
+    if not all(name in features for name in VISION_STORED_FEATURES):
+        return None
+    return {name: features[name] for name in VISION_STORED_FEATURES}
+
+
+register_feature_set(VISION_FEATURE_SET, VISION_FEATURE_VERSION, compute_vision_features)
+
+
 def process_sample_image(
     image_path: str,
     output_dir: str = None,
     analyze_species: bool = True,
     analyze_morphology: bool = True,
     analyze_color: bool = True,
-    analyze_growth: bool = True
+    analyze_growth: bool = True,
+    sample_id: str = None
 ) -> Dict[str, Any]:
     """
     Process a sample image with multiple analysis types.
@@ -784,6 +881,10 @@ def process_sample_image(
         analyze_morphology: Whether to perform morphological analysis
         analyze_color: Whether to perform color analysis
         analyze_growth: Whether to perform growth stage analysis
+        sample_id: Sample the image belongs to; if given, its vision
+            features are stored in the feature store for the bioactivity
+            models to reuse. They are always computed as compute_vision_features
+            does (color within the segmentation mask), whatever the flags.
         
     Returns:
         Dict: Combined analysis results
@@ -802,6 +903,7 @@ def process_sample_image(
     species_results = None
     morphology_results = None
     color_results = None
+    masked_color_results = None  # Color of the segmented mushroom only
     growth_results = None
     
     try:
@@ -836,7 +938,7 @@ def process_sample_image(
                         color_analyzer = ColorAnalyzer()
                         if color_analyzer.load_image(image_path):
                             color_analyzer.set_mask(morpho_analyzer.mask)
-                            color_results = color_analyzer.analyze_colors()
+                            color_results = masked_color_results = color_analyzer.analyze_colors()
         
         # Color analysis (if not already done with morphology)
         if analyze_color and color_results is None:
@@ -863,6 +965,22 @@ def process_sample_image(
         if growth_results and "error" not in growth_results:
             results["growth_stage"] = growth_results
         
+        # Persist the model features so predictions don't have to analyze the image again
+        if sample_id:
+            # Reuse the analyses only if they match the registered extractor; otherwise run it
+            features = _complete_vision_features(morphology_results, masked_color_results)
+            if features is None:
+                features = compute_vision_features(image_path)
+            if features:
+                get_feature_store().put(sample_id, VISION_FEATURE_SET, features, source=os.path.abspath(image_path))
+                results["stored_features"] = {
+                    "feature_set": VISION_FEATURE_SET,
+                    "version": VISION_FEATURE_VERSION,
+                    "features": features
+                }
+            else:
+                logger.warning(f"Could not compute vision features of sample {sample_id}; nothing stored")
+        
         results["success"] = True
         
     except Exception as e:
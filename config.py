@@ -43,6 +43,46 @@ class Config:
     
     # Model settings
     MODEL_VERSION = os.environ.get('MODEL_VERSION', 'v1.0')
+    MODEL_REGISTRY_FOLDER = os.environ.get('MODEL_REGISTRY_FOLDER', os.path.join(os.getcwd(), 'model_registry'))
+    MODEL_REGISTRY_CACHE_SIZE = int(os.environ.get('MODEL_REGISTRY_CACHE_SIZE', 8))
+    # Registered models kept on disk; the oldest are deleted beyond this (0 for no limit)
+    MODEL_REGISTRY_MAX_MODELS = int(os.environ.get('MODEL_REGISTRY_MAX_MODELS', 20))
+    
+    # Model served by /api/process: an artifact path, or the pointer file written by
+    # `main.py model publish`, checked for new versions every MODEL_RELOAD_INTERVAL seconds
+    SERVING_MODEL_PATH = os.environ.get('SERVING_MODEL_PATH')
+    SERVING_MODEL_POINTER = os.environ.get('SERVING_MODEL_POINTER', os.path.join(MODEL_REGISTRY_FOLDER, 'serving.json'))
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 10.0))
+    
+    # Coalesce concurrent prediction requests into one vectorized predict call per
+    # MICRO_BATCH_MAX_WAIT_MS milliseconds or MICRO_BATCH_MAX_ROWS rows, whichever comes first
+    MICRO_BATCHING_ENABLED = os.environ.get('MICRO_BATCHING_ENABLED', 'True').lower() == 'true'
+    MICRO_BATCH_MAX_ROWS = int(os.environ.get('MICRO_BATCH_MAX_ROWS', 512))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 5.0))
+    
+    # Batch job queue
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 2))
+    BATCH_MAX_CONCURRENT_JOBS = int(os.environ.get('BATCH_MAX_CONCURRENT_JOBS', 4))
+    BATCH_POLL_INTERVAL = float(os.environ.get('BATCH_POLL_INTERVAL', 2.0))
+    
+    # Input files at least this large are processed in streaming mode
+    BATCH_STREAMING_THRESHOLD_MB = int(os.environ.get('BATCH_STREAMING_THRESHOLD_MB', 256))
+    BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 100000))
+    
+    # Checkpoint chunked jobs so a job interrupted by a dead worker resumes where it stopped.
+    # Processing jobs without a heartbeat for BATCH_STALE_AFTER seconds are requeued.
+    BATCH_CHECKPOINTS_ENABLED = os.environ.get('BATCH_CHECKPOINTS_ENABLED', 'True').lower() == 'true'
+    BATCH_HEARTBEAT_INTERVAL = float(os.environ.get('BATCH_HEARTBEAT_INTERVAL', 15.0))
+    BATCH_STALE_AFTER = float(os.environ.get('BATCH_STALE_AFTER', 120.0))
+    BATCH_MAX_ATTEMPTS = int(os.environ.get('BATCH_MAX_ATTEMPTS', 3))
+    
+    # Reuse results of identical batch submissions, evicting the least recently used over the budget
+    RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', 2048))
+    
+    # Per-sample feature store: Parquet files for training and a SQLite table for serving
+    FEATURE_STORE_FOLDER = os.environ.get('FEATURE_STORE_FOLDER', os.path.join(os.getcwd(), 'feature_store'))
+    FEATURE_STORE_ONLINE_DB = os.environ.get('FEATURE_STORE_ONLINE_DB')  # Default: online.db in the folder
     
 
 class DevelopmentConfig(Config):
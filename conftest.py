@@ -0,0 +1,45 @@
+"""
+Shared pytest fixtures for the batch job tests.
+"""
+
+import os
+import logging
+
+import pytest
+from flask import Flask
+
+from app import db
+from config import TestingConfig
+from model_registry import configure_model_registry
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Minimal app with the research database on a scratch SQLite file.
+
+    ``create_app`` also sets up the AI integrations, which need API keys, so
+    only the database is initialised here. A file (rather than in-memory)
+    database lets several threads claim jobs over their own connections.
+    """
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'research.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 30}},
+        RESULTS_FOLDER=str(tmp_path / 'results'),
+        RESULT_CACHE_ENABLED=True
+    )
+    os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
+    db.init_app(app)
+    configure_model_registry(str(tmp_path / 'model_registry'))
+    logging.disable(logging.INFO)
+
+    with app.app_context():
+        import models  # noqa: F401 - registers the tables
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+    logging.disable(logging.NOTSET)
@@ -0,0 +1,336 @@
+"""
+Per-row feature attributions (SHAP values) for MycolModel predictions.
+
+Forests are explained with path-dependent TreeSHAP, computed exactly but
+reorganized so that it vectorizes across rows. For one leaf, let z_j be the
+fraction of training cover that follows the leaf's path at the splits on
+feature j, and o_j(x) whether row x satisfies those splits. Feature i then
+receives
+
+    value * (o_i - z_i) * integral_0^1 prod_{j != i} (z_j + (o_j - z_j) u) du
+
+(the Shapley weights are Beta integrals). The integrand is a polynomial of
+degree below the path length, so a few Gauss-Legendre points evaluate it
+exactly, and every tree becomes a handful of batched float32 matrix products
+over (leaves x rows). Linear (sgd) regressors are explained exactly by
+coefficient times centered feature.
+
+Explaining a forest costs far more than predicting with it, so an explainer
+is compiled once per model (identified by a digest of its arrays),
+duplicate rows in a batch are explained once, and the attributions of
+recently seen rows are kept in a per-model LRU cache.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+
+import numpy as np
+from scipy import sparse
+
+from model_artifact import PackedForest
+
+logger = logging.getLogger(__name__)
+
+# Attribution rows cached per model
+DEFAULT_CACHE_ROWS = 100000
+
+# Compiled explainers kept per process (one per model version)
+MAX_EXPLAINERS = 4
+
+# Upper bound on (leaves x rows x path length) elements per block
+_BLOCK_ELEMENTS = 4000000
+
+
+def _forest_digest(forest: PackedForest) -> str:
+    """Identify a forest by the contents of its node arrays."""
+    digest = hashlib.sha256()
+    for name, array in sorted(forest.arrays().items()):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(array).view(np.uint8).data)
+    digest.update(str(forest.scaled_inputs).encode())
+    return digest.hexdigest()
+
+
+class _TreeTable:
+    """Root-to-leaf paths of one tree, flattened to (leaves x path slots) arrays."""
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        nan_follows: np.ndarray,
+        zero_fraction: np.ndarray,
+        value: np.ndarray,
+        n_features: int,
+        nodes: np.ndarray,
+        weights: np.ndarray
+    ):
+        n_leaves, n_slots = feature.shape
+        n_outputs = value.shape[1]
+        self.feature = feature
+        self.lower = lower
+        self.upper = upper
+        self.nan_follows = nan_follows
+        self.n_slots = n_slots
+
+        # Factor of a path slot when the row follows (one) or leaves (zero) the path
+        z = zero_fraction[:, None, :]
+        follow = z + (1 - z) * nodes[None, :, None]  # (leaves, points, slots)
+        leave = z * (1 - nodes[None, :, None])
+        weight = weights[None, :, None]
+        self.log_leave = np.log(leave).sum(axis=2, keepdims=True).astype(np.float32)  # (leaves, points, 1)
+        self.log_ratio = (np.log(follow) - np.log(leave)).astype(np.float32)
+        # Shapley term of a slot per quadrature point, before multiplying by the path product
+        leave_term = -weight * z / leave
+        self.leave_term = leave_term.transpose(0, 2, 1).astype(np.float32)  # (leaves, slots, points)
+        self.follow_minus_leave = (weight * (1 - z) / follow - leave_term).transpose(0, 2, 1).astype(np.float32)
+
+        # Scatter (leaf, slot) terms to (feature, output) columns, weighted by the leaf value
+        rows = np.repeat(np.arange(n_leaves * n_slots), n_outputs)
+        columns = (feature.reshape(-1, 1) * n_outputs + np.arange(n_outputs)).reshape(-1)
+        data = np.repeat(value, n_slots, axis=0).reshape(-1)
+        self.scatter = sparse.csr_matrix(
+            (data, (rows, columns)), shape=(n_leaves * n_slots, n_features * n_outputs)
+        ).T.tocsr()
+        self.expected_value = (value * zero_fraction.prod(axis=1)[:, None]).sum(axis=0)
+
+    def shap_values(self, X_T: np.ndarray) -> np.ndarray:
+        """
+        Attributions of one tree for a block of rows.
+
+        Args:
+            X_T: Transposed block of float32 rows, shaped (features, rows)
+
+        Returns:
+            Array of shape (features * outputs, rows)
+        """
+        x = X_T[self.feature]  # (leaves, slots, rows)
+        follows = (x > self.lower[:, :, None]) & (x <= self.upper[:, :, None])
+        missing = np.isnan(x)
+        if missing.any():
+            follows = np.where(missing, self.nan_follows[:, :, None], follows)
+        follows = follows.astype(np.float32)
+
+        path_product = np.exp(np.matmul(self.log_ratio, follows) + self.log_leave)  # (leaves, points, rows)
+        terms = np.matmul(self.leave_term, path_product)
+        terms += follows * np.matmul(self.follow_minus_leave, path_product)  # (leaves, slots, rows)
+
+        return self.scatter.dot(terms.reshape(-1, X_T.shape[1]))
+
+
+class ForestExplainer:
+    """Path-dependent TreeSHAP for a PackedForest, vectorized across rows."""
+
+    def __init__(self, forest: PackedForest, cache_rows: int = DEFAULT_CACHE_ROWS):
+        """
+        Compile the explainer.
+
+        Args:
+            forest: Packed forest saved with node covers
+            cache_rows: Attribution rows kept in the LRU cache
+        """
+        if forest.cover is None:
+            raise ValueError("Model artifact has no node covers; re-save the model to enable explanations")
+
+        self.n_features = forest.n_features_in_
+        self.n_outputs = forest.value.shape[1]
+        self.cache_rows = cache_rows
+        self.trees = [self._compile_tree(forest, root) for root in forest.roots]
+        self.expected_value = np.mean([tree.expected_value for tree in self.trees], axis=0)
+        self._cache: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled; the cached attributions stay with this process
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_cache'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _compile_tree(self, forest: PackedForest, root: int) -> _TreeTable:
+        """Walk one tree breadth first, tracking each node's box, NaN route and cover fractions."""
+        children, cover = forest.children, forest.cover
+        n_features = self.n_features
+
+        level = np.array([root])
+        lower = np.full((1, n_features), -np.inf, dtype=np.float32)
+        upper = np.full((1, n_features), np.inf, dtype=np.float32)
+        nan_follows = np.ones((1, n_features), dtype=bool)
+        zero_fraction = np.ones((1, n_features))
+        used = np.zeros((1, n_features), dtype=bool)
+        leaves = []
+
+        while level.size:
+            is_leaf = children[level] == level
+            if is_leaf.any():
+                leaves.append((level[is_leaf], lower[is_leaf], upper[is_leaf],
+                               nan_follows[is_leaf], zero_fraction[is_leaf], used[is_leaf]))
+            internal = ~is_leaf
+            if not internal.any():
+                break
+
+            node = level[internal]
+            f = forest.feature[node].astype(np.int64)
+            threshold = forest.threshold[node]
+            missing_right = forest.missing_right[node].astype(bool)
+            index = np.arange(len(node))
+            states = []
+            for side, child in ((0, children[node]), (1, children[node] + 1)):
+                lo, hi = lower[internal].copy(), upper[internal].copy()
+                nan_ok, z, u = nan_follows[internal].copy(), zero_fraction[internal].copy(), used[internal].copy()
+                if side == 0:
+                    hi[index, f] = np.minimum(hi[index, f], threshold)
+                    nan_ok[index, f] &= ~missing_right
+                else:
+                    lo[index, f] = np.maximum(lo[index, f], threshold)
+                    nan_ok[index, f] &= missing_right
+                z[index, f] *= np.asarray(cover[child], dtype=np.float64) / np.asarray(cover[node], dtype=np.float64)
+                u[index, f] = True
+                states.append((child, lo, hi, nan_ok, z, u))
+
+            # Interleave left and right children, matching the packed layout
+            level = np.column_stack((states[0][0], states[1][0])).ravel()
+            lower, upper, nan_follows, zero_fraction, used = (
+                np.stack((states[0][k], states[1][k]), axis=1).reshape(-1, n_features) for k in range(1, 6)
+            )
+
+        nodes = np.concatenate([leaf[0] for leaf in leaves])
+        lower, upper, nan_follows, zero_fraction, used = (
+            np.concatenate([leaf[k] for leaf in leaves]) for k in range(1, 6)
+        )
+
+        # Keep only the features on each path; padding slots are null players (z = o = 1)
+        n_slots = max(int(used.sum(axis=1).max()), 1)
+        slot_order = np.argsort(~used, axis=1, kind='stable')[:, :n_slots]
+        on_path = np.take_along_axis(used, slot_order, axis=1)
+        lower, upper, nan_follows, zero_fraction = (
+            np.take_along_axis(array, slot_order, axis=1) for array in (lower, upper, nan_follows, zero_fraction)
+        )
+        # Gauss-Legendre with n points is exact up to degree 2n - 1
+        points, weights = np.polynomial.legendre.leggauss((n_slots + 1) // 2)
+
+        return _TreeTable(
+            feature=np.where(on_path, slot_order, 0),
+            lower=np.where(on_path, lower, -np.inf).astype(np.float32),
+            upper=np.where(on_path, upper, np.inf).astype(np.float32),
+            nan_follows=np.where(on_path, nan_follows, True),
+            zero_fraction=np.where(on_path, zero_fraction, 1.0),
+            value=np.asarray(forest.value[nodes], dtype=np.float64),
+            n_features=n_features,
+            nodes=(points + 1) / 2,
+            weights=weights / 2
+        )
+
+    def _compute(self, X: np.ndarray) -> np.ndarray:
+        """Attributions of unique rows, shaped (rows, features, outputs)."""
+        X_T = np.ascontiguousarray(X.T)
+        # Per-tree terms are float32; trees are accumulated in float64
+        output = np.zeros((self.n_features * self.n_outputs, len(X)))
+        for tree in self.trees:
+            block = max(1, _BLOCK_ELEMENTS // (len(tree.feature) * tree.n_slots))
+            for start in range(0, len(X), block):
+                output[:, start:start + block] += tree.shap_values(X_T[:, start:start + block])
+        output /= len(self.trees)
+        return output.T.reshape(len(X), self.n_features, self.n_outputs)
+
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        """
+        Explain rows of forest input.
+
+        Args:
+            X: 2D array of features as the forest takes them (scaled unless
+                the scaler is folded into the forest)
+
+        Returns:
+            Array of shape (rows, features, outputs); each row's attributions
+            plus expected_value sum to the forest's output for that row
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if not len(X):
+            return np.zeros((0, self.n_features, self.n_outputs))
+
+        # Duplicate rows are explained once; rows compare by their bytes, so NaNs match too
+        keys = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        values = np.empty((len(unique_keys), self.n_features, self.n_outputs))
+        missing = []
+        with self._lock:
+            for i, key in enumerate(unique_keys):
+                cached = self._cache.get(key.tobytes())
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key.tobytes())
+                    values[i] = cached
+
+        if missing:
+            missing = np.array(missing)
+            values[missing] = self._compute(X[first[missing]])
+            with self._lock:
+                for i in missing:
+                    self._cache[unique_keys[i].tobytes()] = values[i].copy()
+                while len(self._cache) > self.cache_rows:
+                    self._cache.popitem(last=False)
+
+        logger.debug(f"Explained {len(X)} rows: {len(unique_keys)} unique, {len(missing)} computed")
+        return values[inverse.ravel()]
+
+
+_explainers: 'OrderedDict[str, ForestExplainer]' = OrderedDict()
+_explainers_lock = threading.Lock()
+
+
+def get_forest_explainer(forest: PackedForest, cache_rows: int = DEFAULT_CACHE_ROWS) -> ForestExplainer:
+    """
+    Return the explainer of a forest, compiling it on first use.
+
+    Explainers (and their attribution caches) are shared by every copy of the
+    same model version in this process, e.g. each chunk's reload in a batch job.
+
+    Args:
+        forest: Packed forest to explain
+        cache_rows: Attribution rows cached for a newly compiled explainer
+
+    Returns:
+        ForestExplainer for the forest
+    """
+    digest = _forest_digest(forest)
+    with _explainers_lock:
+        explainer = _explainers.get(digest)
+        if explainer is not None:
+            _explainers.move_to_end(digest)
+            return explainer
+
+    explainer = ForestExplainer(forest, cache_rows=cache_rows)
+    with _explainers_lock:
+        explainer = _explainers.setdefault(digest, explainer)
+        while len(_explainers) > MAX_EXPLAINERS:
+            _explainers.popitem(last=False)
+    return explainer
+
+
+def linear_shap_values(coef: np.ndarray, X_scaled: np.ndarray) -> np.ndarray:
+    """
+    Exact attributions of a linear model on standardized features.
+
+    The training mean of every standardized feature is 0, so feature j
+    contributes coef_j * x_j and the expected value is the intercept.
+
+    Args:
+        coef: Coefficients, shaped (features,) or (outputs, features)
+        X_scaled: 2D array of standardized features
+
+    Returns:
+        Attributions shaped (rows, features, outputs)
+    """
+    coef = np.atleast_2d(coef)
+    return np.asarray(X_scaled, dtype=np.float64)[:, :, None] * coef.T[None, :, :]
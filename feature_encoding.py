@@ -0,0 +1,260 @@
+"""
+Categorical feature encoding for bioactivity batch data.
+
+CategoricalEncoder one-hot encodes the categorical columns of a batch file
+against a fitted, persisted vocabulary. Encoding is a single vectorized
+category lookup per column written straight into a compact uint8 (or scipy
+sparse) matrix, and the output column order can be pinned to a model's
+stored feature names.
+"""
+
+import json
+import logging
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+
+logger = logging.getLogger(__name__)
+
+# Categorical input columns and the prefix of their one-hot encoded features
+CATEGORICAL_FEATURES = {
+    'Species': 'species',
+    'Compound Class': 'class',
+    'Target Pathway': 'pathway',
+    'Extraction Method': 'method'
+}
+
+
+def _as_category_values(values: pd.Series) -> pd.Series:
+    """Normalize a column to strings, keeping missing values missing."""
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        return values
+    return values.astype(str).where(values.notna())
+
+
+class CategoricalEncoder:
+    """One-hot encoder with a fixed vocabulary for batch categorical columns."""
+
+    def __init__(self, columns: Dict[str, str] = None, handle_unknown: str = 'ignore'):
+        """
+        Initialize the encoder.
+
+        Args:
+            columns: Mapping of input column to feature prefix
+            handle_unknown: 'ignore' to encode unseen categories as all zeros,
+                or 'error' to raise
+        """
+        if handle_unknown not in ('ignore', 'error'):
+            raise ValueError(f"Unknown handle_unknown option: {handle_unknown}")
+
+        self.columns = dict(columns or CATEGORICAL_FEATURES)
+        self.handle_unknown = handle_unknown
+        self.vocabulary: Dict[str, List[str]] = {}
+        self.feature_names: List[str] = []
+        self._vocabulary_index: Dict[str, pd.Index] = {}
+        self._alignment_cache: Dict[tuple, Dict[str, np.ndarray]] = {}
+
+    @property
+    def is_fitted(self) -> bool:
+        """Whether a vocabulary has been learned."""
+        return bool(self.vocabulary)
+
+    def _update_feature_names(self) -> None:
+        self.feature_names = [
+            f"{self.columns[column]}_{value}"
+            for column in self.columns if column in self.vocabulary
+            for value in self.vocabulary[column]
+        ]
+        self._vocabulary_index = {
+            column: pd.Index(values) for column, values in self.vocabulary.items()
+        }
+        self._alignment_cache = {}
+
+    def partial_fit(self, df: pd.DataFrame) -> 'CategoricalEncoder':
+        """
+        Extend the vocabulary with the categories in a chunk of data.
+
+        Args:
+            df: Chunk of input data
+
+        Returns:
+            The encoder instance
+        """
+        for column in self.columns:
+            if column not in df.columns:
+                continue
+            values = _as_category_values(df[column]).dropna().unique()
+            known = set(self.vocabulary.get(column, []))
+            known.update(values)
+            self.vocabulary[column] = sorted(known)
+
+        self._update_feature_names()
+        return self
+
+    def fit(self, df: pd.DataFrame) -> 'CategoricalEncoder':
+        """
+        Learn the vocabulary from input data.
+
+        Args:
+            df: Input data
+
+        Returns:
+            The fitted encoder instance
+        """
+        self.vocabulary = {}
+        return self.partial_fit(df)
+
+    def _alignment(self, feature_names: Optional[List[str]]) -> Dict[str, np.ndarray]:
+        """
+        Map every (column, code) pair to an output column position.
+
+        Returns one lookup array per column where entry ``code`` holds the
+        target column index, or -1 if the target schema has no such feature.
+        """
+        key = tuple(feature_names) if feature_names is not None else None
+        if key in self._alignment_cache:
+            return self._alignment_cache[key]
+
+        positions = {name: i for i, name in enumerate(feature_names or self.feature_names)}
+        alignment = {}
+        for column, values in self.vocabulary.items():
+            prefix = self.columns[column]
+            alignment[column] = np.array(
+                [positions.get(f"{prefix}_{value}", -1) for value in values],
+                dtype=np.int64
+            )
+
+        self._alignment_cache[key] = alignment
+        return alignment
+
+    def transform(
+        self,
+        df: pd.DataFrame,
+        feature_names: List[str] = None,
+        sparse: bool = False
+    ) -> Union[np.ndarray, sp.csr_matrix]:
+        """
+        Encode input data in a single pass.
+
+        Args:
+            df: Input data
+            feature_names: Output column order, typically ``MycolModel.feature_names``.
+                Features the encoder does not produce are left as zeros and
+                encoder features missing from the list are dropped.
+            sparse: Return a scipy CSR matrix instead of a dense array
+
+        Returns:
+            uint8 matrix with one row per input row
+        """
+        if not self.is_fitted:
+            raise ValueError("CategoricalEncoder must be fitted before transform")
+
+        n_rows = len(df)
+        n_features = len(feature_names) if feature_names is not None else len(self.feature_names)
+        alignment = self._alignment(feature_names)
+
+        if sparse:
+            row_blocks, col_blocks = [], []
+        else:
+            matrix = np.zeros((n_rows, n_features), dtype=np.uint8)
+            flat = matrix.reshape(-1)
+            row_offsets = np.arange(n_rows, dtype=np.int64) * n_features
+
+        for column, lookup in alignment.items():
+            if column not in df.columns or len(lookup) == 0:
+                continue
+
+            # Factorize once, then map only the distinct values onto the vocabulary
+            codes, uniques = pd.factorize(_as_category_values(df[column]))
+            positions = self._vocabulary_index[column].get_indexer(uniques)
+
+            unseen = positions < 0
+            if unseen.any():
+                counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+                unknown = int(counts[unseen].sum())
+                if self.handle_unknown == 'error':
+                    raise ValueError(f"{unknown} unseen categories in column '{column}'")
+                logger.debug(f"Encoded {unknown} unseen '{column}' values as zeros")
+
+            # Trailing -1 catches missing values, which factorize codes as -1
+            unique_targets = np.append(np.where(unseen, -1, lookup[positions]), -1)
+            target = unique_targets[codes]
+            valid = target >= 0
+            all_valid = valid.all()
+
+            if sparse:
+                row_blocks.append(np.arange(n_rows) if all_valid else np.flatnonzero(valid))
+                col_blocks.append(target if all_valid else target[valid])
+            elif all_valid:
+                flat[row_offsets + target] = 1
+            else:
+                flat[row_offsets[valid] + target[valid]] = 1
+
+        if not sparse:
+            return matrix
+
+        rows = np.concatenate(row_blocks) if row_blocks else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(col_blocks) if col_blocks else np.empty(0, dtype=np.int64)
+        data = np.ones(len(rows), dtype=np.uint8)
+        return sp.csr_matrix((data, (rows, cols)), shape=(n_rows, n_features), dtype=np.uint8)
+
+    def transform_frame(self, df: pd.DataFrame, feature_names: List[str] = None) -> pd.DataFrame:
+        """
+        Encode input data into a DataFrame backed by a single uint8 block.
+
+        Args:
+            df: Input data
+            feature_names: Output column order (see transform)
+
+        Returns:
+            DataFrame of one-hot features aligned with the input index
+        """
+        matrix = self.transform(df, feature_names=feature_names)
+        return pd.DataFrame(
+            matrix,
+            columns=list(feature_names) if feature_names is not None else self.feature_names,
+            index=df.index,
+            copy=False
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the encoder to a JSON-compatible dictionary."""
+        return {
+            'columns': self.columns,
+            'handle_unknown': self.handle_unknown,
+            'vocabulary': self.vocabulary
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CategoricalEncoder':
+        """Rebuild an encoder from ``to_dict`` output."""
+        encoder = cls(columns=data['columns'], handle_unknown=data.get('handle_unknown', 'ignore'))
+        encoder.vocabulary = {column: list(values) for column, values in data['vocabulary'].items()}
+        encoder._update_feature_names()
+        return encoder
+
+    def save(self, filepath: str) -> None:
+        """
+        Save the vocabulary to a JSON file.
+
+        Args:
+            filepath: Path to save the encoder
+        """
+        with open(filepath, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'CategoricalEncoder':
+        """
+        Load an encoder from a JSON file.
+
+        Args:
+            filepath: Path to the encoder file
+
+        Returns:
+            Loaded encoder instance
+        """
+        with open(filepath, 'r') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,169 @@
+"""
+Compiled feature schema for fast, non-mutating input alignment.
+
+A FeatureSchema is built once from a fitted model's feature names and
+training means. It copies the input (a dict of columns, a DataFrame or a 2D
+array) straight into a float64 (or float32) matrix in model column order, then applies
+explicit policies for absent columns and missing values. The caller's data is
+never modified. Small requests reuse a per-thread buffer, so an online
+request does no DataFrame construction and almost no allocation.
+"""
+
+import logging
+import threading
+from typing import Dict, Any, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# What to do with a model feature absent from the input
+MISSING_COLUMN_POLICIES = ('zero', 'mean', 'error')
+
+# What to do with missing (NaN/None) values in the input
+MISSING_VALUE_POLICIES = ('keep', 'zero', 'mean', 'error')
+
+# Requests up to this many rows are aligned into a reused per-thread buffer
+BUFFER_ROWS = 1024
+
+
+class FeatureSchema:
+    """Maps input columns to a model's feature matrix in training order."""
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        fill_values: Sequence[float] = None,
+        missing_columns: str = 'zero',
+        missing_values: str = 'keep',
+        dtype=np.float64
+    ):
+        """
+        Compile a schema.
+
+        Args:
+            feature_names: Model feature names in column order
+            fill_values: Value per feature used by the 'mean' policies,
+                typically the training means (default: zeros)
+            missing_columns: Policy for features absent from the input:
+                'zero', 'mean' (training mean) or 'error'
+            missing_values: Policy for NaN values in the input: 'keep' (pass
+                them to the model), 'zero', 'mean' or 'error'
+            dtype: dtype of the aligned matrix
+        """
+        if missing_columns not in MISSING_COLUMN_POLICIES:
+            raise ValueError(f"Unknown missing column policy: {missing_columns}")
+        if missing_values not in MISSING_VALUE_POLICIES:
+            raise ValueError(f"Unknown missing value policy: {missing_values}")
+
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.fill_values = (
+            np.asarray(fill_values, dtype=np.float64) if fill_values is not None
+            else np.zeros(self.n_features)
+        )
+        self.missing_columns = missing_columns
+        self.missing_values = missing_values
+        self.dtype = np.dtype(dtype)
+        self._missing_fill = self.fill_values if missing_columns == 'mean' else np.zeros(self.n_features)
+        self._value_fill = self.fill_values if missing_values == 'mean' else np.zeros(self.n_features)
+        self._warned_missing = set()
+        self._local = threading.local()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Thread-local buffers cannot be pickled; each process makes its own
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _buffer(self, n_rows: int) -> np.ndarray:
+        """Return an (n_rows, n_features) matrix, reusing this thread's buffer for small requests."""
+        if n_rows > BUFFER_ROWS:
+            return np.empty((n_rows, self.n_features), dtype=self.dtype)
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.empty((BUFFER_ROWS, self.n_features), dtype=self.dtype)
+        return buffer[:n_rows]
+
+    def _handle_missing_columns(self, missing: List[str]) -> None:
+        if self.missing_columns == 'error':
+            raise ValueError(f"Input is missing model features: {missing}")
+        key = tuple(missing)
+        if key not in self._warned_missing:
+            # Warn once per distinct set, not on every online request
+            self._warned_missing.add(key)
+            logger.warning(f"Feature mismatch. Missing {missing}; filling with {self.missing_columns} values")
+
+    def transform(self, X: Union[pd.DataFrame, Dict[str, Any], np.ndarray], copy: bool = False) -> np.ndarray:
+        """
+        Align input data to the schema.
+
+        Args:
+            X: Dict of column name to values, DataFrame with (at least) the
+                model's features, or 2D array already in model column order
+            copy: Always return a new array. By default small inputs are
+                aligned into a per-thread buffer that the next call on the
+                same thread overwrites.
+
+        Returns:
+            Matrix of shape (rows, n_features) in the schema's dtype
+        """
+        if isinstance(X, np.ndarray):
+            if X.ndim != 2 or X.shape[1] != self.n_features:
+                raise ValueError(f"Expected an array with {self.n_features} columns, got shape {X.shape}")
+            n_rows = X.shape[0]
+            output = np.empty((n_rows, self.n_features), dtype=self.dtype) if copy else self._buffer(n_rows)
+            output[...] = X
+        elif isinstance(X, pd.DataFrame):
+            n_rows = len(X)
+            output = np.empty((n_rows, self.n_features), dtype=self.dtype) if copy else self._buffer(n_rows)
+            positions = X.columns.get_indexer(self.feature_names)
+            present = positions >= 0
+            if not present.all():
+                output[:, ~present] = self._missing_fill[~present]
+                self._handle_missing_columns([name for name, found in zip(self.feature_names, present) if not found])
+            # Copy all present columns in one block; per-column Series access dominates small requests
+            in_order = np.array_equal(positions, np.arange(len(X.columns)))
+            frame = X if in_order else X.iloc[:, positions[present]]
+            output[:, present] = frame.to_numpy(dtype=self.dtype, na_value=np.nan)
+        elif isinstance(X, dict):
+            lengths = {len(values) if np.ndim(values) else 1 for values in X.values()}
+            if len(lengths) > 1:
+                raise ValueError("All input feature columns must have the same length")
+            n_rows = lengths.pop() if lengths else 0
+
+            output = np.empty((n_rows, self.n_features), dtype=self.dtype) if copy else self._buffer(n_rows)
+            missing = []
+            for j, name in enumerate(self.feature_names):
+                if name not in X:
+                    missing.append(name)
+                    output[:, j] = self._missing_fill[j]
+                    continue
+                values = X[name]
+                if isinstance(values, pd.Series):
+                    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+                elif isinstance(values, (list, tuple)) and any(value is None for value in values):
+                    values = [np.nan if value is None else value for value in values]
+                output[:, j] = values
+            if missing:
+                self._handle_missing_columns(missing)
+        else:
+            raise TypeError(f"Unsupported input type: {type(X).__name__}")
+
+        if self.missing_values != 'keep':
+            nan_mask = np.isnan(output)
+            if nan_mask.any():
+                if self.missing_values == 'error':
+                    counts = {
+                        name: int(count) for name, count in zip(self.feature_names, nan_mask.sum(axis=0)) if count
+                    }
+                    raise ValueError(f"Input has missing values: {counts}")
+                rows, cols = np.nonzero(nan_mask)
+                output[rows, cols] = self._value_fill[cols]
+
+        return output
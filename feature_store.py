@@ -0,0 +1,397 @@
+"""
+Per-sample feature store shared by the vision and bioactivity models.
+
+Features are grouped into named feature sets, each produced by a registered
+extractor with a version. The store has two halves:
+
+- online: a SQLite table keyed on (sample ID, feature set) holding the
+  latest values of every sample, for serving single predictions;
+- offline: Parquet files per feature set and extractor version, appended on
+  every write and read back as one frame, for training and batch scoring;
+  ``compact_offline`` merges them before bulk reads.
+
+Every stored row records the extractor version that produced it and the
+source it was computed from (e.g. the image path). A row whose version
+differs from the registered extractor's is stale. Online reads recompute
+stale rows from their source with the current extractor and store the
+result, so a version bump refreshes samples as they are used;
+``refresh_stale`` does the same for all of them at once.
+"""
+
+import os
+import json
+import uuid
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Callable, Optional, Sequence
+
+import pandas as pd
+
+from config import active_config
+
+logger = logging.getLogger(__name__)
+
+# Columns every stored row carries besides its features
+KEY_COLUMNS = ['sample_id', 'version', 'source', 'computed_at']
+
+# Times read_offline lists the part files again when a concurrent compaction removes one
+_READ_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    sample_id TEXT NOT NULL,
+    feature_set TEXT NOT NULL,
+    version TEXT NOT NULL,
+    source TEXT,
+    computed_at TEXT NOT NULL,
+    features TEXT NOT NULL,
+    PRIMARY KEY (sample_id, feature_set)
+)
+"""
+
+
+@dataclass(frozen=True)
+class FeatureSet:
+    """A named group of features and the extractor that computes them."""
+    name: str
+    version: str
+    compute: Optional[Callable[[str], Optional[Dict[str, float]]]] = None  # source -> features
+
+
+_feature_sets: Dict[str, FeatureSet] = {}
+
+
+def register_feature_set(
+    name: str,
+    version: str,
+    compute: Callable[[str], Optional[Dict[str, float]]] = None
+) -> FeatureSet:
+    """
+    Register the current extractor of a feature set.
+
+    Args:
+        name: Feature set name
+        version: Extractor version; bump it whenever the features it
+            computes change, so stored rows are recomputed
+        compute: Function computing the features from a row's source, or
+            returning None if it can't; without one, stale rows read as missing
+
+    Returns:
+        The registered FeatureSet
+    """
+    feature_set = FeatureSet(name=name, version=str(version), compute=compute)
+    _feature_sets[name] = feature_set
+    return feature_set
+
+
+def get_feature_set(name: str) -> FeatureSet:
+    """Return a registered feature set."""
+    try:
+        return _feature_sets[name]
+    except KeyError:
+        raise ValueError(f"Unknown feature set: {name}") from None
+
+
+class FeatureStore:
+    """Offline (Parquet) and online (SQLite) storage of per-sample features."""
+
+    def __init__(self, root_dir: str, online_path: str = None):
+        """
+        Open a feature store.
+
+        Args:
+            root_dir: Directory of the offline Parquet files
+            online_path: SQLite database of the online half (default:
+                online.db in root_dir; ':memory:' for a process-local cache)
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self.online_path = online_path or os.path.join(root_dir, 'online.db')
+        self._connection = sqlite3.connect(self.online_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def _offline_dir(self, feature_set: str, version: str) -> str:
+        return os.path.join(self.root_dir, feature_set, f"v{version}")
+
+    def write(
+        self,
+        feature_set: str,
+        features: pd.DataFrame,
+        sources: Sequence[Optional[str]] = None,
+        version: str = None
+    ) -> int:
+        """
+        Store features of many samples in both halves.
+
+        Args:
+            feature_set: Registered feature set name
+            features: One row per sample with a 'sample_id' column and one
+                numeric column per feature
+            sources: What each row was computed from, used to recompute it
+                when the extractor version changes
+            version: Extractor version (default: the registered version)
+
+        Returns:
+            Number of rows written
+        """
+        version = str(version or get_feature_set(feature_set).version)
+        if 'sample_id' not in features.columns:
+            raise ValueError("Features must have a sample_id column")
+        if not len(features):
+            return 0
+
+        rows = features.copy()
+        rows['sample_id'] = rows['sample_id'].astype(str)
+        feature_columns = [column for column in rows.columns if column not in KEY_COLUMNS]
+        rows['version'] = version
+        rows['source'] = list(sources) if sources is not None else None
+        rows['computed_at'] = datetime.utcnow().isoformat()
+
+        # Offline: a new part file per write, so concurrent writers never touch the same file
+        offline_dir = self._offline_dir(feature_set, version)
+        os.makedirs(offline_dir, exist_ok=True)
+        rows[KEY_COLUMNS + feature_columns].to_parquet(
+            os.path.join(offline_dir, f"part-{uuid.uuid4().hex}.parquet"), index=False
+        )
+
+        # Online: replace each sample's row
+        values = rows[feature_columns].astype(float).to_dict('records')
+        records = [
+            (sample_id, feature_set, version, source, computed_at, json.dumps(value))
+            for sample_id, source, computed_at, value in zip(
+                rows['sample_id'], rows['source'], rows['computed_at'], values
+            )
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO features "
+                "(sample_id, feature_set, version, source, computed_at, features) VALUES (?, ?, ?, ?, ?, ?)",
+                records
+            )
+
+        logger.info(f"Stored {len(rows)} {feature_set} feature rows (version {version})")
+        return len(rows)
+
+    def put(
+        self,
+        sample_id: str,
+        feature_set: str,
+        features: Dict[str, float],
+        source: str = None,
+        version: str = None
+    ) -> None:
+        """
+        Store the features of one sample in both halves.
+
+        Args:
+            sample_id: Sample ID
+            feature_set: Registered feature set name
+            features: Feature values by name
+            source: What the features were computed from
+            version: Extractor version (default: the registered version)
+        """
+        frame = pd.DataFrame([{'sample_id': sample_id, **features}])
+        self.write(feature_set, frame, sources=[source], version=version)
+
+    def get(self, sample_id: str, feature_set: str) -> Optional[Dict[str, float]]:
+        """
+        Read one sample's current features from the online half.
+
+        Args:
+            sample_id: Sample ID
+            feature_set: Registered feature set name
+
+        Returns:
+            Feature values by name, or None if the sample has no row or a
+            stale row that can't be recomputed
+        """
+        return self.get_many([sample_id], feature_set).get(str(sample_id))
+
+    def get_many(self, sample_ids: Sequence[str], feature_set: str) -> Dict[str, Dict[str, float]]:
+        """
+        Read the current features of many samples from the online half.
+
+        Stale rows are recomputed from their source and stored first.
+
+        Args:
+            sample_ids: Sample IDs
+            feature_set: Registered feature set name
+
+        Returns:
+            Feature values by name for each sample that has current features
+        """
+        current = get_feature_set(feature_set)
+        sample_ids = list(dict.fromkeys(str(sample_id) for sample_id in sample_ids))
+
+        rows = []
+        with self._lock:
+            # Stay below SQLite's limit on query parameters
+            for start in range(0, len(sample_ids), 500):
+                batch = sample_ids[start:start + 500]
+                rows.extend(self._connection.execute(
+                    f"SELECT sample_id, version, source, features FROM features "
+                    f"WHERE feature_set = ? AND sample_id IN ({', '.join('?' * len(batch))})",
+                    [feature_set, *batch]
+                ).fetchall())
+
+        results = {}
+        stale = []
+        for sample_id, version, source, values in rows:
+            if version == current.version:
+                results[sample_id] = json.loads(values)
+            else:
+                stale.append((sample_id, source))
+        results.update(self._recompute(current, stale))
+        return results
+
+    def _recompute(self, feature_set: FeatureSet, stale: List[tuple]) -> Dict[str, Dict[str, float]]:
+        """Recompute stale rows from their sources with the current extractor and store them."""
+        recomputed = {}
+        if not stale:
+            return recomputed
+        if feature_set.compute is None:
+            logger.warning(f"{len(stale)} stale {feature_set.name} feature rows and no extractor to recompute them")
+            return recomputed
+
+        for sample_id, source in stale:
+            features = feature_set.compute(source) if source else None
+            if features is None:
+                logger.warning(f"Could not recompute {feature_set.name} features of sample {sample_id} from {source}")
+                continue
+            self.put(sample_id, feature_set.name, features, source=source, version=feature_set.version)
+            recomputed[sample_id] = features
+
+        logger.info(f"Recomputed {len(recomputed)} of {len(stale)} stale {feature_set.name} feature rows "
+                    f"with extractor version {feature_set.version}")
+        return recomputed
+
+    def stale_samples(self, feature_set: str) -> List[str]:
+        """
+        List samples whose stored features came from another extractor version.
+
+        Args:
+            feature_set: Registered feature set name
+
+        Returns:
+            Sample IDs with stale rows
+        """
+        current = get_feature_set(feature_set)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT sample_id FROM features WHERE feature_set = ? AND version != ?",
+                (feature_set, current.version)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def refresh_stale(self, feature_set: str) -> int:
+        """
+        Recompute every stale row of a feature set.
+
+        Args:
+            feature_set: Registered feature set name
+
+        Returns:
+            Number of rows recomputed
+        """
+        current = get_feature_set(feature_set)
+        with self._lock:
+            stale = self._connection.execute(
+                "SELECT sample_id, source FROM features WHERE feature_set = ? AND version != ?",
+                (feature_set, current.version)
+            ).fetchall()
+        return len(self._recompute(current, stale))
+
+    def _offline_parts(self, offline_dir: str) -> List[str]:
+        if not os.path.isdir(offline_dir):
+            return []
+        return sorted(os.path.join(offline_dir, name) for name in os.listdir(offline_dir) if name.endswith('.parquet'))
+
+    def read_offline(self, feature_set: str, version: str = None) -> pd.DataFrame:
+        """
+        Read the offline features of one extractor version, e.g. for training.
+
+        Args:
+            feature_set: Feature set name
+            version: Extractor version (default: the registered version)
+
+        Returns:
+            DataFrame with the latest row per sample: the KEY_COLUMNS and one
+            column per feature (empty if nothing was stored)
+        """
+        version = str(version or get_feature_set(feature_set).version)
+        offline_dir = self._offline_dir(feature_set, version)
+        for attempt in range(_READ_ATTEMPTS):
+            parts = self._offline_parts(offline_dir)
+            if not parts:
+                return pd.DataFrame(columns=KEY_COLUMNS)
+            try:
+                frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+                break
+            except FileNotFoundError:
+                # A concurrent compaction merged the parts; list them again
+                if attempt == _READ_ATTEMPTS - 1:
+                    raise
+
+        return (
+            frame.sort_values('computed_at', kind='stable')
+            .drop_duplicates('sample_id', keep='last')
+            .reset_index(drop=True)
+        )
+
+    def compact_offline(self, feature_set: str, version: str = None) -> int:
+        """
+        Merge the offline part files of one version into a single file.
+
+        Every write adds a part file, so run this before reading the offline
+        half in bulk; ``BioactivityModel.train_models`` does.
+
+        Args:
+            feature_set: Feature set name
+            version: Extractor version (default: the registered version)
+
+        Returns:
+            Number of part files merged
+        """
+        version = str(version or get_feature_set(feature_set).version)
+        offline_dir = self._offline_dir(feature_set, version)
+        old_parts = self._offline_parts(offline_dir)
+        if len(old_parts) <= 1:
+            return 0
+        frame = self.read_offline(feature_set, version)
+
+        # Write the merged file before removing the parts, so no rows are lost on failure
+        frame.to_parquet(os.path.join(offline_dir, f"part-{uuid.uuid4().hex}.parquet"), index=False)
+        for part in old_parts:
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass  # Removed by a concurrent compaction
+        logger.info(f"Compacted {len(old_parts)} {feature_set} part files (version {version}) into one "
+                    f"of {len(frame)} rows")
+        return len(old_parts)
+
+    def close(self) -> None:
+        """Close the online database."""
+        with self._lock:
+            self._connection.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """Return this process's feature store, configured from the active config."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = FeatureStore(
+                active_config.FEATURE_STORE_FOLDER,
+                online_path=active_config.FEATURE_STORE_ONLINE_DB
+            )
+        return _default_store
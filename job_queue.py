@@ -0,0 +1,598 @@
+"""
+Database-backed job queue for batch processing.
+
+Batch jobs are submitted by the API and web routes with status 'queued' and
+picked up by a pool of worker processes started with ``python main.py worker``.
+The ``batch_jobs`` table is the queue itself, so any database supported by
+SQLAlchemy (SQLite locally, PostgreSQL in production) can back it.
+"""
+
+import os
+import time
+import shutil
+import socket
+import logging
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from flask import current_app
+from sqlalchemy import func, or_, and_, select, text
+from sqlalchemy.orm import aliased
+
+from app import db
+from models import BatchJob
+from result_cache import compute_cache_key, find_cached_job, enforce_result_retention
+from batch_processor import (
+    STREAMING_FORMATS, RESULT_EXTENSIONS, DEFAULT_ROW_GROUP_SIZE,
+    process_batch, process_batch_streaming, process_batch_sharded, save_batch_results
+)
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL advisory lock serializing claims under a concurrency limit
+_CLAIM_LOCK_KEY = 0x6d79636f
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation has been requested."""
+
+
+def enqueue_batch_job(
+    name: str,
+    input_file: str,
+    parameters: Dict[str, Any] = None,
+    description: str = None,
+    priority: int = 0,
+    cache_key: str = None
+) -> BatchJob:
+    """
+    Create a batch job and place it on the queue.
+
+    Args:
+        name: Human readable job name
+        input_file: Path to the input CSV file
+        parameters: Processing parameters passed to process_batch
+        description: Optional job description
+        priority: Jobs with a higher priority are picked up first
+        cache_key: Result cache key of the submission, if any
+
+    Returns:
+        The queued BatchJob record
+    """
+    batch_job = BatchJob(
+        name=name,
+        description=description,
+        input_file=input_file,
+        parameters=parameters or {},
+        status='queued',
+        priority=priority,
+        cancel_requested=False,
+        queued_at=datetime.utcnow(),
+        cache_key=cache_key
+    )
+    db.session.add(batch_job)
+    db.session.commit()
+
+    logger.info(f"Queued batch job {batch_job.id} with priority {priority}")
+    return batch_job
+
+
+def submit_batch_job(
+    name: str,
+    input_file: str,
+    parameters: Dict[str, Any] = None,
+    description: str = None,
+    priority: int = 0
+) -> Tuple[BatchJob, bool]:
+    """
+    Submit a batch job, reusing the results of an identical earlier submission.
+
+    When RESULT_CACHE_ENABLED is set, the submission is keyed by the input
+    file's contents, the normalized parameters and the model version. If a
+    job with the same key has completed (or is still running), that job is
+    returned instead of queueing the work again.
+
+    Args:
+        name: Human readable job name
+        input_file: Path to the input CSV file
+        parameters: Processing parameters passed to process_batch
+        description: Optional job description
+        priority: Jobs with a higher priority are picked up first
+
+    Returns:
+        Tuple of (BatchJob, whether it is an existing identical job); check
+        the job's status, as the existing job may still be queued or running
+    """
+    cache_key = None
+    if current_app.config.get('RESULT_CACHE_ENABLED'):
+        try:
+            cache_key = compute_cache_key(input_file, parameters)
+        except OSError as e:
+            logger.warning(f"Could not hash input file {input_file}: {str(e)}")
+
+    if cache_key:
+        cached_job = find_cached_job(cache_key)
+        if cached_job is not None:
+            logger.info(f"Batch submission matches job {cached_job.id} ({cached_job.status})")
+            return cached_job, True
+
+    return enqueue_batch_job(name, input_file, parameters, description, priority, cache_key), False
+
+
+def cancel_batch_job(job_id: int) -> Optional[BatchJob]:
+    """
+    Cancel a batch job.
+
+    Queued jobs are cancelled immediately. Jobs that are already processing
+    are flagged and stopped by their worker at the next progress update.
+
+    Args:
+        job_id: ID of the batch job
+
+    Returns:
+        The updated BatchJob record, or None if it does not exist
+    """
+    job = BatchJob.query.get(job_id)
+    if not job:
+        return None
+
+    if job.status == 'queued':
+        # Guard against a worker claiming the job between the read and the update
+        updated = BatchJob.query.filter_by(id=job_id, status='queued').update({
+            'status': 'cancelled',
+            'cancel_requested': True,
+            'end_time': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            logger.info(f"Cancelled queued batch job {job_id}")
+            db.session.refresh(job)
+            return job
+        db.session.refresh(job)
+
+    if job.status == 'processing':
+        job.cancel_requested = True
+        db.session.commit()
+        logger.info(f"Cancellation requested for running batch job {job_id}")
+
+    return job
+
+
+def claim_next_job(worker_id: str, max_concurrent: int = None) -> Optional[BatchJob]:
+    """
+    Atomically claim the highest priority queued job.
+
+    The claim is a conditional UPDATE on the job's status, so two workers
+    racing for the same row cannot both win it. The concurrency limit is part
+    of the same UPDATE, so workers claiming different rows at once cannot
+    together exceed it either. SQLite runs the UPDATE under its database
+    write lock; on PostgreSQL, whose snapshots would let two such UPDATEs
+    count the same running jobs, limited claims also take an advisory lock.
+
+    Args:
+        worker_id: Identifier of the claiming worker
+        max_concurrent: Maximum number of jobs allowed to process at once
+
+    Returns:
+        The claimed BatchJob, or None if nothing can be run right now
+    """
+    conditions = [BatchJob.status == 'queued']
+    if max_concurrent:
+        running = aliased(BatchJob)
+        running_count = (
+            select(func.count(running.id)).where(running.status == 'processing').scalar_subquery()
+        )
+        if db.session.scalar(select(running_count)) >= max_concurrent:
+            return None  # Skip the claim attempts when the limit is already reached
+        conditions.append(running_count < max_concurrent)
+
+    candidates = BatchJob.query.filter_by(status='queued').order_by(
+        BatchJob.priority.desc(),
+        BatchJob.created_at.asc(),
+        BatchJob.id.asc()
+    ).with_entities(BatchJob.id).limit(10).all()
+
+    for (job_id,) in candidates:
+        if max_concurrent and db.engine.dialect.name == 'postgresql':
+            db.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _CLAIM_LOCK_KEY})
+        now = datetime.utcnow()
+        claimed = BatchJob.query.filter(BatchJob.id == job_id, *conditions).update({
+            'status': 'processing',
+            'worker_id': worker_id,
+            'start_time': now,
+            'heartbeat_at': now,
+            'attempts': func.coalesce(BatchJob.attempts, 0) + 1
+        }, synchronize_session=False)
+        db.session.commit()
+
+        if claimed:
+            return BatchJob.query.get(job_id)
+
+    return None
+
+
+def recover_stale_jobs(stale_after: float = None, max_attempts: int = None) -> int:
+    """
+    Requeue processing jobs whose worker has stopped sending heartbeats.
+
+    A requeued job keeps its checkpoint, so the next worker to claim it
+    resumes from the last completed chunk. Jobs that have already been
+    attempted ``max_attempts`` times are failed instead, and jobs with a
+    pending cancellation are cancelled.
+
+    Args:
+        stale_after: Seconds without a heartbeat before a job is considered
+            abandoned (default: BATCH_STALE_AFTER)
+        max_attempts: Maximum number of claims per job (default: BATCH_MAX_ATTEMPTS)
+
+    Returns:
+        Number of jobs recovered
+    """
+    if stale_after is None:
+        stale_after = current_app.config['BATCH_STALE_AFTER']
+    if max_attempts is None:
+        max_attempts = current_app.config['BATCH_MAX_ATTEMPTS']
+
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    stale_jobs = BatchJob.query.filter(
+        BatchJob.status == 'processing',
+        or_(
+            BatchJob.heartbeat_at < cutoff,
+            and_(BatchJob.heartbeat_at.is_(None), BatchJob.start_time < cutoff)
+        )
+    ).all()
+
+    recovered = 0
+    for job in stale_jobs:
+        job_id, worker_id = job.id, job.worker_id
+        if job.cancel_requested:
+            values = {'status': 'cancelled', 'end_time': datetime.utcnow()}
+        elif max_attempts and (job.attempts or 0) >= max_attempts:
+            values = {
+                'status': 'failed',
+                'error_message': f"Worker {worker_id} stopped responding after {job.attempts} attempts",
+                'end_time': datetime.utcnow()
+            }
+        else:
+            values = {'status': 'queued', 'worker_id': None}
+
+        # Only win the row if no worker touched it since it was read
+        updated = BatchJob.query.filter(
+            BatchJob.id == job_id,
+            BatchJob.status == 'processing',
+            BatchJob.heartbeat_at == job.heartbeat_at
+        ).update(values, synchronize_session=False)
+        db.session.commit()
+
+        if not updated:
+            continue
+
+        recovered += 1
+        if values['status'] == 'queued':
+            logger.warning(f"Requeued stale batch job {job_id} abandoned by worker {worker_id}")
+        else:
+            _clear_checkpoint(job)
+            logger.warning(f"Stale batch job {job_id} marked {values['status']}")
+
+    return recovered
+
+
+def _clear_checkpoint(job: BatchJob) -> None:
+    """Delete a job's checkpoint directory and forget it."""
+    if job.checkpoint_path:
+        shutil.rmtree(job.checkpoint_path, ignore_errors=True)
+        job.checkpoint_path = None
+        db.session.commit()
+
+
+class _JobHeartbeat:
+    """Background thread that periodically stamps a processing job as alive."""
+
+    def __init__(self, app, job_id: int, interval: float):
+        self.app = app
+        self.job_id = job_id
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            while not self._stop_event.wait(self.interval):
+                try:
+                    BatchJob.query.filter_by(id=self.job_id, status='processing').update(
+                        {'heartbeat_at': datetime.utcnow()}, synchronize_session=False
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Heartbeat for batch job {self.job_id} failed: {str(e)}")
+            db.session.remove()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+
+
+def _make_progress_callback(job_id: int):
+    """Build a progress callback that records progress and honours cancellation."""
+    def progress_callback(processed_records: int, total_records: int) -> None:
+        job = BatchJob.query.get(job_id)
+        job.processed_records = processed_records
+        job.total_records = total_records
+        db.session.commit()
+
+        if job.cancel_requested:
+            raise JobCancelled(f"Batch job {job_id} was cancelled")
+
+    return progress_callback
+
+
+def _use_streaming(input_file: str, parameters: Dict[str, Any]) -> bool:
+    """Decide whether a job should be processed in streaming mode."""
+    if 'streaming' in parameters:
+        return bool(parameters['streaming'])
+
+    threshold = current_app.config['BATCH_STREAMING_THRESHOLD_MB'] * 1024 * 1024
+    try:
+        return os.path.getsize(input_file) >= threshold
+    except OSError:
+        return False
+
+
+def _shard_workers(parameters: Dict[str, Any]) -> int:
+    """Number of processes to score a job with, capped at the core count."""
+    try:
+        workers = int(parameters.get('workers') or 1)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(workers, os.cpu_count() or 1))
+
+
+def run_batch_job(job: BatchJob) -> BatchJob:
+    """
+    Run a claimed batch job to completion and record the outcome.
+
+    Args:
+        job: BatchJob in 'processing' status
+
+    Returns:
+        The updated BatchJob record
+    """
+    job_id = job.id
+    parameters = job.parameters or {}
+    output_format = parameters.get('output_format', 'csv')
+
+    output_file = os.path.join(
+        current_app.config['RESULTS_FOLDER'],
+        f"batch_{job_id}_results.{RESULT_EXTENSIONS.get(output_format, output_format)}"
+    )
+    progress_callback = _make_progress_callback(job_id)
+    chunk_size = parameters.get('chunk_size') or current_app.config['BATCH_CHUNK_SIZE']
+    workers = _shard_workers(parameters)
+
+    checkpoint_dir = None
+    if current_app.config.get('BATCH_CHECKPOINTS_ENABLED'):
+        checkpoint_dir = os.path.join(current_app.config['RESULTS_FOLDER'], 'checkpoints', f"job_{job_id}")
+        job.checkpoint_path = checkpoint_dir
+        db.session.commit()
+
+    heartbeat = _JobHeartbeat(
+        current_app._get_current_object(),
+        job_id,
+        current_app.config['BATCH_HEARTBEAT_INTERVAL']
+    )
+    heartbeat.start()
+
+    try:
+        if output_format not in RESULT_EXTENSIONS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        if workers > 1:
+            if output_format not in STREAMING_FORMATS:
+                raise ValueError(f"Sharded mode does not support {output_format} output")
+            process_batch_sharded(
+                job.input_file,
+                output_file,
+                job_id,
+                parameters,
+                workers=workers,
+                chunk_size=chunk_size,
+                progress_callback=progress_callback,
+                format=output_format,
+                checkpoint_dir=checkpoint_dir
+            )
+            job = BatchJob.query.get(job_id)
+        elif _use_streaming(job.input_file, parameters):
+            if output_format not in STREAMING_FORMATS:
+                raise ValueError(f"Streaming mode does not support {output_format} output")
+            process_batch_streaming(
+                job.input_file,
+                output_file,
+                job_id,
+                parameters,
+                chunk_size=chunk_size,
+                progress_callback=progress_callback,
+                format=output_format,
+                checkpoint_dir=checkpoint_dir
+            )
+            job = BatchJob.query.get(job_id)
+        else:
+            result = process_batch(
+                job.input_file,
+                job_id,
+                parameters,
+                progress_callback=progress_callback
+            )
+            save_batch_results(
+                result,
+                output_file,
+                output_format,
+                compression=parameters.get('compression'),
+                row_group_size=parameters.get('row_group_size') or DEFAULT_ROW_GROUP_SIZE
+            )
+
+            job = BatchJob.query.get(job_id)
+            job.total_records = len(result)
+            job.processed_records = len(result)
+
+        job.status = 'completed'
+        job.output_file = output_file
+        logger.info(f"Batch job {job_id} completed")
+
+    except JobCancelled:
+        db.session.rollback()
+        job = BatchJob.query.get(job_id)
+        job.status = 'cancelled'
+        logger.info(f"Batch job {job_id} cancelled while processing")
+
+    except Exception as e:
+        db.session.rollback()
+        job = BatchJob.query.get(job_id)
+        job.status = 'failed'
+        job.error_message = str(e)
+        logger.error(f"Batch job {job_id} failed: {str(e)}")
+
+    heartbeat.stop()
+    job.end_time = datetime.utcnow()
+    db.session.commit()
+    # Completed runs remove their own checkpoint; failed and cancelled runs are not resumed
+    _clear_checkpoint(job)
+
+    if job.status == 'completed' and current_app.config.get('RESULT_CACHE_ENABLED'):
+        try:
+            enforce_result_retention(keep_job_id=job_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Result cache eviction failed: {str(e)}")
+
+    return job
+
+
+def worker_loop(
+    worker_id: str,
+    poll_interval: float = 2.0,
+    max_concurrent: int = None,
+    stop_event=None
+) -> None:
+    """
+    Poll the queue and run jobs until the stop event is set.
+
+    Jobs abandoned by dead workers are requeued when the loop starts and
+    then every BATCH_STALE_AFTER seconds.
+
+    Must be called inside an application context.
+
+    Args:
+        worker_id: Identifier of this worker
+        poll_interval: Seconds to sleep when the queue is empty
+        max_concurrent: Maximum number of jobs processing across all workers
+        stop_event: Optional multiprocessing.Event used to stop the loop
+    """
+    logger.info(f"Batch worker {worker_id} started")
+    stale_after = current_app.config['BATCH_STALE_AFTER']
+    next_recovery = 0.0
+
+    while stop_event is None or not stop_event.is_set():
+        if time.monotonic() >= next_recovery:
+            try:
+                recover_stale_jobs(stale_after)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Worker {worker_id} could not recover stale jobs: {str(e)}")
+            next_recovery = time.monotonic() + stale_after
+
+        try:
+            job = claim_next_job(worker_id, max_concurrent)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Worker {worker_id} could not claim a job: {str(e)}")
+            job = None
+
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} picked up batch job {job.id}")
+        run_batch_job(job)
+        db.session.remove()
+
+    logger.info(f"Batch worker {worker_id} stopped")
+
+
+def _worker_main(worker_id: str, poll_interval: float, max_concurrent: int, stop_event) -> None:
+    """Entry point of a worker process."""
+    # Each process builds its own app so it gets its own database connections
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        try:
+            worker_loop(worker_id, poll_interval, max_concurrent, stop_event)
+        except KeyboardInterrupt:
+            pass
+
+
+class BatchWorkerPool:
+    """Pool of worker processes consuming the batch job queue."""
+
+    def __init__(self, workers: int = 2, poll_interval: float = 2.0, max_concurrent: int = None):
+        """
+        Initialize the worker pool.
+
+        Args:
+            workers: Number of worker processes
+            poll_interval: Seconds each worker sleeps when the queue is empty
+            max_concurrent: Maximum number of jobs processing at once across
+                every pool sharing the database
+        """
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_concurrent = max_concurrent
+        self.stop_event = multiprocessing.Event()
+        self.processes: List[multiprocessing.Process] = []
+
+    def start(self) -> None:
+        """Start the worker processes."""
+        hostname = socket.gethostname()
+
+        for i in range(self.workers):
+            worker_id = f"{hostname}-{os.getpid()}-{i}"
+            process = multiprocessing.Process(
+                target=_worker_main,
+                args=(worker_id, self.poll_interval, self.max_concurrent, self.stop_event),
+                # Not daemonic, so a worker can fan a job out over its own process pool
+                name=f"batch-worker-{i}"
+            )
+            process.start()
+            self.processes.append(process)
+
+        logger.info(f"Started {self.workers} batch worker processes")
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Ask the workers to stop once their current job finishes and wait for them.
+
+        Args:
+            timeout: Seconds to wait for each worker before terminating it
+        """
+        self.stop_event.set()
+
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"Terminating unresponsive worker {process.name}")
+                process.terminate()
+                process.join()
+
+        self.processes = []
+        logger.info("Batch worker pool stopped")
+
+    def join(self) -> None:
+        """Block until every worker process exits."""
+        for process in self.processes:
+            process.join()
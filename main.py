@@ -11,8 +11,11 @@ import json
 from datetime import datetime
 
 from app import create_app
-from model import load_model
-from batch_processor import process_batch, save_batch_results
+from model import ENGINES
+from batch_processor import (
+    STREAMING_FORMATS, RESULT_EXTENSIONS,
+    process_batch, process_batch_streaming, process_batch_sharded, save_batch_results
+)
 from monitoring import start_metrics_collection_thread
 
 # Create a Flask application instance for Gunicorn to use
@@ -57,8 +60,29 @@ def parse_arguments():
     batch_parser.add_argument('input_file', help='Path to input CSV file')
     batch_parser.add_argument('--output-file', help='Path to output file')
     batch_parser.add_argument('--config', help='Path to configuration file')
-    batch_parser.add_argument('--format', choices=['csv', 'excel'], default='csv',
+    batch_parser.add_argument('--format', choices=['csv', 'excel', 'parquet', 'feather'], default='csv',
                              help='Output file format (default: csv)')
+    batch_parser.add_argument('--model-key',
+                             help='Score with this registered model instead of training')
+    batch_parser.add_argument('--retrain', action='store_true',
+                             help='Fit a model on this data instead of reusing the latest registered one')
+    batch_parser.add_argument('--stream', action='store_true',
+                             help='Process the input in chunks to bound memory use (not for excel output)')
+    batch_parser.add_argument('--chunk-size', type=int, default=100000,
+                             help='Rows per chunk in streaming mode (default: 100000)')
+    batch_parser.add_argument('--workers', type=int, default=1,
+                             help='Score shards of the input on this many processes (not for excel output)')
+    batch_parser.add_argument('--compression',
+                             help='Codec for parquet/feather output (default: zstd for parquet, lz4 for feather)')
+    
+    # Batch worker command
+    worker_parser = subparsers.add_parser('worker', help='Run batch job queue workers')
+    worker_parser.add_argument('--workers', type=int,
+                              help='Number of worker processes (default: BATCH_WORKERS)')
+    worker_parser.add_argument('--max-concurrent', type=int,
+                              help='Maximum jobs processing at once (default: BATCH_MAX_CONCURRENT_JOBS)')
+    worker_parser.add_argument('--poll-interval', type=float,
+                              help='Seconds between queue polls when idle (default: BATCH_POLL_INTERVAL)')
     
     # Model command
     model_parser = subparsers.add_parser('model', help='Model operations')
@@ -74,6 +98,16 @@ def parse_arguments():
                              help='List of feature columns (default: all numeric columns)')
     train_parser.add_argument('--model-type', choices=['regressor', 'classifier'], 
                              default='regressor', help='Type of model to train')
+    train_parser.add_argument('--engine', choices=ENGINES, default='random_forest',
+                             help='Estimator family; sgd trains out of core, chunk by chunk, and '
+                                  'hist_gradient_boosting is smaller and faster to predict than the forest')
+    train_parser.add_argument('--incremental', metavar='MODEL',
+                             help='Existing model artifact to continue training on the new data only '
+                                  '(adds trees to a random forest, partial_fit for sgd)')
+    train_parser.add_argument('--add-estimators', type=int, default=50,
+                             help='Trees to add to a random forest in incremental mode (default: 50)')
+    train_parser.add_argument('--chunk-size', type=int,
+                             help='Rows per chunk for out-of-core training (default: 100000)')
     
     # Model predict command
     predict_parser = model_subparsers.add_parser('predict', help='Make predictions with a model')
@@ -82,6 +116,85 @@ def parse_arguments():
     predict_parser.add_argument('--output-file', help='Path to save predictions')
     predict_parser.add_argument('--feature-columns', nargs='+',
                                help='List of feature columns (default: all numeric columns)')
+    predict_parser.add_argument('--interval', choices=['normal', 'quantile'],
+                               help='How regressor intervals are derived from the trees (default: the model\'s setting)')
+    predict_parser.add_argument('--confidence', type=float,
+                               help='Regressor interval coverage (default: the model\'s setting, 0.95)')
+    
+    # Model compact command
+    compact_parser = model_subparsers.add_parser('compact', help='Build a smaller, faster copy of a forest model')
+    compact_parser.add_argument('model_file', help='Path to the model file')
+    compact_parser.add_argument('--output-file', help='Path to save the compacted model')
+    compact_parser.add_argument('--validation-data', help='CSV of held-out rows used to prune within the budget')
+    compact_parser.add_argument('--target-column', help='Name of the target column in the validation data')
+    compact_parser.add_argument('--accuracy-budget', type=float, default=0.0,
+                               help='Largest allowed drop of validation R2 or accuracy from pruning '
+                                    'trees and nodes (default: 0, no pruning)')
+    compact_parser.add_argument('--min-trees', type=int, default=25,
+                               help='Fewest trees pruning may leave (default: 25)')
+    compact_parser.add_argument('--report', help='Path of a JSON size and latency report')
+    
+    # Model publish command
+    publish_parser = model_subparsers.add_parser('publish', help='Publish a model for API serving')
+    publish_source = publish_parser.add_mutually_exclusive_group(required=True)
+    publish_source.add_argument('model_file', nargs='?', help='Path to the model file')
+    publish_source.add_argument('--model-key', help='Publish this registered model')
+    publish_parser.add_argument('--version', help='Version label (default: file name and modification time)')
+    
+    # Bioactivity commands
+    bioactivity_parser = subparsers.add_parser('bioactivity', help='Compound bioactivity model operations')
+    bioactivity_subparsers = bioactivity_parser.add_subparsers(dest='bioactivity_command', help='Bioactivity command')
+    
+    # Bioactivity train command
+    bio_train_parser = bioactivity_subparsers.add_parser('train', help='Train the compound bioactivity models')
+    bio_train_parser.add_argument('--training-data', help='Path to training data CSV (default: synthetic data)')
+    bio_train_parser.add_argument('--workers', type=int,
+                                 help='Pipelines fitted concurrently (default: up to one per core; 1 for sequential)')
+    bio_train_parser.add_argument('--compare-sequential', action='store_true',
+                                 help='Also train one pipeline after another first and report the speedup')
+    bio_train_parser.add_argument('--report', help='Path of a JSON timing and metrics report')
+    
+    # Bioactivity score command
+    score_parser = bioactivity_subparsers.add_parser('score', help='Score a CSV of samples with the bioactivity models')
+    score_parser.add_argument('input_file', help='Path to a CSV with one sample per row')
+    score_parser.add_argument('--output-file', help='Path to save the scored samples')
+    score_parser.add_argument('--no-vision', action='store_true', help='Exclude computer vision features')
+    score_parser.add_argument('--no-spectral', action='store_true', help='Exclude spectral analysis features')
+    score_parser.add_argument('--chunk-size', type=int, default=100000,
+                             help='Rows scored per predict call (default: 100000)')
+    score_parser.add_argument('--use-feature-store', action='store_true',
+                             help='Fill vision features from the feature store by the sample_id column')
+    
+    # Bioactivity compact-features command
+    compact_features_parser = bioactivity_subparsers.add_parser(
+        'compact-features', help='Merge the offline feature store files written per stored image')
+    compact_features_parser.add_argument('--feature-set', default='vision', help='Feature set to compact (default: vision)')
+    compact_features_parser.add_argument('--version', help='Extractor version (default: the current one)')
+    
+    # Tune command
+    tune_parser = subparsers.add_parser('tune', help='Cross-validated hyperparameter search')
+    tune_parser.add_argument('input_file', help='Path to training data CSV')
+    tune_parser.add_argument('--target-column', required=True, help='Name of the target column')
+    tune_parser.add_argument('--feature-columns', nargs='+',
+                            help='List of feature columns (default: all numeric columns)')
+    tune_parser.add_argument('--model-type', choices=['regressor', 'classifier'], default='regressor',
+                            help='Type of model to tune')
+    tune_parser.add_argument('--engine', choices=ENGINES, default='random_forest',
+                            help='Estimator family to tune')
+    tune_parser.add_argument('--param-grid', help='JSON file mapping estimator parameters to candidate values')
+    tune_parser.add_argument('--cv', type=int, default=5, help='Cross-validation folds (default: 5)')
+    tune_parser.add_argument('--factor', type=int, default=3,
+                            help='Successive halving factor: keep 1/factor of candidates per round (default: 3)')
+    tune_parser.add_argument('--scoring', help='sklearn scoring name (default: r2 or accuracy)')
+    tune_parser.add_argument('--n-jobs', type=int, default=-1, help='Worker processes (default: all cores)')
+    tune_parser.add_argument('--cache-dir', help='Directory to cache scaled fold matrices in')
+    tune_parser.add_argument('--output-file', help='Path to save the best model')
+    tune_parser.add_argument('--leaderboard', help='Path of the leaderboard report (.csv or .json)')
+    
+    # Benchmark command
+    benchmark_parser = subparsers.add_parser('benchmark', help='Benchmark batch processing throughput')
+    benchmark_parser.add_argument('benchmark_args', nargs=argparse.REMAINDER,
+                                 help='Arguments passed to benchmark.py (see python benchmark.py --help)')
     
     # Version command
     version_parser = subparsers.add_parser('version', help='Show version information')
@@ -105,7 +218,9 @@ def run_server(host, port, debug, api_only=False):
     app.run(host=host, port=port, debug=debug)
 
 
-def run_batch_processing(input_file, output_file=None, config=None, format='csv'):
+def run_batch_processing(input_file, output_file=None, config=None, format='csv',
+                         stream=False, chunk_size=100000, model_key=None, retrain=False, workers=1,
+                         compression=None):
     """Run batch processing on input file."""
     logger.info(f"Starting batch processing for file: {input_file}")
     
@@ -120,18 +235,36 @@ def run_batch_processing(input_file, output_file=None, config=None, format='csv'
             logger.error(f"Error loading configuration: {str(e)}")
             sys.exit(1)
     
+    if model_key:
+        parameters['model_key'] = model_key
+    if retrain:
+        parameters['retrain'] = True
+    if compression:
+        parameters['compression'] = compression
+    
     # Process the batch
     try:
-        results = process_batch(input_file, parameters=parameters)
-        
         # Determine output file path if not provided
         if not output_file:
             input_name = os.path.splitext(os.path.basename(input_file))[0]
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            output_file = f"{input_name}_results_{timestamp}.{format}"
+            output_file = f"{input_name}_results_{timestamp}.{RESULT_EXTENSIONS[format]}"
         
-        # Save results
-        save_batch_results(results, output_file, format)
+        if (stream or workers > 1) and format not in STREAMING_FORMATS:
+            logger.error(f"Streaming and sharded modes do not support {format} output")
+            sys.exit(1)
+        
+        if workers > 1:
+            process_batch_sharded(input_file, output_file, parameters=parameters,
+                                  workers=workers, chunk_size=chunk_size, format=format)
+        elif stream:
+            process_batch_streaming(input_file, output_file, parameters=parameters,
+                                    chunk_size=chunk_size, format=format)
+        else:
+            results = process_batch(input_file, parameters=parameters)
+            
+            # Save results
+            save_batch_results(results, output_file, format, compression)
         logger.info(f"Batch processing completed. Results saved to {output_file}")
         
     except Exception as e:
@@ -139,60 +272,104 @@ def run_batch_processing(input_file, output_file=None, config=None, format='csv'
         sys.exit(1)
 
 
-def train_model(input_file, target_column, output_file=None, feature_columns=None, model_type='regressor'):
-    """Train a new model."""
-    logger.info(f"Training {model_type} model using {input_file}")
+def run_batch_workers(workers=None, max_concurrent=None, poll_interval=None):
+    """Run a pool of batch job queue workers until interrupted."""
+    from config import active_config
+    from job_queue import BatchWorkerPool
+    
+    pool = BatchWorkerPool(
+        workers=workers or active_config.BATCH_WORKERS,
+        poll_interval=poll_interval or active_config.BATCH_POLL_INTERVAL,
+        max_concurrent=max_concurrent or active_config.BATCH_MAX_CONCURRENT_JOBS
+    )
+    pool.start()
+    
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        logger.info("Shutting down batch workers")
+        pool.stop(timeout=30)
+
+
+def train_model(input_file, target_column, output_file=None, feature_columns=None, model_type='regressor',
+                engine='random_forest', incremental=None, add_estimators=50, chunk_size=None):
+    """Train a new model, or continue training an existing one on new data."""
+    from model import MycolModel
+    from training import (
+        DEFAULT_TRAINING_CHUNK_SIZE, hash_file, resolve_feature_columns,
+        train_warm_start, train_out_of_core
+    )
+    
+    chunk_size = chunk_size or DEFAULT_TRAINING_CHUNK_SIZE
     
     try:
-        # Load data
-        import pandas as pd
-        df = pd.read_csv(input_file)
+        data_hash = hash_file(input_file)
         
-        # Validate target column
-        if target_column not in df.columns:
-            logger.error(f"Target column '{target_column}' not found in input file")
-            sys.exit(1)
+        if incremental:
+            # Continue training an existing model on the new data only
+            model = MycolModel.load(incremental, trainable=True)
+            model_type = model.model_type
+            logger.info(f"Incrementally training {model.engine} {model_type} model {incremental} using {input_file}")
+            
+            if model.has_seen(data_hash):
+                logger.warning(f"Model {incremental} has already been trained on {input_file}; nothing to do")
+                return
+            
+            if hasattr(model.model, 'partial_fit'):
+                rows = train_out_of_core(model, input_file, target_column, chunk_size=chunk_size)
+                mode = 'partial_fit'
+            else:
+                rows = train_warm_start(model, input_file, target_column, add_estimators=add_estimators)
+                mode = 'warm_start'
         
-        # Determine feature columns
-        if feature_columns:
-            # Validate feature columns
-            missing_cols = [col for col in feature_columns if col not in df.columns]
-            if missing_cols:
-                logger.warning(f"Missing feature columns: {missing_cols}")
-                feature_columns = [col for col in feature_columns if col in df.columns]
-        else:
-            # Use all numeric columns except target as features
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if target_column in numeric_cols:
-                numeric_cols.remove(target_column)
-            feature_columns = numeric_cols
-        
-        logger.info(f"Using features: {feature_columns}")
+        elif engine == 'sgd':
+            # Linear engine trained out of core, chunk by chunk
+            logger.info(f"Training sgd {model_type} model using {input_file} in chunks of {chunk_size}")
+            model = MycolModel(model_type=model_type, engine=engine)
+            rows = train_out_of_core(model, input_file, target_column, feature_columns, chunk_size=chunk_size)
+            mode = 'partial_fit'
         
-        # Extract features and target
-        X = df[feature_columns]
-        y = df[target_column]
+        else:
+            logger.info(f"Training {engine} {model_type} model using {input_file}")
+            
+            # Load data
+            import pandas as pd
+            df = pd.read_csv(input_file)
+            
+            # Determine feature columns
+            feature_columns = resolve_feature_columns(df, target_column, feature_columns)
+            logger.info(f"Using features: {feature_columns}")
+            
+            # Extract features and target
+            X = df[feature_columns]
+            y = df[target_column]
+            
+            # Create and train model
+            model = MycolModel(model_type=model_type, engine=engine)
+            model.fit(X, y)
+            rows = len(df)
+            mode = 'full'
         
-        # Create and train model
-        model = load_model(model_type=model_type)
-        model.fit(X, y)
+        # Record the data this model has been trained on
+        model.record_training(mode, rows, source=os.path.abspath(input_file), data_hash=data_hash)
         
         # Determine output file path if not provided
         if not output_file:
             input_name = os.path.splitext(os.path.basename(input_file))[0]
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            output_file = f"model_{model_type}_{input_name}_{timestamp}.pkl"
+            output_file = f"model_{model_type}_{input_name}_{timestamp}.model"
         
-        # Save model
-        model.save(output_file)
-        logger.info(f"Model trained and saved to {output_file}")
+        # Save model together with its estimator, so it can be trained further
+        model.save(output_file, include_estimator=True)
+        logger.info(f"Model trained ({mode}, {rows} rows) and saved to {output_file}")
         
     except Exception as e:
         logger.error(f"Error training model: {str(e)}")
         sys.exit(1)
 
 
-def predict_with_model(model_file, input_file, output_file=None, feature_columns=None):
+def predict_with_model(model_file, input_file, output_file=None, feature_columns=None,
+                       interval_method=None, confidence=None):
     """Make predictions with a model."""
     logger.info(f"Making predictions using model {model_file} on {input_file}")
     
@@ -222,19 +399,17 @@ def predict_with_model(model_file, input_file, output_file=None, feature_columns
         X = df[feature_columns]
         
         # Make predictions
-        predictions = model.predict(X)
+        predictions = model.predict_arrays(X, interval_method=interval_method, confidence=confidence)
         
         # Add predictions to dataframe
         if model.model_type == 'regressor':
-            df['predicted_bioactivity'] = predictions['bioactivity_scores']
+            df['predicted_bioactivity'] = predictions.scores
             # Add confidence intervals
-            ci_low = [ci[0] for ci in predictions['confidence_intervals']]
-            ci_high = [ci[1] for ci in predictions['confidence_intervals']]
-            df['predicted_ci_low'] = ci_low
-            df['predicted_ci_high'] = ci_high
+            df['predicted_ci_low'] = predictions.lower
+            df['predicted_ci_high'] = predictions.upper
         else:
-            df['predicted_category'] = predictions['categories']
-            df['predicted_probability'] = predictions['probabilities']
+            df['predicted_category'] = predictions.categories
+            df['predicted_probability'] = predictions.probabilities
         
         # Determine output file path if not provided
         if not output_file:
@@ -251,6 +426,210 @@ def predict_with_model(model_file, input_file, output_file=None, feature_columns
         sys.exit(1)
 
 
+def train_bioactivity(training_data=None, workers=None, compare_sequential=False, report_file=None):
+    """Train the compound bioactivity models and report per-pipeline and total training time."""
+    logger.info("Training compound bioactivity models")
+    
+    try:
+        from ml_bioactivity import train_bioactivity_models
+        
+        report = {}
+        if compare_sequential:
+            sequential = train_bioactivity_models(training_data, workers=1)
+            report['sequential'] = sequential['training']
+        
+        metrics = train_bioactivity_models(training_data, workers=workers)
+        report['concurrent'] = metrics.pop('training')
+        report['metrics'] = metrics
+        if compare_sequential:
+            report['speedup'] = round(report['sequential']['wall_seconds'] / report['concurrent']['wall_seconds'], 2)
+        
+        if report_file:
+            with open(report_file, 'w') as f:
+                json.dump(report, f, indent=2, default=float)
+        
+        print(json.dumps(report, indent=2, default=float))
+        
+    except Exception as e:
+        logger.error(f"Error training bioactivity models: {str(e)}")
+        sys.exit(1)
+
+
+def score_bioactivity(input_file, output_file=None, include_vision=True, include_spectral=True,
+                      chunk_size=100000, use_feature_store=False):
+    """Score a CSV of samples with the compound bioactivity models, chunk by chunk."""
+    logger.info(f"Scoring bioactivity of samples in {input_file}")
+    
+    try:
+        import time
+        import pandas as pd
+        from ml_bioactivity import get_bioactivity_model
+        model = get_bioactivity_model()
+        
+        # Determine output file path if not provided
+        if not output_file:
+            input_name = os.path.splitext(os.path.basename(input_file))[0]
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            output_file = f"{input_name}_bioactivity_{timestamp}.csv"
+        
+        start = time.perf_counter()
+        total = 0
+        for i, chunk in enumerate(pd.read_csv(input_file, chunksize=chunk_size)):
+            results = model.predict_many(
+                chunk, include_vision=include_vision, include_spectral=include_spectral,
+                use_feature_store=use_feature_store
+            )
+            chunk = chunk.join(results.add_prefix('predicted_'))
+            chunk.to_csv(output_file, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            total += len(chunk)
+        elapsed = time.perf_counter() - start
+        
+        logger.info(f"Scored {total} samples in {elapsed:.2f}s; results saved to {output_file}")
+        
+    except Exception as e:
+        logger.error(f"Error scoring bioactivity: {str(e)}")
+        sys.exit(1)
+
+
+def compact_feature_store(feature_set='vision', version=None):
+    """Merge a feature set's offline part files into one file."""
+    logger.info(f"Compacting offline {feature_set} features")
+    
+    try:
+        import computer_vision  # noqa: F401  Registers the vision feature set
+        from feature_store import get_feature_store
+        
+        merged = get_feature_store().compact_offline(feature_set, version)
+        print(f"Merged {merged} part files of the {feature_set} feature set")
+        
+    except Exception as e:
+        logger.error(f"Error compacting feature store: {str(e)}")
+        sys.exit(1)
+
+
+def tune_hyperparameters(input_file, target_column, feature_columns=None, model_type='regressor',
+                         engine='random_forest', param_grid=None, cv=5, factor=3, scoring=None, n_jobs=-1,
+                         cache_dir=None, output_file=None, leaderboard_file=None):
+    """Search hyperparameters and save the best model and a leaderboard."""
+    logger.info(f"Tuning {engine} {model_type} model using {input_file}")
+    
+    try:
+        import pandas as pd
+        from training import hash_file, resolve_feature_columns
+        from tuning import tune_model, write_leaderboard
+        
+        grid = None
+        if param_grid:
+            with open(param_grid, 'r') as f:
+                grid = json.load(f)
+        
+        df = pd.read_csv(input_file)
+        feature_columns = resolve_feature_columns(df, target_column, feature_columns)
+        df = df.dropna(subset=feature_columns + [target_column])
+        logger.info(f"Using features: {feature_columns}")
+        
+        results = tune_model(
+            df[feature_columns], df[target_column],
+            model_type=model_type, engine=engine, param_grid=grid,
+            cv=cv, factor=factor, scoring=scoring, n_jobs=n_jobs, cache_dir=cache_dir
+        )
+        model = results['model']
+        model.record_training('tune', len(df), source=os.path.abspath(input_file), data_hash=hash_file(input_file))
+        
+        input_name = os.path.splitext(os.path.basename(input_file))[0]
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        output_file = output_file or f"model_{model_type}_{input_name}_{timestamp}_tuned.model"
+        leaderboard_file = leaderboard_file or f"leaderboard_{model_type}_{input_name}_{timestamp}.csv"
+        
+        model.save(output_file, include_estimator=True)
+        write_leaderboard(results, leaderboard_file)
+        
+        print(f"Best {results['scoring']}: {results['best_score']:.4f} with {results['best_params']}")
+        print(results['leaderboard'].head(10).to_string(index=False))
+        logger.info(f"Best model saved to {output_file}, leaderboard to {leaderboard_file}")
+        
+    except Exception as e:
+        logger.error(f"Error tuning model: {str(e)}")
+        sys.exit(1)
+
+
+def compact_model_file(model_file, output_file=None, validation_data=None, target_column=None,
+                       accuracy_budget=0.0, min_trees=25, report_file=None):
+    """Compact a forest model and report the size and latency savings."""
+    logger.info(f"Compacting model {model_file}")
+    
+    try:
+        from model import MycolModel
+        from model_compaction import compact_model
+        
+        model = MycolModel.load(model_file)
+        
+        X_val = y_val = None
+        if validation_data:
+            if not target_column:
+                logger.error("--target-column is required with --validation-data")
+                sys.exit(1)
+            import pandas as pd
+            df = pd.read_csv(validation_data)
+            X_val, y_val = df.drop(columns=[target_column]), df[target_column]
+        
+        results = compact_model(model, X_val, y_val, accuracy_budget=accuracy_budget, min_trees=min_trees)
+        report = results['report']
+        
+        if not output_file:
+            output_file = f"{os.path.splitext(model_file.rstrip(os.sep))[0]}_compact.model"
+        results['model'].save(output_file)
+        report['model_file'] = model_file
+        report['output_file'] = output_file
+        report['artifact_bytes'] = {
+            'before': _path_size(model_file),
+            'after': _path_size(output_file)
+        }
+        
+        if report_file:
+            with open(report_file, 'w') as f:
+                json.dump(report, f, indent=2)
+        
+        print(json.dumps(report, indent=2))
+        logger.info(f"Compacted model saved to {output_file}")
+        
+    except Exception as e:
+        logger.error(f"Error compacting model: {str(e)}")
+        sys.exit(1)
+
+
+def _path_size(path):
+    """Size in bytes of a file, or of all files in a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+def publish_serving_model(model_file=None, model_key=None, version=None):
+    """Publish a model artifact so running API workers swap it in."""
+    from model_serving import publish_model
+    
+    try:
+        if model_key:
+            from model_registry import get_model_registry
+            registry = get_model_registry()
+            if model_key not in registry:
+                logger.error(f"Model {model_key} is not registered")
+                sys.exit(1)
+            model_file = registry.artifact_path(model_key)
+            version = version or model_key
+        
+        pointer = publish_model(model_file, version)
+        logger.info(f"Published model {pointer['version']} for serving")
+        
+    except Exception as e:
+        logger.error(f"Error publishing model: {str(e)}")
+        sys.exit(1)
+
+
 def show_version():
     """Show version information."""
     print("Mycology Research Pipeline v0.1.0")
@@ -267,7 +646,11 @@ def main():
     elif args.command == 'api':
         run_server(args.host, args.port, args.debug, api_only=True)
     elif args.command == 'batch':
-        run_batch_processing(args.input_file, args.output_file, args.config, args.format)
+        run_batch_processing(args.input_file, args.output_file, args.config, args.format,
+                             args.stream, args.chunk_size, args.model_key, args.retrain,
+                             args.workers, args.compression)
+    elif args.command == 'worker':
+        run_batch_workers(args.workers, args.max_concurrent, args.poll_interval)
     elif args.command == 'model':
         if args.model_command == 'train':
             train_model(
@@ -275,18 +658,77 @@ def main():
                 args.target_column, 
                 args.output_file, 
                 args.feature_columns, 
-                args.model_type
+                args.model_type,
+                engine=args.engine,
+                incremental=args.incremental,
+                add_estimators=args.add_estimators,
+                chunk_size=args.chunk_size
             )
         elif args.model_command == 'predict':
             predict_with_model(
                 args.model_file,
                 args.input_file,
                 args.output_file,
-                args.feature_columns
+                args.feature_columns,
+                args.interval,
+                args.confidence
             )
+        elif args.model_command == 'compact':
+            compact_model_file(
+                args.model_file,
+                args.output_file,
+                validation_data=args.validation_data,
+                target_column=args.target_column,
+                accuracy_budget=args.accuracy_budget,
+                min_trees=args.min_trees,
+                report_file=args.report
+            )
+        elif args.model_command == 'publish':
+            publish_serving_model(args.model_file, args.model_key, args.version)
         else:
             logger.error("Please specify a valid model command")
             sys.exit(1)
+    elif args.command == 'bioactivity':
+        if args.bioactivity_command == 'train':
+            train_bioactivity(
+                args.training_data,
+                workers=args.workers,
+                compare_sequential=args.compare_sequential,
+                report_file=args.report
+            )
+        elif args.bioactivity_command == 'score':
+            score_bioactivity(
+                args.input_file,
+                args.output_file,
+                include_vision=not args.no_vision,
+                include_spectral=not args.no_spectral,
+                chunk_size=args.chunk_size,
+                use_feature_store=args.use_feature_store
+            )
+        elif args.bioactivity_command == 'compact-features':
+            compact_feature_store(args.feature_set, args.version)
+        else:
+            logger.error("Please specify a valid bioactivity command")
+            sys.exit(1)
+    elif args.command == 'tune':
+        tune_hyperparameters(
+            args.input_file,
+            args.target_column,
+            feature_columns=args.feature_columns,
+            model_type=args.model_type,
+            engine=args.engine,
+            param_grid=args.param_grid,
+            cv=args.cv,
+            factor=args.factor,
+            scoring=args.scoring,
+            n_jobs=args.n_jobs,
+            cache_dir=args.cache_dir,
+            output_file=args.output_file,
+            leaderboard_file=args.leaderboard
+        )
+    elif args.command == 'benchmark':
+        from benchmark import main as run_benchmark
+        run_benchmark(args.benchmark_args)
     elif args.command == 'version':
         show_version()
     else:
@@ -6,7 +6,12 @@ for predicting bioactive compounds and their properties in medicinal mushrooms.
 """
 
 import os
+import time
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Union, Any, Optional
@@ -17,6 +22,14 @@ from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, r2_score
 import joblib
+from threadpoolctl import threadpool_limits
+
+from config import active_config
+from feature_store import get_feature_store
+from monitoring import (
+    bioactivity_model_load_duration_seconds, bioactivity_model_loads_total,
+    bioactivity_prediction_duration_seconds
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -30,29 +43,147 @@ BIOACTIVITY_MODEL = os.path.join(MODEL_DIR, 'bioactivity_model.joblib')
 COMPOUND_CLASSIFIER = os.path.join(MODEL_DIR, 'compound_classifier.joblib')
 POTENCY_PREDICTOR = os.path.join(MODEL_DIR, 'potency_predictor.joblib')
 
+# Artifact file of each pipeline held by BioactivityModel
+PIPELINE_FILES = {
+    'compound_classifier': COMPOUND_CLASSIFIER,
+    'bioactivity_predictor': BIOACTIVITY_MODEL,
+    'potency_predictor': POTENCY_PREDICTOR
+}
+
+
+def _artifact_source(path: str) -> Optional[Tuple[int, int]]:
+    """Identity of an artifact file (modification time and size), or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _save_pipeline(pipeline: Pipeline, path: str) -> None:
+    """
+    Save a pipeline by writing a temporary file next to ``path`` and renaming
+    it into place, so a process reloading ``path`` never sees a partial file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(pipeline, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Model features and the value used when a sample doesn't provide one, in model column order
+FEATURE_DEFAULTS = {
+    # Chemical profile features
+    'ph_value': 6.5, 'moisture_content': 8.2, 'protein_content': 22.3, 'polysaccharide_content': 35.7,
+    'peak_1_intensity': 0.83, 'peak_2_intensity': 0.57, 'peak_3_intensity': 0.29, 'peak_4_intensity': 0.12,
+    'uv_absorbance_280nm': 0.92, 'uv_absorbance_320nm': 0.78, 'uv_absorbance_360nm': 0.45,
+    
+    # Morphological features from computer vision
+    'spine_density': 0.65, 'color_intensity_r': 0.72, 'color_intensity_g': 0.58, 'color_intensity_b': 0.49,
+    'texture_coarseness': 0.83, 'texture_contrast': 0.67, 'edge_density': 0.54, 'shape_circularity': 0.91,
+    
+    # Growth condition features
+    'substrate_type_encoded': 1, 'growth_stage_encoded': 2, 'temperature': 22.5, 'humidity': 85.0,
+    'light_exposure': 6.5, 'growing_time_days': 28,
+    
+    # Metadata features
+    'species_encoded': 1, 'geographic_origin_encoded': 3, 'processing_method_encoded': 2,
+    'sample_age_days': 45
+}
+
+# Features zeroed when spectral analysis or computer vision is not included
+SPECTRAL_FEATURES = list(FEATURE_DEFAULTS)[:11]
+VISION_FEATURES = list(FEATURE_DEFAULTS)[11:19]
+
+def _allocate_jobs(n_cores: int, workers: int) -> Dict[str, int]:
+    """
+    Split cores between the pipeline fits.
+    
+    The MLP and gradient boosting fits are single-threaded (the MLP is held
+    to one BLAS thread), so the random forest gets the cores the other
+    concurrent fits leave free; fitted one after another, it gets them all.
+    
+    Args:
+        n_cores: Cores available for training
+        workers: Pipelines fitted at the same time
+        
+    Returns:
+        Threads per pipeline name
+    """
+    return {
+        'compound_classifier': max(1, n_cores - (workers - 1)),
+        'bioactivity_predictor': 1,
+        'potency_predictor': 1
+    }
+
+
+def _fit_pipeline(pipeline: Pipeline, X_train: np.ndarray, y_train: np.ndarray,
+                  X_test: np.ndarray, threads: int) -> Tuple[Pipeline, np.ndarray, float]:
+    """Fit a pipeline and predict the test rows, returning (pipeline, test predictions, fit seconds)."""
+    start = time.perf_counter()
+    with threadpool_limits(limits=threads):
+        pipeline.fit(X_train, y_train)
+    seconds = time.perf_counter() - start
+    with threadpool_limits(limits=threads):
+        predictions = pipeline.predict(X_test)
+    return pipeline, predictions, seconds
+
+
+def _fit_shared_pipeline(pipeline: Pipeline, shared_name: str, shape: Tuple[int, int], dtype: str,
+                         n_train: int, y: np.ndarray, threads: int) -> Tuple[Pipeline, np.ndarray, float]:
+    """Worker process entry point: fit a pipeline on the training matrix in shared memory."""
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        X = np.ndarray(shape, dtype=dtype, buffer=shared.buf)
+        result = _fit_pipeline(pipeline, X[:n_train], y[:n_train], X[n_train:], threads)
+        del X  # No views of the buffer may outlive it
+        return result
+    finally:
+        shared.close()
+
+
+def _fit_pipelines_concurrently(
+    pipelines: Dict[str, Pipeline],
+    X: np.ndarray,
+    n_train: int,
+    targets: Dict[str, np.ndarray],
+    jobs: Dict[str, int],
+    workers: int
+) -> Dict[str, Tuple[Pipeline, np.ndarray, float]]:
+    """Fit pipelines in a process pool that shares the training matrix through shared memory."""
+    shared = shared_memory.SharedMemory(create=True, size=max(1, X.nbytes))
+    try:
+        np.ndarray(X.shape, dtype=X.dtype, buffer=shared.buf)[...] = X
+        
+        # Fork keeps worker start-up cheap and avoids re-importing the caller's __main__
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {
+                name: executor.submit(
+                    _fit_shared_pipeline, pipeline, shared.name, X.shape, X.dtype.str,
+                    n_train, targets[name], jobs[name]
+                )
+                for name, pipeline in pipelines.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+    finally:
+        shared.close()
+        shared.unlink()
+
 class ModelFeatureExtractor:
     """Extract features from sample data for model input."""
     
     def __init__(self):
         """Initialize the feature extractor."""
-        self.feature_columns = [
-            # Chemical profile features
-            'ph_value', 'moisture_content', 'protein_content', 'polysaccharide_content',
-            'peak_1_intensity', 'peak_2_intensity', 'peak_3_intensity', 'peak_4_intensity',
-            'uv_absorbance_280nm', 'uv_absorbance_320nm', 'uv_absorbance_360nm',
-            
-            # Morphological features from computer vision
-            'spine_density', 'color_intensity_r', 'color_intensity_g', 'color_intensity_b',
-            'texture_coarseness', 'texture_contrast', 'edge_density', 'shape_circularity',
-            
-            # Growth condition features
-            'substrate_type_encoded', 'growth_stage_encoded', 'temperature', 'humidity',
-            'light_exposure', 'growing_time_days',
-            
-            # Metadata features
-            'species_encoded', 'geographic_origin_encoded', 'processing_method_encoded',
-            'sample_age_days'
-        ]
+        self.feature_columns = list(FEATURE_DEFAULTS)
+        self.defaults = np.array(list(FEATURE_DEFAULTS.values()), dtype=np.float32)
+        self._spectral_mask = np.isin(self.feature_columns, SPECTRAL_FEATURES)
+        self._vision_mask = np.isin(self.feature_columns, VISION_FEATURES)
     
     def extract_features(self, sample_data: Dict[str, Any], 
                          include_vision: bool = True,
@@ -66,82 +197,111 @@ class ModelFeatureExtractor:
             include_spectral: Whether to include spectral analysis features
             
         Returns:
-            Feature vector as numpy array
+            Float32 feature vector as numpy array of shape (1, features)
         """
-        # In a real implementation, this would process the actual sample data
-        # For demonstration, we'll create synthetic features
-        
-        features = []
-        
-        # Add basic chemical profile features
-        if include_spectral:
-            features.extend([
-                sample_data.get('ph_value', 6.5),
-                sample_data.get('moisture_content', 8.2),
-                sample_data.get('protein_content', 22.3),
-                sample_data.get('polysaccharide_content', 35.7),
-                sample_data.get('peak_1_intensity', 0.83),
-                sample_data.get('peak_2_intensity', 0.57),
-                sample_data.get('peak_3_intensity', 0.29),
-                sample_data.get('peak_4_intensity', 0.12),
-                sample_data.get('uv_absorbance_280nm', 0.92),
-                sample_data.get('uv_absorbance_320nm', 0.78),
-                sample_data.get('uv_absorbance_360nm', 0.45)
-            ])
-        else:
-            # Add placeholder values if spectral analysis not included
-            features.extend([0.0] * 11)
-        
-        # Add computer vision features
-        if include_vision:
-            features.extend([
-                sample_data.get('spine_density', 0.65),
-                sample_data.get('color_intensity_r', 0.72),
-                sample_data.get('color_intensity_g', 0.58),
-                sample_data.get('color_intensity_b', 0.49),
-                sample_data.get('texture_coarseness', 0.83),
-                sample_data.get('texture_contrast', 0.67),
-                sample_data.get('edge_density', 0.54),
-                sample_data.get('shape_circularity', 0.91)
-            ])
-        else:
-            # Add placeholder values if vision features not included
-            features.extend([0.0] * 8)
-        
-        # Add growth condition features
-        features.extend([
-            sample_data.get('substrate_type_encoded', 1),
-            sample_data.get('growth_stage_encoded', 2),
-            sample_data.get('temperature', 22.5),
-            sample_data.get('humidity', 85.0),
-            sample_data.get('light_exposure', 6.5),
-            sample_data.get('growing_time_days', 28)
-        ])
+        features = [sample_data.get(name, default) for name, default in FEATURE_DEFAULTS.items()]
         
-        # Add metadata features
-        features.extend([
-            sample_data.get('species_encoded', 1),
-            sample_data.get('geographic_origin_encoded', 3),
-            sample_data.get('processing_method_encoded', 2),
-            sample_data.get('sample_age_days', 45)
-        ])
+        # Use placeholder values for analyses that were not included
+        excluded = ([] if include_spectral else SPECTRAL_FEATURES) + ([] if include_vision else VISION_FEATURES)
+        for name in excluded:
+            features[self.feature_columns.index(name)] = 0.0
+        
+        # float32 like extract_feature_matrix, so a sample scores the same alone or in a batch
+        return np.array(features, dtype=np.float32).reshape(1, -1)
+    
+    def extract_feature_matrix(self, samples: Union[pd.DataFrame, List[Dict[str, Any]]],
+                               include_vision: bool = True,
+                               include_spectral: bool = True,
+                               out: np.ndarray = None) -> np.ndarray:
+        """
+        Extract one feature matrix for many samples.
+        
+        Columns are copied as blocks and defaults and masks applied as array
+        operations, so the cost doesn't grow with per-sample Python work.
+        
+        Args:
+            samples: DataFrame with one row per sample, or list of sample dicts;
+                missing (NaN) values fall back to the defaults
+            include_vision: Whether to include computer vision features
+            include_spectral: Whether to include spectral analysis features
+            out: Preallocated float32 matrix of shape (samples, features) to
+                write into, e.g. reused across chunks
+            
+        Returns:
+            Float32 feature matrix of shape (samples, features)
+        """
+        if not isinstance(samples, pd.DataFrame):
+            # Only the model's features are taken from each dict; absent keys become NaN
+            samples = pd.DataFrame.from_records(list(samples), columns=self.feature_columns)
+        
+        shape = (len(samples), len(self.feature_columns))
+        if out is None:
+            out = np.empty(shape, dtype=np.float32)
+        elif out.shape != shape or out.dtype != np.float32:
+            raise ValueError(f"Expected a float32 output matrix of shape {shape}, got {out.dtype} {out.shape}")
         
-        return np.array(features).reshape(1, -1)
+        # Copy all present columns in one block; absent ones take their default
+        positions = samples.columns.get_indexer(self.feature_columns)
+        present = positions >= 0
+        out[:, ~present] = self.defaults[~present]
+        if present.any():
+            out[:, present] = samples.iloc[:, positions[present]].to_numpy(dtype=np.float32, na_value=np.nan)
+            np.copyto(out, self.defaults, where=np.isnan(out))
+        
+        if not include_spectral:
+            out[:, self._spectral_mask] = 0.0
+        if not include_vision:
+            out[:, self._vision_mask] = 0.0
+        return out
 
 class BioactivityModel:
     """
     Model for predicting bioactive properties of mushroom compounds.
     """
     
-    def __init__(self):
-        """Initialize the bioactivity prediction model."""
-        self.feature_extractor = ModelFeatureExtractor()
-        self.compound_classifier = self._create_compound_classifier()
-        self.bioactivity_predictor = self._create_bioactivity_predictor()
-        self.potency_predictor = self._create_potency_predictor()
+    def __init__(self, reload_interval: float = None):
+        """
+        Initialize the bioactivity prediction model.
         
-        # Load pre-trained models if available
-        self._load_models()
+        Pipelines are loaded from their artifacts lazily, on first use, and
+        reloaded when an artifact file changes on disk. Pipelines without an
+        artifact start out untrained.
+        
+        Args:
+            reload_interval: Minimum seconds between checks of a pipeline's
+                artifact for changes (default: MODEL_RELOAD_INTERVAL)
+        """
+        self.feature_extractor = ModelFeatureExtractor()
+        self.reload_interval = (
+            active_config.MODEL_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        )
+        self._pipelines: Dict[str, Tuple[Pipeline, Optional[Tuple[int, int]]]] = {}  # name -> (pipeline, source)
+        self._next_check: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def compound_classifier(self) -> Pipeline:
+        return self._pipeline('compound_classifier')
+    
+    @compound_classifier.setter
+    def compound_classifier(self, pipeline: Pipeline) -> None:
+        self._set_pipeline('compound_classifier', pipeline)
+    
+    @property
+    def bioactivity_predictor(self) -> Pipeline:
+        return self._pipeline('bioactivity_predictor')
+    
+    @bioactivity_predictor.setter
+    def bioactivity_predictor(self, pipeline: Pipeline) -> None:
+        self._set_pipeline('bioactivity_predictor', pipeline)
+    
+    @property
+    def potency_predictor(self) -> Pipeline:
+        return self._pipeline('potency_predictor')
+    
+    @potency_predictor.setter
+    def potency_predictor(self, pipeline: Pipeline) -> None:
+        self._set_pipeline('potency_predictor', pipeline)
     
     def _create_compound_classifier(self) -> Pipeline:
         """
@@ -199,34 +359,95 @@ class BioactivityModel:
             ))
         ])
     
-    def _load_models(self):
-        """Load pre-trained models if available."""
-        try:
-            if os.path.exists(COMPOUND_CLASSIFIER):
-                self.compound_classifier = joblib.load(COMPOUND_CLASSIFIER)
-                logger.info("Loaded compound classifier model")
+    def _pipeline(self, name: str) -> Pipeline:
+        """
+        Return a pipeline, loading it on first use or when its artifact changed.
+        
+        Args:
+            name: Pipeline name (a key of PIPELINE_FILES)
             
-            if os.path.exists(BIOACTIVITY_MODEL):
-                self.bioactivity_predictor = joblib.load(BIOACTIVITY_MODEL)
-                logger.info("Loaded bioactivity predictor model")
+        Returns:
+            The current pipeline
+        """
+        entry = self._pipelines.get(name)
+        now = time.monotonic()
+        if entry is not None and now < self._next_check[name]:
+            return entry[0]
+        
+        with self._lock:
+            entry = self._pipelines.get(name)
+            if entry is not None and now < self._next_check[name]:
+                return entry[0]  # Another thread checked while we waited
+            self._next_check[name] = now + self.reload_interval
             
-            if os.path.exists(POTENCY_PREDICTOR):
-                self.potency_predictor = joblib.load(POTENCY_PREDICTOR)
-                logger.info("Loaded potency predictor model")
+            source = _artifact_source(PIPELINE_FILES[name])
+            if entry is None or (source is not None and source != entry[1]):
+                entry = self._load_pipeline(name, source, entry)
+                self._pipelines[name] = entry
+            return entry[0]
+    
+    def _load_pipeline(
+        self,
+        name: str,
+        source: Optional[Tuple[int, int]],
+        current: Optional[Tuple[Pipeline, Optional[Tuple[int, int]]]]
+    ) -> Tuple[Pipeline, Optional[Tuple[int, int]]]:
+        """Load a pipeline artifact, keeping the current pipeline if loading fails."""
+        if source is None:
+            logger.info(f"No {name} artifact found; using an untrained default")
+            return self._create_pipeline(name), None
         
+        start = time.perf_counter()
+        try:
+            pipeline = joblib.load(PIPELINE_FILES[name])
         except Exception as e:
-            logger.error(f"Error loading models: {str(e)}")
-            logger.info("Using default models")
+            bioactivity_model_loads_total.labels(pipeline=name, status='failed').inc()
+            logger.error(f"Error loading {name} model: {str(e)}")
+            if current is not None:
+                # Keep serving the previous version; don't retry until the file changes again
+                return current[0], source
+            logger.info(f"Using default {name} model")
+            return self._create_pipeline(name), source
+        duration = time.perf_counter() - start
+        
+        bioactivity_model_load_duration_seconds.labels(pipeline=name).observe(duration)
+        bioactivity_model_loads_total.labels(pipeline=name, status='success').inc()
+        logger.info(f"{'Reloaded' if current is not None else 'Loaded'} {name} model in {duration:.3f}s")
+        return pipeline, source
+    
+    def _set_pipeline(self, name: str, pipeline: Pipeline) -> None:
+        """Replace a pipeline, treating the artifact as it is now as its source."""
+        with self._lock:
+            self._pipelines[name] = (pipeline, _artifact_source(PIPELINE_FILES[name]))
+            self._next_check[name] = time.monotonic() + self.reload_interval
+    
+    def _create_pipeline(self, name: str) -> Pipeline:
+        """Create the untrained default pipeline of the given name."""
+        factories = {
+            'compound_classifier': self._create_compound_classifier,
+            'bioactivity_predictor': self._create_bioactivity_predictor,
+            'potency_predictor': self._create_potency_predictor
+        }
+        return factories[name]()
     
-    def train_models(self, training_data: pd.DataFrame) -> Dict[str, Any]:
+    def train_models(self, training_data: pd.DataFrame, workers: int = None) -> Dict[str, Any]:
         """
         Train all models using the provided training data.
         
+        The three pipelines are fitted concurrently in worker processes that
+        read the training matrix from shared memory instead of each receiving
+        a pickled copy. Cores are split between the fits (see
+        _allocate_jobs), so together they don't oversubscribe the machine.
+        
         Args:
             training_data: DataFrame containing training samples
+            workers: Pipelines fitted at once (default: up to one per core);
+                1 fits them one after another in this process
             
         Returns:
-            Dictionary with training metrics
+            Dictionary with training metrics per pipeline, plus a 'training'
+            entry with the workers, threads and fit seconds per pipeline and
+            the total wall time
         """
         # In a real implementation, this would use actual training data
         # For demonstration, we'll use synthetic data
@@ -235,61 +456,75 @@ class BioactivityModel:
         if training_data is None or len(training_data) == 0:
             training_data = self._create_synthetic_training_data()
         
-        # Extract features and targets
-        X = training_data.drop(['compound_class', 'bioactivity', 'potency'], axis=1)
-        y_compound = training_data['compound_class']
-        y_bioactivity = training_data['bioactivity']
-        y_potency = training_data['potency']
+        # Samples with IDs get the vision features stored for them by image analysis
+        if 'sample_id' in training_data.columns:
+            training_data = with_stored_vision_features(training_data, offline=True)
         
-        # Split data
-        X_train, X_test, y_compound_train, y_compound_test = train_test_split(
-            X, y_compound, test_size=0.2, random_state=42
-        )
-        _, _, y_bioactivity_train, y_bioactivity_test = train_test_split(
-            X, y_bioactivity, test_size=0.2, random_state=42
-        )
-        _, _, y_potency_train, y_potency_test = train_test_split(
-            X, y_potency, test_size=0.2, random_state=42
-        )
-        
-        # Train compound classifier
-        self.compound_classifier.fit(X_train, y_compound_train)
-        compound_pred = self.compound_classifier.predict(X_test)
-        compound_metrics = {
-            'accuracy': accuracy_score(y_compound_test, compound_pred),
-            'precision': precision_score(y_compound_test, compound_pred, average='weighted'),
-            'recall': recall_score(y_compound_test, compound_pred, average='weighted'),
-            'f1': f1_score(y_compound_test, compound_pred, average='weighted')
+        # Build the feature matrix exactly as predictions do, train rows first and test rows last
+        train_rows, test_rows = train_test_split(np.arange(len(training_data)), test_size=0.2, random_state=42)
+        ordered = training_data.iloc[np.concatenate([train_rows, test_rows])]
+        X = self.feature_extractor.extract_feature_matrix(ordered)
+        n_train = len(train_rows)
+        targets = {
+            'compound_classifier': ordered['compound_class'].to_numpy(),
+            'bioactivity_predictor': ordered['bioactivity'].to_numpy(),
+            'potency_predictor': ordered['potency'].to_numpy()
         }
         
-        # Train bioactivity predictor
-        self.bioactivity_predictor.fit(X_train, y_bioactivity_train)
-        bioactivity_pred = self.bioactivity_predictor.predict(X_test)
-        bioactivity_metrics = {
-            'accuracy': accuracy_score(y_bioactivity_test, bioactivity_pred),
-            'precision': precision_score(y_bioactivity_test, bioactivity_pred, average='weighted'),
-            'recall': recall_score(y_bioactivity_test, bioactivity_pred, average='weighted'),
-            'f1': f1_score(y_bioactivity_test, bioactivity_pred, average='weighted')
-        }
+        # Train fresh pipelines; the artifacts they replace don't need to be loaded
+        n_cores = os.cpu_count() or 1
+        workers = max(1, min(len(PIPELINE_FILES), workers or n_cores))
+        jobs = _allocate_jobs(n_cores, workers)
+        pipelines = {}
+        for name in PIPELINE_FILES:
+            pipelines[name] = self._create_pipeline(name)
+            for step in pipelines[name].named_steps.values():
+                if 'n_jobs' in step.get_params():
+                    step.set_params(n_jobs=jobs[name])
         
-        # Train potency predictor
-        self.potency_predictor.fit(X_train, y_potency_train)
-        potency_pred = self.potency_predictor.predict(X_test)
-        potency_metrics = {
-            'r2': r2_score(y_potency_test, potency_pred),
-            'mse': np.mean((y_potency_test - potency_pred) ** 2)
-        }
+        start = time.perf_counter()
+        if workers == 1:
+            fitted = {
+                name: _fit_pipeline(
+                    pipeline, X[:n_train], targets[name][:n_train], X[n_train:], jobs[name]
+                )
+                for name, pipeline in pipelines.items()
+            }
+        else:
+            fitted = _fit_pipelines_concurrently(pipelines, X, n_train, targets, jobs, workers)
+        wall_seconds = time.perf_counter() - start
+        
+        metrics = {}
+        for name, (pipeline, predictions, seconds) in fitted.items():
+            y_test = targets[name][n_train:]
+            if name == 'potency_predictor':
+                metrics[name] = {
+                    'r2': r2_score(y_test, predictions),
+                    'mse': np.mean((y_test - predictions) ** 2)
+                }
+            else:
+                metrics[name] = {
+                    'accuracy': accuracy_score(y_test, predictions),
+                    'precision': precision_score(y_test, predictions, average='weighted'),
+                    'recall': recall_score(y_test, predictions, average='weighted'),
+                    'f1': f1_score(y_test, predictions, average='weighted')
+                }
         
         # Save models
-        joblib.dump(self.compound_classifier, COMPOUND_CLASSIFIER)
-        joblib.dump(self.bioactivity_predictor, BIOACTIVITY_MODEL)
-        joblib.dump(self.potency_predictor, POTENCY_PREDICTOR)
+        for name, (pipeline, _, _) in fitted.items():
+            _save_pipeline(pipeline, PIPELINE_FILES[name])
+            setattr(self, name, pipeline)
         
-        return {
-            'compound_classifier': compound_metrics,
-            'bioactivity_predictor': bioactivity_metrics,
-            'potency_predictor': potency_metrics
+        fit_seconds = {name: round(seconds, 3) for name, (_, _, seconds) in fitted.items()}
+        metrics['training'] = {
+            'workers': workers,
+            'n_jobs': jobs,
+            'fit_seconds': fit_seconds,
+            'wall_seconds': round(wall_seconds, 3)
         }
+        logger.info(f"Trained {len(fitted)} pipelines in {wall_seconds:.2f}s with {workers} workers "
+                    f"(fit seconds: {fit_seconds})")
+        return metrics
     
     def _create_synthetic_training_data(self) -> pd.DataFrame:
         """
@@ -334,6 +569,8 @@ class BioactivityModel:
         Returns:
             Dictionary with prediction results
         """
+        start = time.perf_counter()
+        
         # Extract features
         features = self.feature_extractor.extract_features(
             sample_data, 
@@ -368,8 +605,70 @@ class BioactivityModel:
             }
         }
         
+        bioactivity_prediction_duration_seconds.labels(method='predict').observe(time.perf_counter() - start)
         return result
     
+    def predict_many(self, samples: Union[pd.DataFrame, List[Dict[str, Any]]],
+                     include_vision: bool = True,
+                     include_spectral: bool = True,
+                     use_feature_store: bool = False) -> pd.DataFrame:
+        """
+        Predict compound class, bioactivity and potency for many samples at once.
+        
+        All samples go into one feature matrix and each pipeline is called
+        once, instead of three tiny predict calls per sample.
+        
+        Args:
+            samples: DataFrame with one row per sample, or list of sample dicts
+            include_vision: Whether to include computer vision features
+            include_spectral: Whether to include spectral analysis features
+            use_feature_store: Fill vision features the samples don't provide
+                from the feature store, by their sample_id
+            
+        Returns:
+            DataFrame with one row per sample (indexed like a DataFrame input)
+            and columns compound_class, compound_confidence, bioactivity_type,
+            bioactivity_confidence and potency; confidences are percentages
+        """
+        start = time.perf_counter()
+        if use_feature_store and include_vision:
+            samples = samples if isinstance(samples, pd.DataFrame) else pd.DataFrame.from_records(list(samples))
+            samples = with_stored_vision_features(samples)
+        index = samples.index if isinstance(samples, pd.DataFrame) else pd.RangeIndex(len(samples))
+        features = self.feature_extractor.extract_feature_matrix(
+            samples,
+            include_vision=include_vision,
+            include_spectral=include_spectral
+        )
+        
+        if not len(features):
+            results = pd.DataFrame({
+                'compound_class': pd.Series(dtype='int64'),
+                'compound_confidence': pd.Series(dtype='float64'),
+                'bioactivity_type': pd.Series(dtype='object'),
+                'bioactivity_confidence': pd.Series(dtype='float64'),
+                'potency': pd.Series(dtype='float64')
+            }, index=index)
+        else:
+            # The predicted class is the most probable one, so one predict_proba call gives both
+            compound_classifier = self.compound_classifier
+            compound_probas = compound_classifier.predict_proba(features)
+            bioactivity_predictor = self.bioactivity_predictor
+            bioactivity_probas = bioactivity_predictor.predict_proba(features)
+            potency = self.potency_predictor.predict(features)
+            
+            bioactivity = bioactivity_predictor.classes_[np.argmax(bioactivity_probas, axis=1)]
+            results = pd.DataFrame({
+                'compound_class': compound_classifier.classes_[np.argmax(compound_probas, axis=1)],
+                'compound_confidence': np.max(compound_probas, axis=1) * 100,
+                'bioactivity_type': [self._get_bioactivity_type(value) for value in bioactivity],
+                'bioactivity_confidence': np.max(bioactivity_probas, axis=1) * 100,
+                'potency': potency
+            }, index=index)
+        
+        bioactivity_prediction_duration_seconds.labels(method='predict_many').observe(time.perf_counter() - start)
+        return results
+    
     def _get_compound_info(self, compound_class: int, potency: float) -> List[Dict[str, Any]]:
         """
         Get information about predicted compounds.
@@ -644,6 +943,59 @@ def create_sample_data(species: str = 'Hericium erinaceus',
     return sample_data
 
 
+def with_stored_vision_features(samples: pd.DataFrame, offline: bool = False) -> pd.DataFrame:
+    """
+    Fill samples' vision features from the feature store, by their sample_id column.
+    
+    Values the samples provide themselves take precedence.
+    
+    Args:
+        samples: DataFrame with a sample_id column
+        offline: Read the offline (Parquet) half in one pass, as for training,
+            instead of the online half, which recomputes stale rows
+        
+    Returns:
+        Copy of the samples with the stored features filled in
+    """
+    from computer_vision import VISION_FEATURE_SET  # Registers the vision extractor
+    
+    if 'sample_id' not in samples.columns:
+        raise ValueError("Samples need a sample_id column to read stored features")
+    sample_ids = samples['sample_id'].astype(str)
+    store = get_feature_store()
+    if offline:
+        # Every stored image adds a part file; merge them rather than open each one
+        store.compact_offline(VISION_FEATURE_SET)
+        stored = store.read_offline(VISION_FEATURE_SET).set_index('sample_id')
+    else:
+        stored = pd.DataFrame.from_dict(store.get_many(sample_ids, VISION_FEATURE_SET), orient='index')
+    
+    columns = [column for column in VISION_FEATURES if column in stored.columns]
+    if not columns:
+        return samples
+    values = stored[columns].reindex(sample_ids).set_axis(samples.index)
+    
+    samples = samples.copy()
+    for column in columns:
+        samples[column] = samples[column].fillna(values[column]) if column in samples.columns else values[column]
+    logger.info(f"Filled vision features of {int(values.notna().any(axis=1).sum())} of {len(samples)} "
+                f"samples from the feature store")
+    return samples
+
+
+_default_model = None
+_default_model_lock = threading.Lock()
+
+
+def get_bioactivity_model() -> BioactivityModel:
+    """Return this process's shared BioactivityModel, creating it on first use."""
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            _default_model = BioactivityModel()
+        return _default_model
+
+
 def predict_compounds(sample_id: str,
                      species: str = 'Hericium erinaceus',
                      include_vision: bool = True,
@@ -663,8 +1015,15 @@ def predict_compounds(sample_id: str,
     # Create sample data based on species
     sample_data = create_sample_data(species=species)
     
-    # Initialize model
-    model = BioactivityModel()
+    # Prefer the vision features measured on the sample's own images over the species defaults
+    stored_features = None
+    if include_vision:
+        from computer_vision import VISION_FEATURE_SET  # Registers the vision extractor
+        stored_features = get_feature_store().get(sample_id, VISION_FEATURE_SET)
+        sample_data.update(stored_features or {})
+    
+    # Use this process's shared model; its pipelines are loaded once, not per call
+    model = get_bioactivity_model()
     
     # Make prediction
     prediction_result = model.predict(
@@ -681,16 +1040,18 @@ def predict_compounds(sample_id: str,
         'computer_vision': include_vision,
         'spectral_analysis': include_spectral
     }
+    prediction_result['stored_vision_features'] = stored_features is not None
     
     return prediction_result
 
 
-def train_bioactivity_models(training_data_path: Optional[str] = None) -> Dict[str, Any]:
+def train_bioactivity_models(training_data_path: Optional[str] = None, workers: int = None) -> Dict[str, Any]:
     """
     Train bioactivity prediction models.
     
     Args:
         training_data_path: Path to training data CSV (optional)
+        workers: Pipelines fitted at once (see BioactivityModel.train_models)
         
     Returns:
         Dictionary with training metrics
@@ -708,7 +1069,7 @@ def train_bioactivity_models(training_data_path: Optional[str] = None) -> Dict[s
     model = BioactivityModel()
     
     # Train models
-    metrics = model.train_models(training_data)
+    metrics = model.train_models(training_data, workers=workers)
     
     return metrics
 
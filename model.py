@@ -3,43 +3,170 @@ import pickle
 import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, Any, List, Union
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Union, Optional, Tuple
+from datetime import datetime
+from scipy.stats import norm
+from sklearn.ensemble import (
+    RandomForestRegressor, RandomForestClassifier,
+    HistGradientBoostingRegressor, HistGradientBoostingClassifier
+)
+from sklearn.linear_model import SGDRegressor, SGDClassifier
 from sklearn.preprocessing import StandardScaler
 
+from feature_encoding import CategoricalEncoder
+from feature_schema import FeatureSchema
+from model_artifact import INTERVAL_METHODS, PackedForest, is_artifact, read_artifact, write_artifact
+from explanations import get_forest_explainer, linear_shap_values
+
 logger = logging.getLogger(__name__)
 
+# Estimator families MycolModel can be built on
+ENGINES = ('random_forest', 'sgd', 'hist_gradient_boosting')
+
+# Hyperparameters of each engine's estimator unless overridden (e.g. by tuning)
+DEFAULT_ESTIMATOR_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'max_depth': 10, 'random_state': 42},
+    'sgd': {'random_state': 42},
+    'hist_gradient_boosting': {'max_iter': 200, 'learning_rate': 0.1, 'max_leaf_nodes': 31, 'random_state': 42}
+}
+
+# Quantiles of the training residuals kept for engines without per-tree spread
+RESIDUAL_QUANTILES = np.linspace(0, 1, 201)
+
+# Residuals partial_fit keeps as a uniform sample to estimate the quantiles from
+RESIDUAL_RESERVOIR_SIZE = 2000
+
+
+@dataclass
+class PredictionResult:
+    """Array-native predictions of MycolModel, one element per input row."""
+    model_type: str
+    scores: Optional[np.ndarray] = None  # Regressor bioactivity scores
+    lower: Optional[np.ndarray] = None  # Regressor confidence interval bounds
+    upper: Optional[np.ndarray] = None
+    categories: Optional[np.ndarray] = None  # Classifier predicted categories
+    probabilities: Optional[np.ndarray] = None  # Probability of the predicted category
+    feature_importance: Dict[str, float] = field(default_factory=dict)
+    contributions: Optional[np.ndarray] = None  # Per-row feature attributions (SHAP values), rows x features
+    base_values: Optional[np.ndarray] = None  # Expected output; each row's attributions sum to output - base
+    feature_names: List[str] = field(default_factory=list)  # Columns of contributions
+    
+    def __len__(self) -> int:
+        values = self.scores if self.scores is not None else self.categories
+        return 0 if values is None else len(values)
+    
+    def slice_rows(self, start: int, stop: int) -> 'PredictionResult':
+        """Return the predictions of rows ``start`` to ``stop``."""
+        rows = slice(start, stop)
+        return PredictionResult(
+            model_type=self.model_type,
+            scores=self.scores[rows] if self.scores is not None else None,
+            lower=self.lower[rows] if self.lower is not None else None,
+            upper=self.upper[rows] if self.upper is not None else None,
+            categories=self.categories[rows] if self.categories is not None else None,
+            probabilities=self.probabilities[rows] if self.probabilities is not None else None,
+            feature_importance=self.feature_importance,
+            contributions=self.contributions[rows] if self.contributions is not None else None,
+            base_values=self.base_values[rows] if self.base_values is not None else None,
+            feature_names=self.feature_names
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the list-based dictionary returned by MycolModel.predict."""
+        if self.model_type == 'regressor':
+            # Missing (NaN) bounds become None, so the result stays valid JSON
+            lower = np.where(np.isnan(self.lower), None, self.lower).tolist()
+            upper = np.where(np.isnan(self.upper), None, self.upper).tolist()
+            result = {
+                'bioactivity_scores': self.scores.tolist(),
+                'confidence_intervals': list(zip(lower, upper)),
+                'feature_importance': self.feature_importance
+            }
+        else:
+            result = {
+                'categories': self.categories.tolist(),
+                'probabilities': self.probabilities.tolist(),
+                'feature_importance': self.feature_importance
+            }
+        if self.contributions is not None:
+            result['feature_contributions'] = [
+                dict(zip(self.feature_names, row)) for row in self.contributions.tolist()
+            ]
+            result['base_values'] = self.base_values.tolist()
+        return result
+
+
 class MycolModel:
     """Model for mycology bioactivity prediction."""
     
-    def __init__(self, model_type: str = 'regressor'):
+    def __init__(
+        self,
+        model_type: str = 'regressor',
+        engine: str = 'random_forest',
+        estimator_params: Dict[str, Any] = None
+    ):
         """
         Initialize the model.
         
         Args:
             model_type: Type of model to use ('regressor' or 'classifier')
+            engine: Estimator family: 'random_forest'; 'sgd' for a linear
+                model that can be trained out of core with partial_fit; or
+                'hist_gradient_boosting', whose shallow boosted trees are much
+                smaller and faster to predict than the forest
+            estimator_params: Hyperparameters overriding DEFAULT_ESTIMATOR_PARAMS
         """
         self.model_type = model_type
+        self.engine = engine
+        self.estimator_params = dict(estimator_params or {})
         self.model = None
         self.scaler = StandardScaler()
         self.feature_names = []
+        self.encoder = None  # Optional CategoricalEncoder that produced the features
         self.version = "0.1.0"
+        self.interval_method = 'normal'  # How regressor intervals are derived (see predict_arrays)
+        self.interval_confidence = 0.95
+        self.missing_columns = 'zero'  # Policy for features absent from the input (see feature_schema)
+        self.missing_values = 'keep'  # Policy for NaN input values (see feature_schema)
+        self.residual_spread = None  # Training residual std and quantiles, for intervals without trees
+        self.training_history = []  # One entry per training run (see record_training)
+        self.model = self._create_estimator()
+        self._packed = None  # PackedForest of the fitted estimator, built on first use
+        self._schema = None  # FeatureSchema compiled from the fitted features, built on first use
+        self._schema_key = None
+        self._importances = None  # Cached feature importances of the fitted estimator
+        self._explainer = None  # ForestExplainer of the packed forest, compiled on first explanation
+        self._explainer_key = None
+        self._warned_no_spread = False
+    
+    def _create_estimator(self):
+        """Create an unfitted estimator for the model type and engine."""
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {self.engine}")
         
-        # Initialize model based on type
-        if model_type == 'regressor':
-            self.model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42
-            )
-        elif model_type == 'classifier':
-            self.model = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42
-            )
-        else:
-            raise ValueError(f"Unknown model type: {model_type}")
+        params = {**DEFAULT_ESTIMATOR_PARAMS[self.engine], **self.estimator_params}
+        
+        if self.engine == 'sgd':
+            if self.model_type == 'regressor':
+                return SGDRegressor(**params)
+            elif self.model_type == 'classifier':
+                # Log loss so the classifier has predict_proba
+                return SGDClassifier(**{'loss': 'log_loss', **params})
+            raise ValueError(f"Unknown model type: {self.model_type}")
+        
+        if self.engine == 'hist_gradient_boosting':
+            if self.model_type == 'regressor':
+                return HistGradientBoostingRegressor(**params)
+            elif self.model_type == 'classifier':
+                return HistGradientBoostingClassifier(**params)
+            raise ValueError(f"Unknown model type: {self.model_type}")
+        
+        if self.model_type == 'regressor':
+            return RandomForestRegressor(**params)
+        elif self.model_type == 'classifier':
+            return RandomForestClassifier(**params)
+        raise ValueError(f"Unknown model type: {self.model_type}")
     
     def fit(self, X: Union[pd.DataFrame, Dict[str, List[float]]], y: Union[List[float], np.ndarray]) -> 'MycolModel':
         """
@@ -62,21 +189,343 @@ class MycolModel:
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
         
+        # A model loaded from an artifact only holds a read-only packed forest
+        if isinstance(self.model, PackedForest):
+            self.model = self._create_estimator()
+        
         # Fit the model
         self.model.fit(X_scaled, y)
+        self._packed = None
+        self._schema = None
+        self._importances = None
+        self._explainer = None
+        self.training_history = []
+        
+        self.residual_spread = None
+        if self.model_type == 'regressor' and not PackedForest.supports(self.model):
+            self._record_residual_spread(np.asarray(y, dtype=np.float64) - self.model.predict(X_scaled))
         
         return self
     
-    def predict(self, X: Union[pd.DataFrame, Dict[str, List[float]]]) -> Dict[str, Any]:
+    def _record_residual_spread(self, residuals: np.ndarray) -> None:
+        """Keep the spread of the training residuals, from which intervals are derived."""
+        self.residual_spread = {
+            'std': float(np.std(residuals)),
+            'quantiles': np.quantile(residuals, RESIDUAL_QUANTILES).tolist()
+        }
+    
+    def _residual_interval(self, predictions: np.ndarray, confidence: float, method: str):
+        """Per-row interval bounds from the training residual spread."""
+        if method == 'quantile':
+            quantiles = self.residual_spread['quantiles']
+            alpha = (1 - confidence) / 2
+            low, high = np.interp([alpha, 1 - alpha], RESIDUAL_QUANTILES, quantiles)
+            return predictions + low, predictions + high
+        
+        margin = norm.ppf(0.5 + confidence / 2) * self.residual_spread['std']
+        return predictions - margin, predictions + margin
+    
+    def _trainable_estimator(self):
+        """Return the sklearn estimator, which a loaded packed forest does not have."""
+        if isinstance(self.model, PackedForest):
+            raise ValueError(
+                "Model was loaded without its trainable estimator; "
+                "load it with MycolModel.load(path, trainable=True)"
+            )
+        return self.model
+    
+    def _align_features(self, X: Union[pd.DataFrame, Dict[str, List[float]]]) -> pd.DataFrame:
+        """Return training data with the model's feature columns, in order."""
+        if isinstance(X, dict):
+            X = pd.DataFrame(X)
+        missing = [name for name in self.feature_names if name not in X.columns]
+        if missing:
+            raise ValueError(f"Training data is missing model features: {missing}")
+        return X[self.feature_names]
+    
+    def warm_start_fit(
+        self,
+        X: Union[pd.DataFrame, Dict[str, List[float]]],
+        y: Union[List[float], np.ndarray],
+        add_estimators: int = 50
+    ) -> 'MycolModel':
         """
-        Make predictions with the model.
+        Grow a fitted random forest with new trees trained on new data.
+        
+        The existing trees are kept as they are and the scaler is not refitted,
+        so the old trees keep seeing features on the scale they were trained on.
+        
+        Args:
+            X: New training features, with the model's feature columns
+            y: New target values
+            add_estimators: Number of trees to add
+            
+        Returns:
+            The updated model instance
+        """
+        estimator = self._trainable_estimator()
+        if self.engine != 'random_forest' or not hasattr(estimator, 'estimators_'):
+            raise ValueError("warm_start_fit needs a fitted random forest model")
+        
+        X_scaled = self.scaler.transform(self._align_features(X))
+        estimator.set_params(warm_start=True, n_estimators=len(estimator.estimators_) + add_estimators)
+        estimator.fit(X_scaled, y)
+        self._packed = None
+        self._importances = None
+        self._explainer = None
+        
+        return self
+    
+    def partial_fit(
+        self,
+        X: Union[pd.DataFrame, Dict[str, List[float]]],
+        y: Union[List[float], np.ndarray],
+        classes: Optional[List[Any]] = None
+    ) -> 'MycolModel':
+        """
+        Update the model with one chunk of training data.
+        
+        Only estimators with ``partial_fit`` (the 'sgd' engine) support this.
+        The first chunk fixes the feature columns. If the scaler has not been
+        fitted beforehand (e.g. with ``scaler.partial_fit`` over every chunk),
+        it is fitted on that first chunk.
+        
+        Args:
+            X: Chunk of training features
+            y: Chunk of target values
+            classes: All class labels; required on the first classifier chunk
+            
+        Returns:
+            The updated model instance
+        """
+        estimator = self._trainable_estimator()
+        if not hasattr(estimator, 'partial_fit'):
+            raise ValueError(f"The {self.engine} engine does not support partial_fit")
+        
+        if isinstance(X, dict):
+            X = pd.DataFrame(X)
+        if not self.feature_names:
+            self.feature_names = list(X.columns)
+        X = self._align_features(X)
+        if not hasattr(self.scaler, 'scale_'):
+            self.scaler.fit(X)
+        
+        X_scaled = self.scaler.transform(X)
+        if self.model_type == 'classifier':
+            estimator.partial_fit(X_scaled, y, classes=classes)
+        else:
+            # Residuals of the chunk before the model has seen it, so the
+            # spread is out of sample; the first chunk has no model to score it yet
+            fitted = hasattr(estimator, 'coef_')
+            if fitted:
+                residuals = np.asarray(y, dtype=np.float64) - estimator.predict(X_scaled)
+            estimator.partial_fit(X_scaled, y)
+            if not fitted:
+                residuals = np.asarray(y, dtype=np.float64) - estimator.predict(X_scaled)
+            self._update_residual_spread(residuals)
+        self._schema = None
+        self._importances = None
+        
+        return self
+    
+    def _update_residual_spread(self, residuals: np.ndarray) -> None:
+        """
+        Fold one chunk's residuals into the running residual spread.
+        
+        The std is kept exactly with a running (Welford) mean and sum of
+        squares; the quantiles come from a uniform reservoir sample of all
+        residuals seen so far. The running state is kept in residual_spread,
+        so training can continue after the model is saved and loaded.
+        """
+        running = (self.residual_spread or {}).get('running') or {
+            'count': 0, 'mean': 0.0, 'm2': 0.0, 'reservoir': []
+        }
+        count, mean, m2 = running['count'], running['mean'], running['m2']
+        reservoir = np.asarray(running['reservoir'], dtype=np.float64)
+        
+        # Combine the running moments with the chunk's (Chan et al.)
+        n = len(residuals)
+        chunk_mean = float(residuals.mean())
+        chunk_m2 = float(((residuals - chunk_mean) ** 2).sum())
+        total = count + n
+        delta = chunk_mean - mean
+        mean += delta * n / total
+        m2 += chunk_m2 + delta ** 2 * count * n / total
+        
+        # Reservoir sampling: residual number t replaces a random slot with probability size / (t + 1)
+        free = max(0, RESIDUAL_RESERVOIR_SIZE - len(reservoir))
+        reservoir = np.concatenate([reservoir, residuals[:free]])
+        if n > free:
+            rng = np.random.default_rng(count)
+            slots = rng.integers(0, np.arange(count + free, total) + 1)
+            keep = slots < RESIDUAL_RESERVOIR_SIZE
+            reservoir[slots[keep]] = residuals[free:][keep]
+        
+        self.residual_spread = {
+            'std': float(np.sqrt(m2 / total)),
+            'quantiles': np.quantile(reservoir, RESIDUAL_QUANTILES).tolist(),
+            'running': {'count': total, 'mean': mean, 'm2': m2, 'reservoir': reservoir.tolist()}
+        }
+    
+    def record_training(self, mode: str, rows: int, source: str = None, data_hash: str = None) -> Dict[str, Any]:
+        """
+        Record a training run in the model's training history.
+        
+        Args:
+            mode: How the model was trained ('full', 'warm_start' or 'partial_fit')
+            rows: Number of training rows
+            source: Where the data came from, e.g. a file path
+            data_hash: Hash identifying the training data
+            
+        Returns:
+            The recorded entry
+        """
+        entry = {
+            'mode': mode,
+            'rows': int(rows),
+            'source': source,
+            'data_hash': data_hash,
+            'trained_at': datetime.utcnow().isoformat()
+        }
+        if isinstance(self.model, PackedForest):
+            entry['n_estimators'] = self.model.n_estimators
+        elif hasattr(self.model, 'estimators_'):
+            entry['n_estimators'] = len(self.model.estimators_)
+        self.training_history.append(entry)
+        return entry
+    
+    def has_seen(self, data_hash: str) -> bool:
+        """Whether data with this hash is already in the training history."""
+        return any(entry.get('data_hash') == data_hash for entry in self.training_history)
+    
+    def _feature_importances(self) -> np.ndarray:
+        """Feature importances, computed once per fitted estimator."""
+        if self._importances is None:
+            self._importances = self._compute_feature_importances()
+        return self._importances
+    
+    def _compute_feature_importances(self) -> np.ndarray:
+        """
+        Impurity importances of forests, normalized split gains of boosted
+        trees, or normalized absolute coefficients of linear engines.
+        """
+        importances = getattr(self.model, 'feature_importances_', None)
+        if importances is not None:
+            return np.asarray(importances)
+        
+        predictors = getattr(self.model, '_predictors', None)
+        if predictors is not None:
+            # HistGradientBoosting exposes no importances; sum each feature's split gains
+            weights = np.zeros(len(self.feature_names))
+            for iteration in predictors:
+                for predictor in iteration:
+                    splits = predictor.nodes[~predictor.nodes['is_leaf'].astype(bool)]
+                    np.add.at(weights, splits['feature_idx'], splits['gain'])
+        else:
+            coef = getattr(self.model, 'coef_', None)
+            if coef is None:
+                return np.zeros(len(self.feature_names))
+            weights = np.abs(np.atleast_2d(coef)).mean(axis=0)
+        
+        total = weights.sum()
+        return weights / total if total > 0 else weights
+    
+    def _forest_predictor(self) -> Optional[PackedForest]:
+        """Return a PackedForest for the fitted model, or None if it is not a forest."""
+        if isinstance(self.model, PackedForest):
+            return self.model
+        if self._packed is None and PackedForest.supports(self.model):
+            self._packed = PackedForest.from_estimator(self.model)
+        return self._packed
+    
+    def _raw_inputs(self) -> bool:
+        """Whether the model takes unscaled features (a compacted forest with the scaler folded in)."""
+        return isinstance(self.model, PackedForest) and not self.model.scaled_inputs
+    
+    def _feature_schema(self) -> FeatureSchema:
+        """Return the compiled schema for the current features, scaler and policies."""
+        raw_inputs = self._raw_inputs()
+        key = (tuple(self.feature_names), id(self.scaler), id(self.model), self.missing_columns, self.missing_values)
+        if self._schema is None or self._schema_key != key:
+            self._schema = FeatureSchema(
+                self.feature_names,
+                fill_values=getattr(self.scaler, 'mean_', None),
+                missing_columns=self.missing_columns,
+                missing_values=self.missing_values,
+                # A folded forest compares float32 features directly, so align straight into float32
+                dtype=np.float32 if raw_inputs else np.float64
+            )
+            self._schema_key = key
+        return self._schema
+    
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """Standardize an aligned feature matrix in place, exactly as scaler.transform does."""
+        scaler = self.scaler
+        if not isinstance(scaler, StandardScaler) or not hasattr(scaler, 'scale_'):
+            return scaler.transform(X)
+        if scaler.with_mean:
+            X -= scaler.mean_
+        if scaler.with_std:
+            X /= scaler.scale_
+        return X
+    
+    def _shap_values(self, X_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute feature attributions for model input.
+        
+        Args:
+            X_scaled: Features as the estimator takes them
+            
+        Returns:
+            Tuple of attributions shaped (rows, features, outputs) and the
+            expected value per output
+        """
+        forest = self._forest_predictor()
+        if forest is not None:
+            if self._explainer is None or self._explainer_key != id(forest):
+                self._explainer = get_forest_explainer(forest)
+                self._explainer_key = id(forest)
+            return self._explainer.shap_values(X_scaled), self._explainer.expected_value
+        if self.engine == 'sgd' and self.model_type == 'regressor':
+            return linear_shap_values(self.model.coef_, X_scaled), np.atleast_1d(self.model.intercept_)
+        raise ValueError(f"Feature attributions are not supported for the {self.engine} {self.model_type}")
+    
+    def predict_arrays(
+        self,
+        X: Union[pd.DataFrame, Dict[str, List[float]]],
+        interval_method: str = None,
+        confidence: float = None,
+        explain: bool = False
+    ) -> 'PredictionResult':
+        """
+        Make predictions with the model, returning NumPy arrays.
+        
+        This is the form batch callers should use: the arrays can be assigned
+        to DataFrame columns directly without building per-row Python objects.
+        
+        Regressor confidence intervals are computed per row from the spread of
+        the individual trees' predictions, so a row's interval does not depend
+        on the other rows in the batch. Engines without independent trees
+        (boosting, linear) use the spread of their training residuals instead.
         
         Args:
             X: Input features
+            interval_method: 'normal' (mean +/- z * tree or residual standard
+                deviation) or 'quantile' (empirical quantiles of the tree
+                predictions or residuals);
+                defaults to the model's interval_method
+            confidence: Interval coverage (default: the model's interval_confidence)
+            explain: Also compute per-row feature attributions (SHAP values)
+                of the score, or of the predicted class's probability
             
         Returns:
-            Dictionary with prediction results
+            PredictionResult with one array element per input row
         """
+        interval_method = interval_method or self.interval_method
+        confidence = confidence or self.interval_confidence
+        if interval_method not in INTERVAL_METHODS:
+            raise ValueError(f"Unknown interval method: {interval_method}")
+        
         # Handle case where model is not fit yet (simulated model)
         if self.model is None:
             logger.warning("Model not trained. Using simulated predictions.")
@@ -84,163 +533,216 @@ class MycolModel:
             # Create simulated model for demonstration
             if isinstance(X, dict):
                 n_samples = len(list(X.values())[0])
-                
-                if self.model_type == 'regressor':
-                    # Simulate regression predictions (bioactivity scores)
-                    predictions = np.random.uniform(0, 1, n_samples)
-                    
-                    return {
-                        'bioactivity_scores': predictions.tolist(),
-                        'confidence_intervals': [
-                            (max(0, p - 0.1), min(1, p + 0.1)) for p in predictions
-                        ],
-                        'feature_importance': {
-                            f"feature_{i}": np.random.uniform(0, 1) 
-                            for i in range(len(X))
-                        }
-                    }
-                else:
-                    # Simulate classification predictions (compound categories)
-                    categories = ['active', 'inactive', 'moderate']
-                    predictions = np.random.choice(categories, n_samples)
-                    probabilities = np.random.uniform(0.5, 0.9, n_samples)
-                    
-                    return {
-                        'categories': predictions.tolist(),
-                        'probabilities': probabilities.tolist(),
-                        'feature_importance': {
-                            f"feature_{i}": np.random.uniform(0, 1) 
-                            for i in range(len(X))
-                        }
-                    }
+                feature_keys = [f"feature_{i}" for i in range(len(X))]
             else:
                 # For DataFrames or other types
                 n_samples = len(X)
-                
-                if self.model_type == 'regressor':
-                    predictions = np.random.uniform(0, 1, n_samples)
-                    return {
-                        'bioactivity_scores': predictions.tolist(),
-                        'confidence_intervals': [
-                            (max(0, p - 0.1), min(1, p + 0.1)) for p in predictions
-                        ],
-                        'feature_importance': {
-                            col: np.random.uniform(0, 1) 
-                            for col in (X.columns if hasattr(X, 'columns') else range(X.shape[1]))
-                        }
-                    }
-                else:
-                    categories = ['active', 'inactive', 'moderate']
-                    predictions = np.random.choice(categories, n_samples)
-                    probabilities = np.random.uniform(0.5, 0.9, n_samples)
-                    
-                    return {
-                        'categories': predictions.tolist(),
-                        'probabilities': probabilities.tolist(),
-                        'feature_importance': {
-                            col: np.random.uniform(0, 1) 
-                            for col in (X.columns if hasattr(X, 'columns') else range(X.shape[1]))
-                        }
-                    }
-        
-        # Convert dictionary to DataFrame if necessary
-        if isinstance(X, dict):
-            X = pd.DataFrame(X)
-        
-        # Ensure all expected features are present
-        if hasattr(X, 'columns') and set(self.feature_names) != set(X.columns):
-            logger.warning(f"Feature mismatch. Expected {self.feature_names}, got {X.columns}")
+                feature_keys = list(X.columns if hasattr(X, 'columns') else range(X.shape[1]))
+            feature_importance = {key: np.random.uniform(0, 1) for key in feature_keys}
+            if explain:
+                logger.warning("Simulated predictions have no feature attributions")
             
-            # Align features, filling missing ones with 0
-            missing_features = set(self.feature_names) - set(X.columns)
-            for feature in missing_features:
-                X[feature] = 0
+            if self.model_type == 'regressor':
+                # Simulate regression predictions (bioactivity scores)
+                predictions = np.random.uniform(0, 1, n_samples)
+                return PredictionResult(
+                    model_type=self.model_type,
+                    scores=predictions,
+                    lower=np.maximum(0, predictions - 0.1),
+                    upper=np.minimum(1, predictions + 0.1),
+                    feature_importance=feature_importance
+                )
             
-            # Reorder columns to match training data
-            X = X[self.feature_names]
+            # Simulate classification predictions (compound categories)
+            categories = ['active', 'inactive', 'moderate']
+            return PredictionResult(
+                model_type=self.model_type,
+                categories=np.random.choice(categories, n_samples),
+                probabilities=np.random.uniform(0.5, 0.9, n_samples),
+                feature_importance=feature_importance
+            )
         
-        # Scale features
-        X_scaled = self.scaler.transform(X)
+        # Copy the features into a (reused) matrix in training order; the caller's data is untouched
+        X_scaled = self._feature_schema().transform(X)
+        if not self._raw_inputs():
+            X_scaled = self._scale(X_scaled)
+        
+        # Get feature importance
+        feature_importance = dict(zip(
+            self.feature_names, 
+            self._feature_importances()
+        ))
         
         # Make predictions
         if self.model_type == 'regressor':
-            predictions = self.model.predict(X_scaled)
-            
-            # Generate confidence intervals (simplified approach)
-            std_dev = np.std(predictions) if len(predictions) > 1 else 0.1
-            confidence_intervals = [
-                (max(0, p - 1.96 * std_dev), min(1, p + 1.96 * std_dev))
-                for p in predictions
-            ]
-            
-            # Get feature importance
-            feature_importance = dict(zip(
-                self.feature_names, 
-                self.model.feature_importances_
-            ))
-            
-            return {
-                'bioactivity_scores': predictions.tolist(),
-                'confidence_intervals': confidence_intervals,
-                'feature_importance': feature_importance
-            }
-        else:
-            # For classifier
-            predictions = self.model.predict(X_scaled)
-            probabilities = np.max(self.model.predict_proba(X_scaled), axis=1)
+            forest = self._forest_predictor()
+            if forest is not None:
+                # Predictions and per-row intervals from a single pass over all trees
+                predictions, lower, upper = forest.predict_interval(
+                    X_scaled, confidence=confidence, method=interval_method
+                )
+            elif self.residual_spread:
+                # Estimators without individual trees use the spread of their training residuals
+                predictions = self.model.predict(X_scaled)
+                lower, upper = self._residual_interval(predictions, confidence, interval_method)
+            else:
+                # No per-row spread to derive an interval from (e.g. a model saved without residuals)
+                predictions = self.model.predict(X_scaled)
+                lower = upper = np.full(len(predictions), np.nan)
+                if not self._warned_no_spread:
+                    self._warned_no_spread = True
+                    logger.warning("Model has no residual spread; regressor intervals are NaN. Retrain it to record one.")
             
-            # Get feature importance
-            feature_importance = dict(zip(
-                self.feature_names, 
-                self.model.feature_importances_
-            ))
+            result = PredictionResult(
+                model_type=self.model_type,
+                scores=predictions,
+                lower=np.maximum(0, lower),
+                upper=np.minimum(1, upper),
+                feature_importance=feature_importance
+            )
+            if explain:
+                values, expected = self._shap_values(X_scaled)
+                result.contributions = values[:, :, 0]
+                result.base_values = np.full(len(predictions), expected[0])
+                result.feature_names = list(self.feature_names)
+            return result
+        
+        # For classifier
+        probabilities = self.model.predict_proba(X_scaled)
+        best = np.argmax(probabilities, axis=1)
+        result = PredictionResult(
+            model_type=self.model_type,
+            categories=self.model.classes_[best],
+            probabilities=probabilities[np.arange(len(best)), best],
+            feature_importance=feature_importance
+        )
+        if explain:
+            # Attribute the probability of the class each row was assigned
+            values, expected = self._shap_values(X_scaled)
+            result.contributions = values[np.arange(len(best)), :, best]
+            result.base_values = expected[best]
+            result.feature_names = list(self.feature_names)
+        return result
+    
+    def predict(self, X: Union[pd.DataFrame, Dict[str, List[float]]]) -> Dict[str, Any]:
+        """
+        Make predictions with the model.
+        
+        Args:
+            X: Input features
             
-            return {
-                'categories': predictions.tolist(),
-                'probabilities': probabilities.tolist(),
-                'feature_importance': feature_importance
-            }
+        Returns:
+            Dictionary with prediction results, using lists for JSON responses
+        """
+        return self.predict_arrays(X).to_dict()
     
-    def save(self, filepath: str) -> None:
+    def save(self, filepath: str, format: str = 'artifact', include_estimator: bool = False) -> None:
         """
-        Save the model to a file.
+        Save the model.
         
         Args:
             filepath: Path to save the model
+            format: 'artifact' for a memory-mappable artifact directory
+                (see model_artifact), or 'pickle' for a single legacy pickle file
+            include_estimator: Also store the sklearn estimator in the artifact,
+                so the model can be loaded with trainable=True and trained further
         """
+        if format == 'artifact':
+            write_artifact(filepath, self, include_estimator=include_estimator)
+            return
+        if format != 'pickle':
+            raise ValueError(f"Unknown model format: {format}")
+        
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
             'feature_names': self.feature_names,
+            'encoder': self.encoder.to_dict() if self.encoder else None,
             'model_type': self.model_type,
-            'version': self.version
+            'engine': self.engine,
+            'estimator_params': self.estimator_params,
+            'version': self.version,
+            'interval_method': self.interval_method,
+            'interval_confidence': self.interval_confidence,
+            'missing_columns': self.missing_columns,
+            'missing_values': self.missing_values,
+            'residual_spread': self.residual_spread,
+            'training_history': self.training_history
         }
         
         with open(filepath, 'wb') as f:
             pickle.dump(model_data, f)
     
     @classmethod
-    def load(cls, filepath: str) -> 'MycolModel':
+    def load(
+        cls,
+        filepath: str,
+        mmap_mode: Optional[str] = 'r',
+        verify: bool = True,
+        trainable: bool = False,
+        checksums: bool = False
+    ) -> 'MycolModel':
         """
-        Load a model from a file.
+        Load a model from an artifact directory or a legacy pickle file.
         
         Args:
-            filepath: Path to the model file
+            filepath: Path to the model artifact or file
+            mmap_mode: Memory-map mode for artifact arrays; the default shares
+                one read-only copy of the trees between processes
+            verify: Check the artifact's manifest and file sizes before loading
+            trainable: Load the sklearn estimator stored with include_estimator
+                instead of the read-only packed forest, e.g. to add trees
+            checksums: Also hash every artifact file, which reads all of it;
+                artifacts are verified like this when published for serving
             
         Returns:
             Loaded model instance
         """
-        with open(filepath, 'rb') as f:
-            model_data = pickle.load(f)
+        if is_artifact(filepath):
+            artifact = read_artifact(
+                filepath, mmap_mode=mmap_mode, verify=verify, trainable=trainable, checksums=checksums
+            )
+            manifest = artifact['manifest']
+            model_data = {
+                'model': artifact['estimator'],
+                'scaler': artifact['scaler'],
+                'feature_names': manifest['feature_names'],
+                'encoder': manifest.get('encoder'),
+                'model_type': manifest['model_type'],
+                'engine': manifest.get('engine'),
+                'estimator_params': manifest.get('estimator_params'),
+                'version': manifest.get('version'),
+                'interval_method': manifest.get('interval_method'),
+                'interval_confidence': manifest.get('interval_confidence'),
+                'missing_columns': manifest.get('missing_columns'),
+                'missing_values': manifest.get('missing_values'),
+                'residual_spread': manifest.get('residual_spread'),
+                'training_history': manifest.get('training_history')
+            }
+        else:
+            with open(filepath, 'rb') as f:
+                model_data = pickle.load(f)
         
         # Create a new instance
-        instance = cls(model_type=model_data['model_type'])
+        instance = cls(
+            model_type=model_data['model_type'],
+            engine=model_data.get('engine') or 'random_forest',
+            estimator_params=model_data.get('estimator_params')
+        )
         
         # Restore model components
         instance.model = model_data['model']
         instance.scaler = model_data['scaler']
         instance.feature_names = model_data['feature_names']
-        instance.version = model_data.get('version', '0.1.0')
+        if model_data.get('encoder'):
+            instance.encoder = CategoricalEncoder.from_dict(model_data['encoder'])
+        instance.version = model_data.get('version') or '0.1.0'
+        instance.interval_method = model_data.get('interval_method') or instance.interval_method
+        instance.interval_confidence = model_data.get('interval_confidence') or instance.interval_confidence
+        instance.missing_columns = model_data.get('missing_columns') or instance.missing_columns
+        instance.missing_values = model_data.get('missing_values') or instance.missing_values
+        instance.residual_spread = model_data.get('residual_spread')
+        instance.training_history = list(model_data.get('training_history') or [])
         
         return instance
 
@@ -0,0 +1,795 @@
+"""
+Memory-mappable MycolModel artifacts.
+
+A model is saved as a directory instead of a single pickle:
+
+    manifest.json       format, model type and version, feature names,
+                        encoder, scaler parameters and a checksum per file
+    roots.npy           first node of every tree
+    children.npy        index of each node's left child; the right child
+                        always follows it, and leaves point at themselves
+    feature.npy         feature tested at each node
+    threshold.npy       split threshold of each node (float32)
+    missing_right.npy   whether a missing (NaN) value goes to the right child
+    value.npy           leaf output of each node (mean or class probabilities)
+    cover.npy           weighted training samples reaching each node, used
+                        for per-row explanations (see explanations)
+
+A compacted forest (see model_compaction) has the scaler folded into its
+thresholds, so it is scored on raw float32 features, and may store narrower
+dtypes and fewer trees and nodes; it loads the same way.
+
+The arrays are stored uncompressed and opened with ``np.load(mmap_mode='r')``,
+so loading is nearly instant and every process that loads the same artifact
+shares one copy of the trees through the OS page cache. sklearn copies tree
+arrays into private memory when it unpickles a forest (even through joblib's
+``mmap_mode``), so fitted forests are scored by ``PackedForest``, which works
+directly on the mapped arrays. Estimators that cannot be packed are stored as
+an uncompressed ``estimator.joblib`` instead; a packed forest can carry one
+too (``include_estimator``) so that it can be loaded for further training.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+import joblib
+import numpy as np
+from scipy.stats import norm
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 'mycol-model'
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+ESTIMATOR_FILENAME = 'estimator.joblib'
+
+# Ways PackedForest.predict_interval derives per-row intervals from the trees
+INTERVAL_METHODS = ('normal', 'quantile')
+
+# Rows scored per block; bounds the (rows x trees) node index matrix
+_PREDICT_BLOCK_ROWS = 4096
+_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+# (artifact path, manifest mtime) pairs whose checksums this process has verified
+_verified_artifacts = set()
+
+
+def _pack_tree(tree) -> Dict[str, np.ndarray]:
+    """
+    Renumber one fitted sklearn tree breadth first, with siblings adjacent.
+
+    Adjacent siblings let traversal compute the next node as
+    ``children[node] + (x > threshold[node])`` with a single lookup.
+    """
+    left, right = tree.children_left, tree.children_right
+
+    order = [np.zeros(1, dtype=np.int64)]
+    frontier = order[0]
+    while frontier.size:
+        internal = frontier[left[frontier] != -1]
+        frontier = np.column_stack((left[internal], right[internal])).ravel()
+        order.append(frontier)
+    order = np.concatenate(order)
+
+    position = np.empty(tree.node_count, dtype=np.int64)
+    position[order] = np.arange(len(order))
+    is_leaf = left[order] == -1
+    children = np.where(is_leaf, np.arange(len(order)), position[np.where(is_leaf, 0, left[order])])
+
+    # sklearn compares float32 inputs against float64 thresholds. Rounding each
+    # threshold down to the nearest float32 gives exactly the same decisions.
+    threshold = tree.threshold[order].astype(np.float32)
+    rounded_up = threshold.astype(np.float64) > tree.threshold[order]
+    threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+    threshold[is_leaf] = np.inf
+
+    # NaN fails every comparison, so its direction is stored per node
+    missing_right = ~tree.missing_go_to_left[order].astype(bool)
+    missing_right[is_leaf] = False
+
+    return {
+        'children': children,
+        'feature': np.where(is_leaf, 0, tree.feature[order]),
+        'threshold': threshold,
+        'missing_right': missing_right,
+        'value': tree.value[order, 0, :],
+        'cover': tree.weighted_n_node_samples[order]
+    }
+
+
+def _repack(arrays: Dict[str, np.ndarray], roots: np.ndarray, leaf: np.ndarray) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Renumber the nodes reachable from ``roots`` breadth first, tree by tree.
+
+    Nodes flagged in ``leaf`` become leaves, which drops their subtrees.
+
+    Returns:
+        Tuple of (node arrays with the original dtypes, max depth)
+    """
+    children = arrays['children']
+    orders, new_roots = [], []
+    size = max_depth = 0
+    for root in roots:
+        levels = [np.array([root])]
+        while True:
+            internal = levels[-1][~leaf[levels[-1]]]
+            if not internal.size:
+                break
+            levels.append(np.column_stack((children[internal], children[internal] + 1)).ravel())
+        new_roots.append(size)
+        orders.append(np.concatenate(levels))
+        size += len(orders[-1])
+        max_depth = max(max_depth, len(levels) - 1)
+    order = np.concatenate(orders)
+
+    position = np.zeros(len(children), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    is_leaf = leaf[order]
+    repacked = {
+        'roots': np.array(new_roots, dtype=arrays['roots'].dtype),
+        'children': np.where(is_leaf, np.arange(len(order)), position[children[order]]).astype(children.dtype),
+        'feature': np.where(is_leaf, 0, arrays['feature'][order]).astype(arrays['feature'].dtype),
+        'threshold': np.where(is_leaf, np.inf, arrays['threshold'][order]).astype(arrays['threshold'].dtype),
+        'missing_right': np.where(is_leaf, False, arrays['missing_right'][order]),
+        'value': np.asarray(arrays['value'][order])
+    }
+    if 'cover' in arrays:
+        repacked['cover'] = np.asarray(arrays['cover'][order])
+    return repacked, max_depth
+
+
+class PackedForest:
+    """Read-only random forest predictor over flat, memory-mappable node arrays."""
+
+    ARRAY_NAMES = ('roots', 'children', 'feature', 'threshold', 'missing_right', 'value', 'cover')
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        max_depth: int,
+        n_features: int,
+        feature_importances: np.ndarray,
+        classes: np.ndarray = None,
+        scaled_inputs: bool = True
+    ):
+        """
+        Initialize the predictor.
+
+        Args:
+            arrays: Node arrays named as in ARRAY_NAMES, possibly memory-mapped
+            max_depth: Depth of the deepest tree
+            n_features: Number of input features
+            feature_importances: Impurity-based feature importances
+            classes: Class labels for a classifier, None for a regressor
+            scaled_inputs: Whether thresholds apply to standardized features;
+                False once the scaler has been folded in (see fold_scaler)
+        """
+        self.roots = arrays['roots']
+        self.children = arrays['children']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        missing_right = arrays.get('missing_right')
+        # Artifacts written before missing_right was stored send NaN left
+        self.missing_right = missing_right if missing_right is not None else np.zeros(len(self.children), dtype=bool)
+        # Older artifacts have no node covers and cannot be explained
+        self.cover = arrays.get('cover')
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        self.feature_importances_ = np.asarray(feature_importances)
+        self.classes_ = np.asarray(classes) if classes is not None else None
+        self.scaled_inputs = scaled_inputs
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.children)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the node arrays."""
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def _with_arrays(self, arrays: Dict[str, np.ndarray], max_depth: int = None, **changes) -> 'PackedForest':
+        """Return a copy of this predictor with new node arrays."""
+        attributes = {
+            'max_depth': self.max_depth if max_depth is None else max_depth,
+            'n_features': self.n_features_in_,
+            'feature_importances': self.feature_importances_,
+            'classes': self.classes_,
+            'scaled_inputs': self.scaled_inputs
+        }
+        attributes.update(changes)
+        return PackedForest(arrays, **attributes)
+
+    def _leaf_mask(self) -> np.ndarray:
+        return self.children == np.arange(self.n_nodes)
+
+    def select_trees(self, trees: Iterable[int]) -> 'PackedForest':
+        """
+        Keep a subset of the trees, in their original order.
+
+        Args:
+            trees: Indices of the trees to keep
+
+        Returns:
+            New predictor with only those trees
+        """
+        trees = np.unique(np.asarray(list(trees), dtype=np.int64))
+        arrays, max_depth = _repack(self.arrays(), self.roots[trees], self._leaf_mask())
+        return self._with_arrays(arrays, max_depth)
+
+    def subtree_deviation(self) -> np.ndarray:
+        """
+        For every node, the largest difference between its own value and the
+        value of any leaf below it (0 for leaves).
+
+        Replacing a subtree by its root's value changes that tree's output by
+        at most this much, for any input.
+        """
+        leaf = self._leaf_mask()
+        value = np.asarray(self.value, dtype=np.float64)
+        low, high = value.copy(), value.copy()
+
+        levels = [np.asarray(self.roots, dtype=np.int64)]
+        while levels[-1].size:
+            internal = levels[-1][~leaf[levels[-1]]]
+            levels.append(np.column_stack((self.children[internal], self.children[internal] + 1)).ravel())
+        # Children always follow their parent, so fold the levels from the bottom up
+        for level in reversed(levels):
+            internal = level[~leaf[level]]
+            left = self.children[internal]
+            low[internal] = np.minimum(low[left], low[left + 1])
+            high[internal] = np.maximum(high[left], high[left + 1])
+
+        return np.maximum(high - value, value - low).max(axis=1)
+
+    def collapse_nodes(self, tolerance: float, deviation: np.ndarray = None) -> 'PackedForest':
+        """
+        Turn every subtree whose leaves are all within ``tolerance`` of its
+        root's value into a single leaf.
+
+        Args:
+            tolerance: Largest change of a single tree's output allowed
+            deviation: Precomputed subtree_deviation() of this predictor
+
+        Returns:
+            New, smaller predictor
+        """
+        if deviation is None:
+            deviation = self.subtree_deviation()
+        arrays, max_depth = _repack(self.arrays(), self.roots, self._leaf_mask() | (deviation <= tolerance))
+        return self._with_arrays(arrays, max_depth)
+
+    def fold_scaler(self, mean: Optional[np.ndarray], scale: Optional[np.ndarray]) -> 'PackedForest':
+        """
+        Move feature standardization into the thresholds.
+
+        ``(x - mean) / scale > t`` is ``x > t * scale + mean`` for a positive
+        scale, so the returned predictor takes raw features and no scaling is
+        needed at prediction time.
+
+        Args:
+            mean: Scaler mean_ (None if the scaler does not center)
+            scale: Scaler scale_ (None if the scaler does not scale)
+
+        Returns:
+            New predictor with scaled_inputs False
+        """
+        if not self.scaled_inputs:
+            raise ValueError("The scaler is already folded into this forest")
+        leaf = self._leaf_mask()
+        threshold = np.asarray(self.threshold, dtype=np.float64).copy()
+        if scale is not None:
+            threshold *= np.asarray(scale)[self.feature]
+        if mean is not None:
+            threshold += np.asarray(mean)[self.feature]
+
+        # Round down to float32, as when packing, so x > threshold stays exact at float32 resolution
+        folded = threshold.astype(np.float32)
+        rounded_up = folded.astype(np.float64) > threshold
+        folded[rounded_up] = np.nextafter(folded[rounded_up], np.float32(-np.inf))
+        folded[leaf] = np.inf
+
+        arrays = dict(self.arrays(), threshold=folded)
+        return self._with_arrays(arrays, scaled_inputs=False)
+
+    def compact_dtypes(self) -> 'PackedForest':
+        """
+        Store feature indices in the narrowest integer type, and leaf values
+        and node covers as float32 (trees are still averaged in float64).
+
+        Returns:
+            New predictor with narrower arrays
+        """
+        arrays = self.arrays()
+        arrays['feature'] = np.asarray(arrays['feature']).astype(np.min_scalar_type(max(self.n_features_in_ - 1, 0)))
+        arrays['value'] = np.asarray(arrays['value']).astype(np.float32)
+        if 'cover' in arrays:
+            arrays['cover'] = np.asarray(arrays['cover']).astype(np.float32)
+        return self._with_arrays(arrays)
+
+    def tree_values(self, X) -> np.ndarray:
+        """
+        Leaf value of every tree for every row.
+
+        Args:
+            X: 2D array of features
+
+        Returns:
+            Array of shape (rows, trees, outputs)
+        """
+        output = np.empty((len(X), self.n_estimators, self.value.shape[1]), dtype=np.float64)
+        for rows, leaf_values in self._leaf_value_blocks(X):
+            output[rows] = leaf_values
+        return output
+
+    @classmethod
+    def supports(cls, estimator) -> bool:
+        """Whether an estimator is a fitted single-output forest that can be packed."""
+        return (
+            isinstance(estimator, (RandomForestRegressor, RandomForestClassifier))
+            and hasattr(estimator, 'estimators_')
+            and estimator.n_outputs_ == 1
+        )
+
+    @classmethod
+    def from_estimator(cls, estimator) -> 'PackedForest':
+        """
+        Pack a fitted sklearn random forest.
+
+        Args:
+            estimator: Fitted RandomForestRegressor or RandomForestClassifier
+
+        Returns:
+            Packed predictor producing the same predictions
+        """
+        if not cls.supports(estimator):
+            raise ValueError(f"Cannot pack estimator of type {type(estimator).__name__}")
+
+        packed = [_pack_tree(tree.tree_) for tree in estimator.estimators_]
+        sizes = np.array([len(tree['children']) for tree in packed])
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        value = np.concatenate([tree['value'] for tree in packed]).astype(np.float64)
+        classes = getattr(estimator, 'classes_', None)
+        if classes is not None:
+            # Leaf class weights become probabilities, as in DecisionTreeClassifier.predict_proba
+            totals = value.sum(axis=1, keepdims=True)
+            value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+
+        arrays = {
+            'roots': offsets.astype(np.int32),
+            'children': np.concatenate([
+                tree['children'] + offset for tree, offset in zip(packed, offsets)
+            ]).astype(np.int32),
+            'feature': np.concatenate([tree['feature'] for tree in packed]).astype(np.int32),
+            'threshold': np.concatenate([tree['threshold'] for tree in packed]),
+            'missing_right': np.concatenate([tree['missing_right'] for tree in packed]),
+            'value': value,
+            'cover': np.concatenate([tree['cover'] for tree in packed])
+        }
+        return cls(
+            arrays,
+            max_depth=max(tree.tree_.max_depth for tree in estimator.estimators_),
+            n_features=estimator.n_features_in_,
+            feature_importances=estimator.feature_importances_,
+            classes=classes
+        )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Return the node arrays by name."""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES if getattr(self, name) is not None}
+
+    def _leaf_value_blocks(self, X) -> Iterator[Tuple[slice, np.ndarray]]:
+        """
+        Yield the leaf value every tree reaches for each block of rows.
+
+        Yields:
+            Tuples of (row slice, leaf values of shape (rows, trees, outputs))
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        if n_features != self.n_features_in_:
+            raise ValueError(f"X has {n_features} features, but the model expects {self.n_features_in_}")
+
+        flat = X.reshape(-1)
+        for start in range(0, n_rows, _PREDICT_BLOCK_ROWS):
+            stop = min(start + _PREDICT_BLOCK_ROWS, n_rows)
+            row_offsets = (np.arange(stop - start, dtype=np.int64) * n_features + start * n_features)[:, None]
+
+            # One column per tree; every row walks all trees one level at a time
+            node = np.broadcast_to(self.roots, (stop - start, len(self.roots))).copy()
+            if np.isnan(flat[start * n_features:stop * n_features]).any():
+                for _ in range(self.max_depth):
+                    values = flat[row_offsets + self.feature[node]]
+                    go_right = np.where(np.isnan(values), self.missing_right[node], values > self.threshold[node])
+                    node = self.children[node] + go_right
+            else:
+                for _ in range(self.max_depth):
+                    node = self.children[node] + (flat[row_offsets + self.feature[node]] > self.threshold[node])
+
+            yield slice(start, stop), self.value[node]
+
+    @staticmethod
+    def _tree_mean(leaf_values: np.ndarray) -> np.ndarray:
+        """
+        Average leaf values over trees (axis 1).
+
+        Trees are accumulated one by one, in the same order as sklearn, so the
+        averages are bit-identical to the unpacked forest's.
+        """
+        total = leaf_values[:, 0].astype(np.float64)
+        for tree in range(1, leaf_values.shape[1]):
+            total += leaf_values[:, tree]
+        total /= leaf_values.shape[1]
+        return total
+
+    def _mean_leaf_value(self, X) -> np.ndarray:
+        """Average the leaf values reached by every row over all trees."""
+        output = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        for rows, leaf_values in self._leaf_value_blocks(X):
+            output[rows] = self._tree_mean(leaf_values)
+        return output
+
+    def predict_interval(
+        self,
+        X,
+        confidence: float = 0.95,
+        method: str = 'normal'
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Predict regression targets with a per-row interval from the spread of the trees.
+
+        Every row's interval depends only on that row, never on the rest of
+        the batch. All trees are evaluated in one pass over blocks of rows, so
+        memory stays bounded for any batch size.
+
+        Args:
+            X: 2D array of features, standardized unless scaled_inputs is False
+            confidence: Nominal coverage of the interval
+            method: 'normal' for mean +/- z * standard deviation of the tree
+                predictions, or 'quantile' for the empirical quantiles of the
+                tree predictions (quantile-forest style)
+
+        Returns:
+            Tuple of (predictions, lower bounds, upper bounds)
+        """
+        if self.classes_ is not None:
+            raise ValueError("predict_interval is only available for regressors")
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+        if method not in INTERVAL_METHODS:
+            raise ValueError(f"Unknown interval method: {method}")
+
+        n_rows = len(X)
+        predictions = np.empty(n_rows, dtype=np.float64)
+        lower = np.empty(n_rows, dtype=np.float64)
+        upper = np.empty(n_rows, dtype=np.float64)
+        z = norm.ppf(0.5 + confidence / 2)
+        tail = (1 - confidence) / 2
+
+        for rows, leaf_values in self._leaf_value_blocks(X):
+            tree_predictions = leaf_values[:, :, 0]
+            predictions[rows] = self._tree_mean(leaf_values)[:, 0]
+            if method == 'normal':
+                spread = z * tree_predictions.std(axis=1)
+                lower[rows] = predictions[rows] - spread
+                upper[rows] = predictions[rows] + spread
+            else:
+                lower[rows], upper[rows] = np.quantile(tree_predictions, [tail, 1 - tail], axis=1)
+
+        return predictions, lower, upper
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict targets (regressor) or class labels (classifier).
+
+        Args:
+            X: 2D array of features, standardized unless scaled_inputs is False
+
+        Returns:
+            Array with one prediction per row
+        """
+        if self.classes_ is not None:
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        return self._mean_leaf_value(X)[:, 0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Predict class probabilities.
+
+        Args:
+            X: 2D array of features, standardized unless scaled_inputs is False
+
+        Returns:
+            Array of shape (rows, classes)
+        """
+        if self.classes_ is None:
+            raise ValueError("predict_proba is only available for classifiers")
+        return self._mean_leaf_value(X)
+
+    def to_manifest(self) -> Dict[str, Any]:
+        """Describe the predictor's non-array attributes for the manifest."""
+        return {
+            'kind': 'packed_forest',
+            'max_depth': int(self.max_depth),
+            'n_features': int(self.n_features_in_),
+            'feature_importances': self.feature_importances_.tolist(),
+            'classes': self.classes_.tolist() if self.classes_ is not None else None,
+            'scaled_inputs': bool(self.scaled_inputs)
+        }
+
+
+def _scaler_to_manifest(scaler: StandardScaler) -> Optional[Dict[str, Any]]:
+    if not hasattr(scaler, 'scale_'):
+        return None
+    n_samples_seen = scaler.n_samples_seen_
+    return {
+        'with_mean': scaler.with_mean,
+        'with_std': scaler.with_std,
+        'mean': scaler.mean_.tolist() if scaler.mean_ is not None else None,
+        'var': scaler.var_.tolist() if scaler.var_ is not None else None,
+        'scale': scaler.scale_.tolist() if scaler.scale_ is not None else None,
+        'n_samples_seen': (
+            n_samples_seen.tolist() if isinstance(n_samples_seen, np.ndarray) else int(n_samples_seen)
+        ),
+        'feature_names_in': (
+            scaler.feature_names_in_.tolist() if hasattr(scaler, 'feature_names_in_') else None
+        )
+    }
+
+
+def _scaler_from_manifest(data: Optional[Dict[str, Any]]) -> StandardScaler:
+    scaler = StandardScaler()
+    if data is None:
+        return scaler
+
+    scaler.with_mean = data['with_mean']
+    scaler.with_std = data['with_std']
+    for attribute, key in (('mean_', 'mean'), ('var_', 'var'), ('scale_', 'scale')):
+        values = data[key]
+        setattr(scaler, attribute, np.asarray(values, dtype=np.float64) if values is not None else None)
+    scaler.n_samples_seen_ = (
+        np.asarray(data['n_samples_seen']) if isinstance(data['n_samples_seen'], list) else data['n_samples_seen']
+    )
+    scaler.n_features_in_ = len(scaler.scale_) if scaler.scale_ is not None else len(scaler.mean_)
+    if data.get('feature_names_in') is not None:
+        scaler.feature_names_in_ = np.asarray(data['feature_names_in'], dtype=object)
+    return scaler
+
+
+def _hash_file(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _combined_checksum(files: Dict[str, Dict[str, Any]]) -> str:
+    payload = json.dumps({name: entry['sha256'] for name, entry in files.items()}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_artifact(path: str) -> bool:
+    """Whether a path is a model artifact directory."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILENAME))
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """
+    Read the manifest of a model artifact.
+
+    Args:
+        path: Artifact directory
+
+    Returns:
+        The manifest
+    """
+    with open(os.path.join(path, MANIFEST_FILENAME), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get('format_version', 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest['format_version']} in {path}")
+    return manifest
+
+
+def verify_artifact(path: str, manifest: Dict[str, Any] = None, checksums: bool = True) -> None:
+    """
+    Check the files of an artifact against its manifest.
+
+    Args:
+        path: Artifact directory
+        manifest: Already loaded manifest (optional)
+        checksums: Hash every file and compare it with its checksum; without
+            this only the manifest's own checksum and the file sizes are
+            checked, which does not read the arrays
+    """
+    manifest = manifest or read_manifest(path)
+    files = manifest['files']
+    if _combined_checksum(files) != manifest['checksum']:
+        raise ValueError(f"Manifest checksum mismatch in {path}")
+
+    for name, entry in files.items():
+        filepath = os.path.join(path, name)
+        if not os.path.exists(filepath) or os.path.getsize(filepath) != entry['size']:
+            raise ValueError(f"Artifact file {name} is missing or truncated in {path}")
+        if checksums and _hash_file(filepath) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for artifact file {name} in {path}")
+
+
+def write_artifact(path: str, model, include_estimator: bool = False) -> Dict[str, Any]:
+    """
+    Write a MycolModel as an artifact directory.
+
+    The artifact is assembled in a temporary directory next to ``path`` and
+    then renamed into place, so readers never see a partial artifact. An
+    existing artifact at ``path`` is replaced; processes that still have its
+    arrays mapped keep reading the old files until they load the new ones.
+
+    Args:
+        path: Artifact directory to write
+        model: MycolModel to save
+        include_estimator: Also store a packed forest's sklearn estimator,
+            which training needs but prediction does not
+
+    Returns:
+        The written manifest
+    """
+    path = path.rstrip(os.sep)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    try:
+        files = {}
+        estimator = model.model
+        if isinstance(estimator, PackedForest):
+            forest = estimator
+        elif PackedForest.supports(estimator):
+            forest = PackedForest.from_estimator(estimator)
+        else:
+            forest = None
+
+        if forest is not None:
+            estimator_manifest = forest.to_manifest()
+            for name, array in forest.arrays().items():
+                filename = f"{name}.npy"
+                np.save(os.path.join(tmp_path, filename), np.ascontiguousarray(array))
+                files[filename] = None
+            if include_estimator and not isinstance(estimator, PackedForest):
+                joblib.dump(estimator, os.path.join(tmp_path, ESTIMATOR_FILENAME))
+                files[ESTIMATOR_FILENAME] = None
+                estimator_manifest['trainable'] = ESTIMATOR_FILENAME
+        else:
+            # Unfitted or unpackable estimators keep their sklearn form
+            estimator_manifest = {'kind': 'joblib', 'trainable': ESTIMATOR_FILENAME}
+            joblib.dump(estimator, os.path.join(tmp_path, ESTIMATOR_FILENAME))
+            files[ESTIMATOR_FILENAME] = None
+
+        files = {
+            filename: {
+                'sha256': _hash_file(os.path.join(tmp_path, filename)),
+                'size': os.path.getsize(os.path.join(tmp_path, filename))
+            }
+            for filename in files
+        }
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'model_type': model.model_type,
+            'engine': model.engine,
+            'estimator_params': model.estimator_params,
+            'version': model.version,
+            'interval_method': model.interval_method,
+            'interval_confidence': model.interval_confidence,
+            'missing_columns': model.missing_columns,
+            'missing_values': model.missing_values,
+            'residual_spread': model.residual_spread,
+            'feature_names': list(model.feature_names),
+            'encoder': model.encoder.to_dict() if model.encoder else None,
+            'scaler': _scaler_to_manifest(model.scaler),
+            'training_history': model.training_history,
+            'estimator': estimator_manifest,
+            'files': files,
+            'checksum': _combined_checksum(files),
+            'created_at': datetime.utcnow().isoformat()
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(path):
+            old_path = f"{path}.{os.getpid()}.old"
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            if os.path.isdir(old_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+            else:
+                os.remove(old_path)
+        else:
+            os.replace(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return manifest
+
+
+def read_artifact(
+    path: str,
+    mmap_mode: Optional[str] = 'r',
+    verify: bool = True,
+    trainable: bool = False,
+    checksums: bool = False
+) -> Dict[str, Any]:
+    """
+    Read the components of a model artifact.
+
+    Hashing every file would read all of its pages on each load, which is
+    what memory mapping avoids, so by default only the manifest and the file
+    sizes are checked. The checksums are computed from the written files by
+    ``write_artifact`` and checked by ``model_serving.publish_model``.
+
+    Args:
+        path: Artifact directory
+        mmap_mode: Mode the node arrays are memory-mapped with, or None to
+            read them into private memory
+        verify: Check the manifest and that every file is present and complete
+        trainable: Load the stored sklearn estimator instead of the packed forest
+        checksums: Also check every file's checksum, once per artifact version
+            and process
+
+    Returns:
+        Dictionary with the manifest, the estimator and the fitted scaler
+    """
+    manifest = read_manifest(path)
+    if checksums:
+        # An artifact is replaced as a whole, so its manifest's mtime identifies its version
+        key = (os.path.realpath(path), os.stat(os.path.join(path, MANIFEST_FILENAME)).st_mtime_ns)
+        if key not in _verified_artifacts:
+            verify_artifact(path, manifest)
+            _verified_artifacts.add(key)
+    elif verify:
+        verify_artifact(path, manifest, checksums=False)
+
+    estimator_manifest = manifest['estimator']
+    if trainable:
+        if not estimator_manifest.get('trainable'):
+            raise ValueError(f"{path} was saved without its trainable estimator")
+        # Training modifies the estimator, so it is read into private memory
+        estimator = joblib.load(os.path.join(path, estimator_manifest['trainable']))
+    elif estimator_manifest['kind'] == 'packed_forest':
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in PackedForest.ARRAY_NAMES
+            if f"{name}.npy" in manifest['files']
+        }
+        estimator = PackedForest(
+            arrays,
+            max_depth=estimator_manifest['max_depth'],
+            n_features=estimator_manifest['n_features'],
+            feature_importances=estimator_manifest['feature_importances'],
+            classes=estimator_manifest['classes'],
+            scaled_inputs=estimator_manifest.get('scaled_inputs', True)
+        )
+    else:
+        estimator = joblib.load(os.path.join(path, ESTIMATOR_FILENAME), mmap_mode=mmap_mode)
+
+    return {
+        'manifest': manifest,
+        'estimator': estimator,
+        'scaler': _scaler_from_manifest(manifest['scaler'])
+    }
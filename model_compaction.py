@@ -0,0 +1,217 @@
+"""
+Compaction of random forest MycolModels for serving.
+
+A compacted model is a smaller, faster copy of a fitted forest:
+
+- the scaler is folded into the split thresholds, so prediction aligns
+  features straight into float32 and skips standardization altogether;
+- leaf values are stored as float32 and feature indices in the narrowest
+  integer type;
+- optionally, within an accuracy budget measured on validation data, the
+  trees contributing least are dropped and subtrees whose leaves barely
+  differ are collapsed into a single leaf.
+
+The result is saved as an ordinary model artifact and loads through
+``MycolModel.load``. It cannot be trained further.
+"""
+
+import copy
+import time
+import logging
+from typing import Dict, Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, r2_score
+
+from model import MycolModel
+from model_artifact import PackedForest
+
+logger = logging.getLogger(__name__)
+
+# Share of the accuracy budget tree pruning may use; node collapsing gets the rest
+TREE_BUDGET_FRACTION = 0.5
+
+# Bisection steps when searching the largest node-collapse tolerance
+_TOLERANCE_SEARCH_STEPS = 12
+
+_LATENCY_REQUESTS = 200
+
+
+def _score(model_type: str, forest: PackedForest, X: np.ndarray, y: np.ndarray) -> float:
+    if model_type == 'classifier':
+        return float(accuracy_score(y, forest.predict(X)))
+    return float(r2_score(y, forest.predict(X)))
+
+
+def _prune_trees(
+    model_type: str,
+    forest: PackedForest,
+    X: np.ndarray,
+    y: np.ndarray,
+    min_score: float,
+    min_trees: int
+) -> PackedForest:
+    """
+    Greedily drop the tree whose removal hurts the validation score least,
+    as long as the score stays at or above ``min_score``.
+    """
+    values = forest.tree_values(X)
+    kept = list(range(forest.n_estimators))
+    total = values.sum(axis=1)
+    if model_type == 'classifier':
+        labels = np.searchsorted(forest.classes_, y)
+
+    while len(kept) > min_trees:
+        # Ensemble output without each candidate tree, for all candidates at once
+        without = (total[:, None, :] - values[:, kept, :]) / (len(kept) - 1)
+        if model_type == 'classifier':
+            scores = (without.argmax(axis=2) == labels[:, None]).mean(axis=0)
+        else:
+            residual = ((y[:, None] - without[:, :, 0]) ** 2).sum(axis=0)
+            scores = 1 - residual / ((y - y.mean()) ** 2).sum()
+        best = int(np.argmax(scores))
+        if scores[best] < min_score:
+            break
+        total -= values[:, kept[best], :]
+        del kept[best]
+
+    return forest.select_trees(kept) if len(kept) < forest.n_estimators else forest
+
+
+def _collapse_nodes(
+    model_type: str,
+    forest: PackedForest,
+    X: np.ndarray,
+    y: np.ndarray,
+    min_score: float
+) -> PackedForest:
+    """Collapse subtrees with the largest tolerance that keeps the score at or above ``min_score``."""
+    deviation = forest.subtree_deviation()
+    low, high = 0.0, float(deviation.max())
+    best = forest
+    for _ in range(_TOLERANCE_SEARCH_STEPS):
+        tolerance = (low + high) / 2
+        candidate = forest.collapse_nodes(tolerance, deviation)
+        if _score(model_type, candidate, X, y) >= min_score:
+            best, low = candidate, tolerance
+        else:
+            high = tolerance
+    return best
+
+
+def _measure_latency(model: MycolModel, X: pd.DataFrame) -> Dict[str, float]:
+    """Batch throughput and median single-row latency of predict_arrays."""
+    model.predict_arrays(X.iloc[:1])  # Compile the feature schema outside the timings
+    start = time.perf_counter()
+    model.predict_arrays(X)
+    batch_seconds = time.perf_counter() - start
+
+    rows = [X.iloc[[i % len(X)]] for i in range(_LATENCY_REQUESTS)]
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_arrays(row)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'batch_rows_per_sec': round(len(X) / batch_seconds, 1) if batch_seconds > 0 else None,
+        'single_row_ms': round(float(np.median(latencies)) * 1000, 4)
+    }
+
+
+def _summary(forest: PackedForest) -> Dict[str, Any]:
+    return {
+        'trees': int(forest.n_estimators),
+        'nodes': int(forest.n_nodes),
+        'max_depth': int(forest.max_depth),
+        'bytes': int(forest.nbytes)
+    }
+
+
+def compact_model(
+    model: MycolModel,
+    X_val: Optional[Union[pd.DataFrame, Dict[str, Any]]] = None,
+    y_val=None,
+    accuracy_budget: float = 0.0,
+    min_trees: int = 25
+) -> Dict[str, Any]:
+    """
+    Build a compacted copy of a random forest model.
+
+    Without validation data (or with a zero budget) only the lossless-in-
+    practice steps are applied: folding the scaler into the thresholds and
+    narrowing the array dtypes. Pruning picks the trees and subtrees to drop
+    on the validation data, so use rows the model was not trained on.
+
+    Args:
+        model: Fitted random forest model
+        X_val: Validation features, also used to measure latency
+        y_val: Validation targets
+        accuracy_budget: Largest allowed drop of the validation score (R2 for
+            regressors, accuracy for classifiers) from the original model
+        min_trees: Fewest trees tree pruning may leave; the per-row intervals
+            come from the spread of the remaining trees
+
+    Returns:
+        Dictionary with the compacted ``model`` and a ``report`` comparing
+        trees, nodes, array bytes, validation score and latency before and
+        after compaction
+    """
+    forest = model._forest_predictor()
+    if forest is None:
+        raise ValueError(f"Only random forest models can be compacted, not the {model.engine} engine")
+    if not forest.scaled_inputs:
+        raise ValueError("Model is already compacted")
+
+    scaler = model.scaler
+    compacted = forest.fold_scaler(
+        scaler.mean_ if scaler.with_mean else None,
+        scaler.scale_ if scaler.with_std else None
+    ).compact_dtypes()
+
+    validation = X_val is not None and y_val is not None
+    if validation:
+        X_val = pd.DataFrame(X_val) if isinstance(X_val, dict) else X_val
+        y = np.asarray(y_val)
+        X_raw = model._feature_schema().transform(X_val, copy=True)
+        X_scaled = model._scale(X_raw.copy())
+        score_before = _score(model.model_type, forest, X_scaled, y)
+
+        if accuracy_budget > 0:
+            min_score = score_before - accuracy_budget
+            compacted = _prune_trees(
+                model.model_type, compacted, X_raw, y,
+                min_score=score_before - accuracy_budget * TREE_BUDGET_FRACTION,
+                min_trees=min_trees
+            )
+            compacted = _collapse_nodes(model.model_type, compacted, X_raw, y, min_score=min_score)
+        score_after = _score(model.model_type, compacted, X_raw, y)
+    elif accuracy_budget > 0:
+        logger.warning("No validation data given; skipping tree and node pruning")
+
+    result = copy.copy(model)
+    result.model = compacted
+    result._packed = None
+    result._schema = None
+    result._importances = None
+    result._explainer = None
+    result.training_history = list(model.training_history)
+
+    report = {
+        'model_type': model.model_type,
+        'accuracy_budget': accuracy_budget,
+        'before': _summary(forest),
+        'after': _summary(compacted)
+    }
+    if validation:
+        report['scoring'] = 'accuracy' if model.model_type == 'classifier' else 'r2'
+        report['before']['validation_score'] = round(score_before, 6)
+        report['after']['validation_score'] = round(score_after, 6)
+        report['before'].update(_measure_latency(model, X_val))
+        report['after'].update(_measure_latency(result, X_val))
+
+    before, after = report['before'], report['after']
+    logger.info(f"Compacted {before['trees']} trees / {before['nodes']} nodes ({before['bytes']} bytes) "
+                f"to {after['trees']} trees / {after['nodes']} nodes ({after['bytes']} bytes)")
+    return {'model': result, 'report': report}
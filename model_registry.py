@@ -0,0 +1,360 @@
+"""
+Registry of fitted MycolModel instances.
+
+Models are keyed by model type, feature schema and a hash of the data they
+were trained on, and are kept both on disk (one memory-mappable artifact
+directory per key plus a JSON index) and in a small in-memory LRU cache.
+Batch processing reuses the latest registered model with the batch's feature
+schema and only fits a new one when asked to retrain (or when no model with
+that schema exists yet). Only the ``max_models`` most recently registered
+models are kept.
+
+The index is shared by every process using the directory (e.g. the batch
+worker pool), so its read-modify-write cycles hold an exclusive lock on
+``index.lock``.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import active_config
+from model import MycolModel
+from feature_encoding import CategoricalEncoder
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is only guarded within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'index.json'
+LOCK_FILENAME = 'index.lock'
+
+
+def hash_feature_schema(feature_names: List[str]) -> str:
+    """
+    Hash an ordered list of feature names.
+
+    Args:
+        feature_names: Feature names in model column order
+
+    Returns:
+        Hex digest of the schema
+    """
+    return hashlib.sha256('\n'.join(map(str, feature_names)).encode('utf-8')).hexdigest()
+
+
+def hash_training_data(X: pd.DataFrame, y=None) -> str:
+    """
+    Hash training features and target without converting rows to Python objects.
+
+    Args:
+        X: Training features
+        y: Training target (optional)
+
+    Returns:
+        Hex digest of the training data
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    if y is not None:
+        digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def make_model_key(model_type: str, feature_names: List[str], data_hash: str) -> str:
+    """
+    Build the registry key for a model.
+
+    Args:
+        model_type: Type of model ('regressor' or 'classifier')
+        feature_names: Feature names in model column order
+        data_hash: Hash of the training data
+
+    Returns:
+        Registry key
+    """
+    return f"{model_type}-{hash_feature_schema(feature_names)[:12]}-{data_hash[:16]}"
+
+
+class ModelRegistry:
+    """Disk-backed registry of fitted models with an in-memory LRU cache."""
+
+    def __init__(self, registry_dir: str, cache_size: int = 8, max_models: int = None):
+        """
+        Initialize the registry.
+
+        Args:
+            registry_dir: Directory holding model artifacts and the index
+            cache_size: Maximum number of models kept in memory
+            max_models: Maximum number of models kept on disk; the oldest
+                registered are deleted beyond it (default: no limit)
+        """
+        self.registry_dir = registry_dir
+        self.cache_size = cache_size
+        self.max_models = max_models
+        self._models: 'OrderedDict[str, MycolModel]' = OrderedDict()
+        self._lock = threading.RLock()
+        os.makedirs(registry_dir, exist_ok=True)
+
+    def artifact_path(self, key: str) -> str:
+        """Path of the model artifact stored under a key."""
+        return os.path.join(self.registry_dir, f"{key}.model")
+
+    def _existing_artifact(self, key: str) -> Optional[str]:
+        """Path of the stored model for a key, falling back to a legacy pickle."""
+        for path in (self.artifact_path(key), os.path.join(self.registry_dir, f"{key}.pkl")):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _index_path(self) -> str:
+        return os.path.join(self.registry_dir, INDEX_FILENAME)
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path(), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.error(f"Corrupt model registry index: {str(e)}")
+            return {}
+
+    @contextmanager
+    def _index_lock(self):
+        """Hold the index exclusively, across threads and processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.registry_dir, LOCK_FILENAME), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        tmp_path = f"{self._index_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self._index_path())
+
+    def _cache(self, key: str, model: MycolModel) -> None:
+        self._models[key] = model
+        self._models.move_to_end(key)
+        while len(self._models) > self.cache_size:
+            self._models.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._models or self._existing_artifact(key) is not None
+
+    def get(self, key: str) -> Optional[MycolModel]:
+        """
+        Get a registered model.
+
+        Args:
+            key: Registry key
+
+        Returns:
+            The fitted model, or None if the key is not registered
+        """
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+            path = self._existing_artifact(key)
+            if path is None:
+                return None
+
+            model = MycolModel.load(path)
+            self._cache(key, model)
+            logger.info(f"Loaded registered model {key}")
+            return model
+
+    def register(self, key: str, model: MycolModel, metadata: Dict[str, Any] = None) -> None:
+        """
+        Add a fitted model to the registry.
+
+        Args:
+            key: Registry key
+            model: Fitted model
+            metadata: Extra information stored in the index
+        """
+        with self._index_lock():
+            # Written to a temporary directory and renamed into place
+            model.save(self.artifact_path(key))
+
+            index = self._read_index()
+            index[key] = {
+                'model_type': model.model_type,
+                'schema_hash': hash_feature_schema(model.feature_names),
+                'feature_count': len(model.feature_names),
+                'version': model.version,
+                'registered_at': datetime.utcnow().isoformat(),
+                **(metadata or {})
+            }
+            evicted = self._evict(index, keep=key)
+            self._write_index(index)
+            self._cache(key, model)
+
+        logger.info(f"Registered model {key}")
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} old registered models: {', '.join(evicted)}")
+
+    def _published_path(self) -> Optional[str]:
+        """Artifact the serving pointer refers to, which must not be evicted."""
+        try:
+            with open(active_config.SERVING_MODEL_POINTER, 'r') as f:
+                return os.path.realpath(json.load(f)['path'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep: str) -> List[str]:
+        """Delete the oldest registered models beyond max_models from disk and the index."""
+        if not self.max_models or len(index) <= self.max_models:
+            return []
+
+        published = self._published_path()
+        candidates = sorted(
+            (entry.get('registered_at', ''), key) for key, entry in index.items()
+            if key != keep and os.path.realpath(self.artifact_path(key)) != published
+        )
+        evicted = []
+        for _, key in candidates[:len(index) - self.max_models]:
+            del index[key]
+            self._models.pop(key, None)
+            path = self._existing_artifact(key)
+            if path and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)  # Processes with it mapped keep their copy
+            elif path:
+                os.remove(path)
+            evicted.append(key)
+        return evicted
+
+    def latest(self, model_type: str, feature_names: List[str] = None) -> Optional[Tuple[str, MycolModel]]:
+        """
+        Get the most recently registered model of a type.
+
+        Args:
+            model_type: Type of model
+            feature_names: If given, only models with this exact schema match
+
+        Returns:
+            Tuple of (key, model), or None if nothing matches
+        """
+        schema_hash = hash_feature_schema(feature_names) if feature_names is not None else None
+        candidates = [
+            (entry.get('registered_at', ''), key)
+            for key, entry in self._read_index().items()
+            if entry.get('model_type') == model_type
+            and (schema_hash is None or entry.get('schema_hash') == schema_hash)
+        ]
+        for _, key in sorted(candidates, reverse=True):
+            model = self.get(key)
+            if model is not None:
+                return key, model
+        return None
+
+    def list_models(self) -> Dict[str, Dict[str, Any]]:
+        """Return the registry index."""
+        return self._read_index()
+
+    def get_or_fit(
+        self,
+        model_type: str,
+        X: pd.DataFrame,
+        y,
+        retrain: bool = False,
+        encoder: CategoricalEncoder = None
+    ) -> Tuple[str, MycolModel]:
+        """
+        Return a registered model for this feature schema, fitting one only if needed.
+
+        Without ``retrain``, the model registered for exactly this training
+        data is reused, or else the latest registered model with the same
+        feature schema. A model is fitted on X and y only when retraining is
+        asked for or no model with this schema has been registered yet.
+
+        Args:
+            model_type: Type of model
+            X: Training features
+            y: Training target
+            retrain: Fit and register a model on this data even if one could be reused
+            encoder: Categorical encoder that produced X, saved with the model
+
+        Returns:
+            Tuple of (key, fitted model)
+        """
+        key = make_model_key(model_type, list(X.columns), hash_training_data(X, y))
+
+        if not retrain:
+            model = self.get(key)
+            if model is not None:
+                logger.info(f"Reusing registered model {key}")
+                return key, model
+
+            latest = self.latest(model_type, list(X.columns))
+            if latest is not None:
+                logger.info(f"Reusing latest registered model {latest[0]} with the same features; "
+                            f"retrain to fit one on this data")
+                return latest
+
+        logger.info(f"Fitting {model_type} model {key} on {len(X)} samples")
+        model = MycolModel(model_type=model_type)
+        model.encoder = encoder
+        model.fit(X, y)
+        self.register(key, model, {'training_rows': len(X)})
+        return key, model
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide registry configured by MODEL_REGISTRY_FOLDER."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry(
+                active_config.MODEL_REGISTRY_FOLDER,
+                cache_size=active_config.MODEL_REGISTRY_CACHE_SIZE,
+                max_models=active_config.MODEL_REGISTRY_MAX_MODELS
+            )
+        return _default_registry
+
+
+def configure_model_registry(registry_dir: str, cache_size: int = None) -> ModelRegistry:
+    """
+    Replace the process-wide registry, e.g. to point a script at a scratch directory.
+
+    Args:
+        registry_dir: Directory holding model artifacts and the index
+        cache_size: Maximum number of models kept in memory (default: MODEL_REGISTRY_CACHE_SIZE)
+
+    Returns:
+        The new process-wide registry
+    """
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = ModelRegistry(
+            registry_dir,
+            cache_size=cache_size or active_config.MODEL_REGISTRY_CACHE_SIZE,
+            max_models=active_config.MODEL_REGISTRY_MAX_MODELS
+        )
+        return _default_registry
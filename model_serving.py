@@ -0,0 +1,261 @@
+"""
+Warm, hot-swappable model serving for the API.
+
+Each worker process keeps one loaded MycolModel in memory instead of loading
+a model on every request. The served artifact comes from a pointer file
+(written by ``publish_model`` / ``python main.py model publish``) or a fixed
+``SERVING_MODEL_PATH``. The source is checked at most every
+``MODEL_RELOAD_INTERVAL`` seconds. A new version is loaded on a background
+thread while requests keep using the current model, and is then swapped in
+with one reference assignment, so there is never a window without a model.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from config import active_config
+from model import MycolModel
+from model_artifact import is_artifact, verify_artifact
+from monitoring import (
+    model_load_duration_seconds, model_reloads_total,
+    model_serving_info, model_loaded_timestamp_seconds
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NoModelPublished(Exception):
+    """Raised when there is no model artifact to serve requests with."""
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    """A loaded model together with where it came from."""
+    model: MycolModel
+    version: str
+    path: Optional[str]
+    source: Tuple  # Identity of the artifact, used to detect new versions
+    loaded_at: float
+
+
+def publish_model(model_path: str, version: str = None, pointer_file: str = None) -> Dict[str, Any]:
+    """
+    Publish a model artifact for serving.
+
+    The pointer file is replaced atomically, so serving workers see either
+    the old or the new pointer, never a partial one. Artifact checksums are
+    verified here rather than on every worker's load. Artifacts should be
+    immutable: publish a new file rather than overwriting a served one.
+
+    Args:
+        model_path: Path to a saved MycolModel artifact
+        version: Version label (default: artifact file name and modification time)
+        pointer_file: Pointer file to write (default: SERVING_MODEL_POINTER)
+
+    Returns:
+        The published pointer
+    """
+    pointer_file = pointer_file or active_config.SERVING_MODEL_POINTER
+    model_path = os.path.abspath(model_path)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model artifact not found: {model_path}")
+    if is_artifact(model_path):
+        # Checked once here so serving workers only check the manifest when they load it
+        verify_artifact(model_path)
+
+    pointer = {
+        'path': model_path,
+        'version': version or _default_version(model_path),
+        'published_at': datetime.utcnow().isoformat()
+    }
+
+    pointer_dir = os.path.dirname(pointer_file)
+    if pointer_dir:
+        os.makedirs(pointer_dir, exist_ok=True)
+    tmp_path = f"{pointer_file}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(pointer, f, indent=2)
+    os.replace(tmp_path, pointer_file)
+
+    logger.info(f"Published model {pointer['version']} from {model_path}")
+    return pointer
+
+
+def _default_version(model_path: str) -> str:
+    modified = datetime.utcfromtimestamp(os.path.getmtime(model_path)).strftime('%Y%m%d%H%M%S')
+    return f"{os.path.splitext(os.path.basename(model_path))[0]}@{modified}"
+
+
+class ModelServer:
+    """Keeps the published model loaded and swaps in new versions without downtime."""
+
+    def __init__(
+        self,
+        model_path: str = None,
+        pointer_file: str = None,
+        reload_interval: float = 10.0
+    ):
+        """
+        Initialize the model server.
+
+        Args:
+            model_path: Fixed model artifact, reloaded when the file changes
+            pointer_file: Pointer file written by publish_model; takes precedence
+                over model_path when it exists
+            reload_interval: Minimum seconds between checks for a new version
+        """
+        self.model_path = model_path
+        self.pointer_file = pointer_file
+        self.reload_interval = reload_interval
+        self._current: Optional[ServedModel] = None
+        self._load_lock = threading.Lock()
+        self._next_check = 0.0
+
+    def _resolve_source(self) -> Optional[Tuple[str, str, Tuple]]:
+        """Return (path, version, source identity) of the artifact that should be served."""
+        if self.pointer_file and os.path.exists(self.pointer_file):
+            try:
+                with open(self.pointer_file, 'r') as f:
+                    pointer = json.load(f)
+                path = pointer['path']
+                if not os.path.isabs(path):
+                    path = os.path.join(os.path.dirname(self.pointer_file), path)
+                version = pointer.get('version') or _default_version(path)
+                return path, version, ('pointer', path, version, os.stat(path).st_mtime_ns)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Invalid model pointer {self.pointer_file}: {str(e)}")
+
+        if self.model_path and os.path.exists(self.model_path):
+            return self.model_path, _default_version(self.model_path), (
+                'path', self.model_path, os.stat(self.model_path).st_mtime_ns
+            )
+
+        return None
+
+    def _load(self, path: str, version: str, source: Tuple) -> ServedModel:
+        start = time.perf_counter()
+        model = MycolModel.load(path)
+        duration = time.perf_counter() - start
+
+        model_load_duration_seconds.observe(duration)
+        logger.info(f"Loaded served model {version} from {path} in {duration:.3f}s")
+        return ServedModel(model=model, version=version, path=path, source=source, loaded_at=time.time())
+
+    def _swap(self, served: ServedModel) -> None:
+        self._current = served
+        model_serving_info.info({
+            'version': served.version,
+            'path': served.path or '',
+            'model_type': served.model.model_type
+        })
+        model_loaded_timestamp_seconds.set(served.loaded_at)
+
+    def refresh(self, block: bool = False) -> bool:
+        """
+        Load the configured artifact if it differs from the one being served.
+
+        Only one thread loads at a time. Unless ``block`` is set, a thread
+        that finds a load already in progress returns immediately and keeps
+        serving the current model.
+
+        Args:
+            block: Wait for a concurrent load instead of skipping
+
+        Returns:
+            True if a new model was swapped in
+        """
+        source = self._resolve_source()
+        current = self._current
+        if source is None or (current is not None and current.source == source[2]):
+            return False
+
+        if not self._load_lock.acquire(blocking=block):
+            return False
+        try:
+            current = self._current
+            if current is not None and current.source == source[2]:
+                return False  # Another thread loaded it while we waited
+
+            try:
+                served = self._load(*source)
+            except Exception as e:
+                model_reloads_total.labels(status='failed').inc()
+                logger.error(f"Failed to load model {source[1]} from {source[0]}: {str(e)}")
+                return False
+
+            self._swap(served)
+            model_reloads_total.labels(status='success').inc()
+            if current is not None:
+                logger.info(f"Swapped served model {current.version} for {served.version}")
+            return True
+        finally:
+            self._load_lock.release()
+
+    def get_served(self) -> ServedModel:
+        """
+        Return the model to serve this request with.
+
+        Returns:
+            The currently served model and its version
+            
+        Raises:
+            NoModelPublished: If no artifact is configured or published, or
+                none could be loaded yet
+        """
+        if self._current is None:
+            # Nothing to serve yet, so this request has to wait for the first load
+            self._next_check = time.monotonic() + self.reload_interval
+            self.refresh(block=True)
+        elif time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.reload_interval
+            source = self._resolve_source()
+            if source is not None and source[2] != self._current.source and not self._load_lock.locked():
+                threading.Thread(target=self.refresh, name='model-refresh', daemon=True).start()
+
+        current = self._current
+        if current is None:
+            # An unfitted model can't predict, so there is nothing to serve until one is published
+            raise NoModelPublished(
+                "No model has been published for serving; publish one with 'python main.py model publish'"
+            )
+        return current
+
+    def get_model(self) -> MycolModel:
+        """Return the currently served model."""
+        return self.get_served().model
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the served model, e.g. for health checks."""
+        current = self._current
+        if current is None:
+            return {'loaded': False, 'message': 'No model published'}
+        return {
+            'loaded': True,
+            'version': current.version,
+            'path': current.path,
+            'model_type': current.model.model_type,
+            'loaded_at': datetime.utcfromtimestamp(current.loaded_at).isoformat()
+        }
+
+
+_default_server = None
+_default_server_lock = threading.Lock()
+
+
+def get_model_server() -> ModelServer:
+    """Return this process's model server, configured from the active config."""
+    global _default_server
+    with _default_server_lock:
+        if _default_server is None:
+            _default_server = ModelServer(
+                model_path=active_config.SERVING_MODEL_PATH,
+                pointer_file=active_config.SERVING_MODEL_POINTER,
+                reload_interval=active_config.MODEL_RELOAD_INTERVAL
+            )
+        return _default_server
@@ -117,11 +117,25 @@ class BatchJob(db.Model):
     error_message = Column(Text, nullable=True)
     total_records = Column(Integer, default=0)
     processed_records = Column(Integer, default=0)
+    priority = Column(Integer, default=0, index=True)  # Higher runs first
+    cancel_requested = Column(Boolean, default=False)
+    worker_id = Column(String(100), nullable=True)
+    queued_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)  # Times a worker has claimed the job
+    heartbeat_at = Column(DateTime, nullable=True)  # Last sign of life from the processing worker
+    checkpoint_path = Column(String(255), nullable=True)  # Directory of resumable progress
+    cache_key = Column(String(64), nullable=True, index=True)  # Hash of input, parameters and model
+    last_accessed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f"<BatchJob {self.id}: {self.name}>"
+    
+    @property
+    def is_finished(self):
+        """Check if the job has reached a terminal status."""
+        return self.status in ('completed', 'failed', 'cancelled')
 
 
 class Version(db.Model):
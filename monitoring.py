@@ -31,6 +31,66 @@ active_requests = Gauge(
     'Number of active requests',
 )
 
+model_load_duration_seconds = Histogram(
+    'model_load_duration_seconds',
+    'Time taken to load a served model artifact',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+model_reloads_total = Counter(
+    'model_reloads_total',
+    'Number of served model loads',
+    ['status']
+)
+
+model_serving_info = Info(
+    'model_serving',
+    'Version and artifact of the model currently being served'
+)
+
+model_loaded_timestamp_seconds = Gauge(
+    'model_loaded_timestamp_seconds',
+    'Unix time at which the currently served model was loaded'
+)
+
+inference_batch_rows = Histogram(
+    'inference_batch_rows',
+    'Rows scored per micro-batched predict call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+)
+
+inference_batch_requests = Histogram(
+    'inference_batch_requests',
+    'Prediction requests coalesced into one micro-batched predict call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+inference_queue_wait_seconds = Histogram(
+    'inference_queue_wait_seconds',
+    'Time a prediction request waited to be batched',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+bioactivity_model_load_duration_seconds = Histogram(
+    'bioactivity_model_load_duration_seconds',
+    'Time taken to load a compound bioactivity pipeline artifact',
+    ['pipeline'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+bioactivity_model_loads_total = Counter(
+    'bioactivity_model_loads_total',
+    'Number of compound bioactivity pipeline loads',
+    ['pipeline', 'status']
+)
+
+bioactivity_prediction_duration_seconds = Histogram(
+    'bioactivity_prediction_duration_seconds',
+    'Time taken to score samples with the compound bioactivity models',
+    ['method'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
 app_info = Info(
     'mycology_pipeline_info',
     'Information about the mycology research pipeline'
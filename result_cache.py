@@ -0,0 +1,231 @@
+"""
+Content-addressed cache of batch job results.
+
+A batch submission is keyed by a hash of the input file's contents, the
+normalized processing parameters and the version of the model that will
+score it. Resubmitting the same file with the same parameters returns the
+job that already produced (or is producing) that output instead of doing the
+work again. Cached outputs live in ``RESULTS_FOLDER`` and are evicted least
+recently used first once they exceed ``RESULT_CACHE_MAX_MB``.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from flask import current_app
+
+from app import db
+from models import BatchJob
+from batch_processor import DEFAULT_PARAMETERS
+
+logger = logging.getLogger(__name__)
+
+# Bump when a code change alters batch output, to invalidate every cached result
+CACHE_FORMAT_VERSION = 4
+
+# Parameters run_batch_job reads to decide how a job runs but not what it
+# produces: output compression and row groups, shard workers, chunk size and
+# the streaming switch. Whether the job is scored in chunks at all is hashed
+# separately (see compute_cache_key)
+_EXECUTION_PARAMETERS = ('compression', 'row_group_size', 'workers', 'chunk_size', 'streaming')
+
+_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def hash_file(filepath: str) -> str:
+    """
+    Hash the contents of a file.
+
+    Args:
+        filepath: Path to the file
+
+    Returns:
+        SHA-256 hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_parameters(parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Normalize job parameters for hashing.
+
+    Defaults are filled in so an omitted parameter and its default value
+    hash the same, and unset or execution-only parameters are dropped.
+
+    Args:
+        parameters: Job parameters as submitted
+
+    Returns:
+        Normalized parameters
+    """
+    params = dict(DEFAULT_PARAMETERS)
+    params.setdefault('output_format', 'csv')
+    params.update(parameters or {})
+    return {
+        key: value for key, value in params.items()
+        if value is not None and key not in _EXECUTION_PARAMETERS
+    }
+
+
+def resolve_model_version(parameters: Dict[str, Any]) -> str:
+    """
+    Identify the model a job will be scored with.
+
+    Jobs that score with an explicit model include its key. Every other job
+    may reuse the latest registered model of its type (whose feature schema
+    is only known once the input is encoded), so those include the latest
+    key of that type: registering a new model invalidates their results.
+
+    Args:
+        parameters: Normalized job parameters
+
+    Returns:
+        Model version string
+    """
+    version = str(current_app.config.get('MODEL_VERSION', ''))
+
+    if parameters.get('model_key'):
+        return f"{version}:{parameters['model_key']}"
+
+    from model_registry import get_model_registry
+    keys = [
+        (entry.get('registered_at', ''), key)
+        for key, entry in get_model_registry().list_models().items()
+        if entry.get('model_type') == parameters.get('model_type')
+    ]
+    latest_key = max(keys)[1] if keys else 'default'
+    return f"{version}:{latest_key}"
+
+
+def compute_cache_key(input_file: str, parameters: Dict[str, Any] = None) -> Optional[str]:
+    """
+    Compute the result cache key of a batch submission.
+
+    Args:
+        input_file: Path to the input file
+        parameters: Job parameters as submitted
+
+    Returns:
+        Hex digest identifying the job's output, or None if the job must not
+        be served from the cache (e.g. it asks for the model to be retrained)
+    """
+    params = normalize_parameters(parameters)
+    if params.get('retrain'):
+        return None
+
+    # Chunked (streaming or sharded) runs fit a new model on the first
+    # training_rows rows, in-memory runs on the whole file
+    from job_queue import _use_streaming, _shard_workers
+    chunked = _shard_workers(parameters or {}) > 1 or _use_streaming(input_file, parameters or {})
+
+    payload = json.dumps({
+        'format': CACHE_FORMAT_VERSION,
+        'input': hash_file(input_file),
+        'parameters': params,
+        'chunked': chunked,
+        'model': resolve_model_version(params)
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def find_cached_job(cache_key: str) -> Optional[BatchJob]:
+    """
+    Find a job that has produced, or is producing, the output for a cache key.
+
+    Completed jobs whose output file still exists are preferred; otherwise a
+    queued or processing job with the same key is returned so identical
+    submissions share one run.
+
+    Args:
+        cache_key: Result cache key
+
+    Returns:
+        The matching BatchJob, or None on a cache miss
+    """
+    completed = BatchJob.query.filter_by(cache_key=cache_key, status='completed').order_by(
+        BatchJob.end_time.desc()
+    ).all()
+    for job in completed:
+        if job.output_file and os.path.exists(job.output_file):
+            touch_cached_job(job)
+            return job
+
+    return BatchJob.query.filter(
+        BatchJob.cache_key == cache_key,
+        BatchJob.status.in_(('queued', 'processing')),
+        BatchJob.cancel_requested.is_(False)
+    ).order_by(BatchJob.id.asc()).first()
+
+
+def touch_cached_job(job: BatchJob) -> None:
+    """Mark a job's output as recently used so eviction keeps it longer."""
+    job.last_accessed_at = datetime.utcnow()
+    db.session.commit()
+
+
+def enforce_result_retention(max_bytes: int = None, keep_job_id: int = None) -> int:
+    """
+    Evict completed job outputs until they fit within the size budget.
+
+    Only output files of completed batch jobs inside ``RESULTS_FOLDER`` are
+    counted and deleted; other files in the folder are left alone. The least
+    recently used outputs go first. Evicted jobs keep their record but lose
+    their output file and cache key.
+
+    Args:
+        max_bytes: Size budget in bytes (default: RESULT_CACHE_MAX_MB)
+        keep_job_id: Job whose output is never evicted, e.g. the one just completed
+
+    Returns:
+        Number of bytes freed
+    """
+    if max_bytes is None:
+        max_bytes = current_app.config['RESULT_CACHE_MAX_MB'] * 1024 * 1024
+
+    results_folder = os.path.realpath(current_app.config['RESULTS_FOLDER'])
+    jobs = BatchJob.query.filter(
+        BatchJob.status == 'completed',
+        BatchJob.output_file.isnot(None)
+    ).all()
+
+    entries = []
+    for job in jobs:
+        if job.id == keep_job_id:
+            continue
+        path = os.path.realpath(job.output_file)
+        if os.path.dirname(path) != results_folder or not os.path.exists(path):
+            continue
+        last_used = job.last_accessed_at or job.end_time or job.created_at or datetime.min
+        entries.append((last_used, job.id, job, path, os.path.getsize(path)))
+
+    total_bytes = sum(entry[4] for entry in entries)
+    kept_job = BatchJob.query.get(keep_job_id) if keep_job_id else None
+    if kept_job is not None and kept_job.output_file and os.path.exists(kept_job.output_file):
+        total_bytes += os.path.getsize(kept_job.output_file)
+    freed_bytes = 0
+
+    for _, _, job, path, size in sorted(entries, key=lambda entry: (entry[0], entry[1])):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not evict results of batch job {job.id}: {str(e)}")
+            continue
+        job.output_file = None
+        job.cache_key = None
+        total_bytes -= size
+        freed_bytes += size
+        logger.info(f"Evicted cached results of batch job {job.id} ({size} bytes)")
+
+    if freed_bytes:
+        db.session.commit()
+    return freed_bytes
@@ -0,0 +1,81 @@
+"""
+In-place upgrades of existing databases to the current models.
+
+``db.create_all()`` creates missing tables but never alters a table that
+already exists, so columns added to a model after a database was created
+are missing from it. ``upgrade_schema`` adds them with ``ALTER TABLE ...
+ADD COLUMN``, backfilling existing rows with the column default. It only
+adds what is missing, so ``create_app`` runs it on every startup.
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Columns added to existing tables: (name, DDL type and default)
+ADDED_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    'batch_jobs': [
+        # Job queue and worker pool
+        ('priority', 'INTEGER DEFAULT 0'),
+        ('cancel_requested', 'BOOLEAN DEFAULT FALSE'),
+        ('worker_id', 'VARCHAR(100)'),
+        ('queued_at', 'DATETIME'),
+        ('attempts', 'INTEGER DEFAULT 0'),
+        # Result reuse
+        ('cache_key', 'VARCHAR(64)'),
+        ('last_accessed_at', 'DATETIME'),
+        # Checkpointing and stale job recovery
+        ('heartbeat_at', 'DATETIME'),
+        ('checkpoint_path', 'VARCHAR(255)'),
+    ]
+}
+
+# Indexes on added columns: (table, index name, column)
+ADDED_INDEXES = [
+    ('batch_jobs', 'ix_batch_jobs_priority', 'priority'),
+    ('batch_jobs', 'ix_batch_jobs_cache_key', 'cache_key'),
+]
+
+
+def upgrade_schema(engine: Engine) -> List[str]:
+    """
+    Add columns and indexes missing from existing tables.
+
+    Tables that don't exist yet are left to ``db.create_all()``.
+
+    Args:
+        engine: Engine of the database to upgrade
+
+    Returns:
+        The columns added, as 'table.column'
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    added = []
+
+    with engine.begin() as connection:
+        for table, columns in ADDED_COLUMNS.items():
+            if table not in tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table)}
+            for name, definition in columns:
+                if name in existing:
+                    continue
+                ddl = definition
+                if engine.dialect.name == 'postgresql':
+                    ddl = ddl.replace('DATETIME', 'TIMESTAMP')
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                added.append(f"{table}.{name}")
+
+        for table, index, column in ADDED_INDEXES:
+            if table in tables:
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})"))
+
+    if added:
+        logger.info(f"Upgraded database schema; added columns: {', '.join(added)}")
+    return added
+
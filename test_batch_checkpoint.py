@@ -0,0 +1,71 @@
+"""
+Tests for resuming checkpointed streaming batch jobs.
+"""
+
+import pandas as pd
+import pytest
+
+from batch_processor import process_batch_streaming
+from benchmark import generate_bioactivity_frame
+from model_registry import configure_model_registry
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    """Input whose records don't map onto lines: quoted newlines and blank lines."""
+    df = generate_bioactivity_frame(1000, 1)
+    df['Note'] = 'plain'
+    df.loc[::7, 'Note'] = 'multi\nline "quoted"'
+    path = tmp_path / 'samples.csv'
+    df.to_csv(path, index=False)
+
+    lines = path.read_text().split('\n')
+    lines.insert(300, '')
+    lines.insert(600, '')
+    path.write_text('\n'.join(lines))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path):
+    return configure_model_registry(str(tmp_path / 'model_registry'))
+
+
+def _without_timestamps(df):
+    return df.drop(columns=[column for column in df.columns if 'time' in column.lower()])
+
+
+def test_resumed_run_matches_uninterrupted_run(input_file, tmp_path):
+    parameters = {'training_rows': 1000}
+    uninterrupted_file = str(tmp_path / 'uninterrupted.csv')
+    resumed_file = str(tmp_path / 'resumed.csv')
+    checkpoint_dir = str(tmp_path / 'checkpoint')
+
+    process_batch_streaming(input_file, uninterrupted_file, parameters=parameters, chunk_size=100)
+
+    def interrupt_after_four_chunks(processed_records, total_records):
+        if processed_records >= 400:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        process_batch_streaming(
+            input_file, resumed_file, parameters=parameters, chunk_size=100,
+            checkpoint_dir=checkpoint_dir, progress_callback=interrupt_after_four_chunks
+        )
+
+    progress = []
+    process_batch_streaming(
+        input_file, resumed_file, parameters=parameters, chunk_size=100,
+        checkpoint_dir=checkpoint_dir, progress_callback=lambda processed, total: progress.append(processed)
+    )
+
+    uninterrupted = pd.read_csv(uninterrupted_file)
+    resumed = pd.read_csv(resumed_file)
+    assert len(uninterrupted) == len(pd.read_csv(input_file).dropna())
+    # Picks up after the fourth chunk and only scores the remaining six
+    assert progress == [400, 500, 600, 700, 800, 900, 1000]
+    pd.testing.assert_frame_equal(_without_timestamps(resumed), _without_timestamps(uninterrupted))
@@ -0,0 +1,137 @@
+"""
+Tests for claiming, recovering and cancelling queued batch jobs.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from app import db
+from models import BatchJob
+from job_queue import enqueue_batch_job, claim_next_job, recover_stale_jobs, cancel_batch_job
+
+
+def _processing_job(name: str, heartbeat_age: float, attempts: int = 1, cancel_requested: bool = False) -> BatchJob:
+    """Add a job claimed by a worker that last sent a heartbeat heartbeat_age seconds ago."""
+    heartbeat = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    job = BatchJob(
+        name=name,
+        input_file='input.csv',
+        parameters={},
+        status='processing',
+        priority=0,
+        worker_id='worker-1',
+        start_time=heartbeat,
+        heartbeat_at=heartbeat,
+        attempts=attempts,
+        cancel_requested=cancel_requested
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_one_claimer_wins(app):
+    job = enqueue_batch_job('only job', 'input.csv')
+    barrier = threading.Barrier(8)
+    claims = []
+
+    def claim(worker_id):
+        with app.app_context():
+            barrier.wait()
+            claimed = claim_next_job(worker_id)
+            if claimed is not None:
+                claims.append((worker_id, claimed.id))
+            db.session.remove()
+
+    threads = [threading.Thread(target=claim, args=(f"worker-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claims) == 1
+    worker_id, job_id = claims[0]
+    db.session.expire_all()
+    job = BatchJob.query.get(job_id)
+    assert job.status == 'processing'
+    assert job.worker_id == worker_id
+    assert job.attempts == 1
+
+
+def test_claim_respects_max_concurrent(app):
+    for i in range(5):
+        enqueue_batch_job(f"job {i}", 'input.csv')
+
+    first = claim_next_job('worker-1', max_concurrent=2)
+    second = claim_next_job('worker-2', max_concurrent=2)
+    assert first is not None and second is not None
+    assert claim_next_job('worker-3', max_concurrent=2) is None
+
+    first.status = 'completed'
+    db.session.commit()
+    assert claim_next_job('worker-3', max_concurrent=2) is not None
+    assert BatchJob.query.filter_by(status='processing').count() == 2
+
+
+def test_claim_follows_priority_then_submission_order(app):
+    low = enqueue_batch_job('low', 'input.csv', priority=0)
+    high = enqueue_batch_job('high', 'input.csv', priority=5)
+    medium_first = enqueue_batch_job('medium first', 'input.csv', priority=1)
+    medium_second = enqueue_batch_job('medium second', 'input.csv', priority=1)
+
+    order = [claim_next_job('worker-1').id for _ in range(4)]
+
+    assert order == [high.id, medium_first.id, medium_second.id, low.id]
+    assert claim_next_job('worker-1') is None
+
+
+def test_stale_jobs_are_requeued(app):
+    stale = _processing_job('stale', heartbeat_age=600)
+    alive = _processing_job('alive', heartbeat_age=5)
+
+    assert recover_stale_jobs(stale_after=120, max_attempts=3) == 1
+
+    db.session.expire_all()
+    assert BatchJob.query.get(stale.id).status == 'queued'
+    assert BatchJob.query.get(stale.id).worker_id is None
+    assert BatchJob.query.get(alive.id).status == 'processing'
+
+    reclaimed = claim_next_job('worker-2')
+    assert reclaimed.id == stale.id
+    assert reclaimed.attempts == 2
+
+
+def test_stale_jobs_out_of_attempts_or_cancelled_are_not_requeued(app):
+    exhausted = _processing_job('exhausted', heartbeat_age=600, attempts=3)
+    cancelled = _processing_job('cancelled', heartbeat_age=600, cancel_requested=True)
+
+    assert recover_stale_jobs(stale_after=120, max_attempts=3) == 2
+
+    db.session.expire_all()
+    assert BatchJob.query.get(exhausted.id).status == 'failed'
+    assert BatchJob.query.get(cancelled.id).status == 'cancelled'
+    assert claim_next_job('worker-2') is None
+
+
+def test_cancel_queued_job(app):
+    job = enqueue_batch_job('to cancel', 'input.csv')
+
+    cancelled = cancel_batch_job(job.id)
+
+    assert cancelled.status == 'cancelled'
+    assert cancelled.end_time is not None
+    assert claim_next_job('worker-1') is None
+
+
+def test_cancel_processing_job_flags_it(app):
+    enqueue_batch_job('running', 'input.csv')
+    job = claim_next_job('worker-1')
+
+    cancelled = cancel_batch_job(job.id)
+
+    assert cancelled.status == 'processing'
+    assert cancelled.cancel_requested is True
+
+
+def test_cancel_unknown_job(app):
+    assert cancel_batch_job(12345) is None
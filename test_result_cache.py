@@ -0,0 +1,119 @@
+"""
+Tests for reusing batch job results through the content-addressed cache.
+"""
+
+import pytest
+
+from app import db
+from job_queue import submit_batch_job, cancel_batch_job
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / 'samples.csv'
+    path.write_text('substrate,temperature,yield\nstraw,22,1.5\noak,24,2.1\n')
+    return str(path)
+
+
+def _complete(job, output_file):
+    """Mark a job as having produced output_file."""
+    with open(output_file, 'w') as f:
+        f.write('result\n')
+    job.status = 'completed'
+    job.output_file = output_file
+    db.session.commit()
+
+
+def test_first_submission_is_a_miss(app, input_file):
+    job, cached = submit_batch_job('first', input_file, {'model_type': 'regressor'})
+
+    assert cached is False
+    assert job.status == 'queued'
+    assert job.cache_key
+
+
+def test_identical_submission_in_flight_shares_the_job(app, input_file):
+    first, _ = submit_batch_job('first', input_file, {'model_type': 'regressor'})
+    second, cached = submit_batch_job('second', input_file, {'model_type': 'regressor'})
+
+    assert cached is True
+    assert second.id == first.id
+    assert second.status == 'queued'
+
+
+def test_identical_submission_after_completion_is_a_hit(app, input_file, tmp_path):
+    first, _ = submit_batch_job('first', input_file)
+    _complete(first, str(tmp_path / 'results' / 'first.csv'))
+
+    second, cached = submit_batch_job('second', input_file)
+
+    assert cached is True
+    assert second.id == first.id
+    assert second.status == 'completed'
+    assert second.last_accessed_at is not None
+
+
+def test_completed_job_without_output_is_a_miss(app, input_file, tmp_path):
+    first, _ = submit_batch_job('first', input_file)
+    _complete(first, str(tmp_path / 'results' / 'first.csv'))
+    (tmp_path / 'results' / 'first.csv').unlink()
+
+    second, cached = submit_batch_job('second', input_file)
+
+    assert cached is False
+    assert second.id != first.id
+
+
+def test_cancelled_job_is_not_reused(app, input_file):
+    first, _ = submit_batch_job('first', input_file)
+    cancel_batch_job(first.id)
+
+    second, cached = submit_batch_job('second', input_file)
+
+    assert cached is False
+    assert second.id != first.id
+
+
+def test_different_parameters_or_input_are_a_miss(app, input_file, tmp_path):
+    first, _ = submit_batch_job('first', input_file, {'drop_na': True})
+
+    other_params, cached_params = submit_batch_job('second', input_file, {'drop_na': False})
+    other_input_file = tmp_path / 'other.csv'
+    other_input_file.write_text('substrate,temperature,yield\nstraw,22,1.6\n')
+    other_input, cached_input = submit_batch_job('third', str(other_input_file), {'drop_na': True})
+
+    assert not cached_params and not cached_input
+    assert len({first.id, other_params.id, other_input.id}) == 3
+
+
+def test_defaults_and_execution_options_share_the_job(app, input_file):
+    first, _ = submit_batch_job('first', input_file, {})
+
+    for parameters in (
+        {'drop_na': True},
+        {'workers': 1},
+        {'chunk_size': 500},
+        {'compression': 'gzip', 'row_group_size': 1000},
+    ):
+        job, cached = submit_batch_job('again', input_file, parameters)
+        assert cached is True, parameters
+        assert job.id == first.id
+
+
+def test_retrain_is_never_cached(app, input_file):
+    first, _ = submit_batch_job('first', input_file, {'retrain': True})
+    second, cached = submit_batch_job('second', input_file, {'retrain': True})
+
+    assert cached is False
+    assert first.cache_key is None
+    assert second.id != first.id
+
+
+def test_cache_disabled(app, input_file):
+    app.config['RESULT_CACHE_ENABLED'] = False
+
+    first, _ = submit_batch_job('first', input_file)
+    second, cached = submit_batch_job('second', input_file)
+
+    assert cached is False
+    assert second.id != first.id
@@ -0,0 +1,183 @@
+"""
+Incremental training of MycolModel from CSV files.
+
+Two ways to extend a model with new data instead of refitting it on the
+whole, growing training set:
+
+- warm start: a random forest loaded with its estimator keeps its trees and
+  grows new ones fitted on the new file only;
+- out of core: engines with ``partial_fit`` ('sgd') stream a file in chunks,
+  so the training data never has to fit in memory.
+
+Every run is recorded in the model's training history together with a hash
+of the file, so a file the model has already been trained on is detected.
+"""
+
+import hashlib
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model import MycolModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRAINING_CHUNK_SIZE = 100000
+
+_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def hash_file(filepath: str) -> str:
+    """
+    Hash the contents of a training file.
+
+    Args:
+        filepath: Path to the file
+
+    Returns:
+        SHA-256 hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_feature_columns(
+    df: pd.DataFrame,
+    target_column: str,
+    feature_columns: Optional[List[str]] = None
+) -> List[str]:
+    """
+    Determine the feature columns of training data.
+
+    Args:
+        df: Training data, or its first chunk
+        target_column: Name of the target column
+        feature_columns: Requested feature columns (default: all numeric
+            columns except the target)
+
+    Returns:
+        Feature columns present in the data
+    """
+    if target_column not in df.columns:
+        raise ValueError(f"Target column '{target_column}' not found in input file")
+
+    if feature_columns:
+        missing_cols = [col for col in feature_columns if col not in df.columns]
+        if missing_cols:
+            logger.warning(f"Missing feature columns: {missing_cols}")
+        return [col for col in feature_columns if col in df.columns]
+
+    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+    return [col for col in numeric_cols if col != target_column]
+
+
+def iter_training_chunks(
+    input_file: str,
+    target_column: str,
+    feature_columns: List[str],
+    chunk_size: int = DEFAULT_TRAINING_CHUNK_SIZE
+) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+    """
+    Stream (features, target) chunks of a training CSV.
+
+    Rows with a missing target or feature are skipped, since linear engines
+    cannot train on them.
+
+    Args:
+        input_file: Path to the training CSV
+        target_column: Name of the target column
+        feature_columns: Feature columns
+        chunk_size: Rows per chunk
+
+    Yields:
+        Tuples of (features, target)
+    """
+    columns = list(feature_columns) + [target_column]
+    for chunk in pd.read_csv(input_file, usecols=columns, chunksize=chunk_size):
+        complete = chunk.dropna()
+        if len(complete) < len(chunk):
+            logger.warning(f"Skipping {len(chunk) - len(complete)} training rows with missing values")
+        if len(complete):
+            yield complete[feature_columns], complete[target_column]
+
+
+def train_warm_start(
+    model: MycolModel,
+    input_file: str,
+    target_column: str,
+    add_estimators: int = 50
+) -> int:
+    """
+    Add trees fitted on a new training file to a random forest model.
+
+    Args:
+        model: Fitted random forest model, loaded with ``trainable=True``
+        input_file: Path to the new training CSV
+        target_column: Name of the target column
+        add_estimators: Number of trees to add
+
+    Returns:
+        Number of training rows used
+    """
+    df = pd.read_csv(input_file, usecols=list(model.feature_names) + [target_column])
+    model.warm_start_fit(df[model.feature_names], df[target_column], add_estimators=add_estimators)
+    logger.info(f"Added {add_estimators} trees fitted on {len(df)} rows of {input_file}")
+    return len(df)
+
+
+def train_out_of_core(
+    model: MycolModel,
+    input_file: str,
+    target_column: str,
+    feature_columns: Optional[List[str]] = None,
+    chunk_size: int = DEFAULT_TRAINING_CHUNK_SIZE
+) -> int:
+    """
+    Train a partial_fit model on a CSV file chunk by chunk.
+
+    A new model makes two passes over the file: the first fits the scaler
+    (and collects the classes of a classifier), the second trains the
+    estimator. A model that has been trained before keeps its scaler and
+    classes and makes a single pass.
+
+    Args:
+        model: Model with a partial_fit engine, new or previously trained
+        input_file: Path to the training CSV
+        target_column: Name of the target column
+        feature_columns: Feature columns for a new model (default: all numeric
+            columns except the target); a trained model uses its own
+        chunk_size: Rows per chunk
+
+    Returns:
+        Number of training rows used
+    """
+    classes = None
+    if model.feature_names:
+        feature_columns = list(model.feature_names)
+        if model.model_type == 'classifier':
+            classes = model.model.classes_
+    else:
+        header = pd.read_csv(input_file, nrows=1000)
+        feature_columns = resolve_feature_columns(header, target_column, feature_columns)
+        model.feature_names = feature_columns
+
+        labels = set()
+        for X, y in iter_training_chunks(input_file, target_column, feature_columns, chunk_size):
+            model.scaler.partial_fit(X)
+            if model.model_type == 'classifier':
+                labels.update(y.unique())
+        if model.model_type == 'classifier':
+            classes = np.array(sorted(labels))
+
+    rows = 0
+    for X, y in iter_training_chunks(input_file, target_column, feature_columns, chunk_size):
+        model.partial_fit(X, y, classes=classes)
+        rows += len(X)
+
+    logger.info(f"Trained on {rows} rows of {input_file} in chunks of {chunk_size}")
+    return rows
@@ -0,0 +1,202 @@
+"""
+Cross-validated hyperparameter search for MycolModel.
+
+Candidates are compared with successive halving: every configuration is
+first cross-validated on a small sample of the training data, and only the
+best fraction (1 / ``factor``) moves on to the next round with ``factor``
+times more data, so poor configurations are dropped after cheap fits. Fits
+run in a process pool over all cores. Scaling happens inside a pipeline
+whose fitted scaler is cached on disk with ``joblib.Memory``, so candidates
+evaluated on the same fold reuse one scaled matrix instead of refitting it.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Memory
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, KFold, StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from model import MycolModel
+
+logger = logging.getLogger(__name__)
+
+# Search spaces per engine; keys are MycolModel estimator_params
+DEFAULT_PARAM_GRIDS = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [6, 10, 16, None],
+        'min_samples_leaf': [1, 3, 10],
+        'max_features': ['sqrt', 1.0]
+    },
+    'sgd': {
+        'alpha': [1e-5, 1e-4, 1e-3, 1e-2],
+        'penalty': ['l2', 'l1', 'elasticnet']
+    },
+    'hist_gradient_boosting': {
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_iter': [100, 200, 400],
+        'max_leaf_nodes': [15, 31, 63],
+        'l2_regularization': [0.0, 1.0]
+    }
+}
+
+DEFAULT_SCORING = {'regressor': 'r2', 'classifier': 'accuracy'}
+
+
+def _pipeline(model: MycolModel, memory: Memory) -> Pipeline:
+    estimator = model._create_estimator()
+    if 'n_jobs' in estimator.get_params():
+        # Parallelism comes from the search; nested pools would oversubscribe the cores
+        estimator.set_params(n_jobs=1)
+    return Pipeline([('scaler', model.scaler), ('estimator', estimator)], memory=memory)
+
+
+def _leaderboard(search: HalvingGridSearchCV) -> pd.DataFrame:
+    """Summarize every evaluated candidate, best first."""
+    results = pd.DataFrame(search.cv_results_)
+    leaderboard = pd.DataFrame({
+        'round': results['iter'],
+        'training_rows': results['n_resources'],
+        'mean_score': results['mean_test_score'],
+        'std_score': results['std_test_score'],
+        'mean_fit_seconds': results['mean_fit_time'],
+        'params': [
+            json.dumps({key.split('__', 1)[1]: value for key, value in params.items()}, default=str)
+            for params in results['params']
+        ]
+    })
+    # Candidates that survived more rounds rank above those dropped early
+    return leaderboard.sort_values(
+        ['round', 'mean_score'], ascending=[False, False], na_position='last'
+    ).reset_index(drop=True)
+
+
+def tune_model(
+    X: pd.DataFrame,
+    y,
+    model_type: str = 'regressor',
+    engine: str = 'random_forest',
+    param_grid: Dict[str, List[Any]] = None,
+    cv: int = 5,
+    factor: int = 3,
+    scoring: str = None,
+    n_jobs: int = -1,
+    cache_dir: str = None,
+    random_state: int = 42
+) -> Dict[str, Any]:
+    """
+    Search hyperparameters with cross-validated successive halving.
+
+    Args:
+        X: Training features
+        y: Training target
+        model_type: Type of model ('regressor' or 'classifier')
+        engine: Estimator family (see MycolModel)
+        param_grid: Candidate values per estimator parameter
+            (default: DEFAULT_PARAM_GRIDS[engine])
+        cv: Number of cross-validation folds
+        factor: Fraction of candidates kept (1 / factor) and growth of the
+            training sample per round
+        scoring: sklearn scoring name (default: r2 or accuracy)
+        n_jobs: Worker processes (-1 for all cores)
+        cache_dir: Directory for the scaled-matrix cache (default: a
+            temporary directory removed afterwards)
+        random_state: Seed for the folds and the per-round samples
+
+    Returns:
+        Dictionary with the refitted best ``model``, its ``best_params`` and
+        ``best_score``, the ``leaderboard`` DataFrame and ``elapsed_seconds``
+    """
+    param_grid = param_grid or DEFAULT_PARAM_GRIDS[engine]
+    scoring = scoring or DEFAULT_SCORING[model_type]
+
+    if model_type == 'classifier':
+        folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    else:
+        folds = KFold(n_splits=cv, shuffle=True, random_state=random_state)
+
+    owns_cache = cache_dir is None
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix='tune_cache_')
+    memory = Memory(location=cache_dir, verbose=0)
+
+    template = MycolModel(model_type=model_type, engine=engine)
+    search = HalvingGridSearchCV(
+        _pipeline(template, memory),
+        {f"estimator__{name}": values for name, values in param_grid.items()},
+        factor=factor,
+        cv=folds,
+        scoring=scoring,
+        n_jobs=n_jobs,
+        refit=True,
+        random_state=random_state
+    )
+
+    n_candidates = int(np.prod([len(values) for values in param_grid.values()]))
+    logger.info(f"Tuning {engine} {model_type} over {n_candidates} candidates with {cv}-fold CV "
+                f"on {len(X)} rows (n_jobs={n_jobs})")
+
+    start = time.perf_counter()
+    try:
+        search.fit(X, y)
+    finally:
+        if owns_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+
+    best_params = {key.split('__', 1)[1]: value for key, value in search.best_params_.items()}
+    best = search.best_estimator_
+
+    model = MycolModel(model_type=model_type, engine=engine, estimator_params=best_params)
+    model.feature_names = list(X.columns)
+    model.scaler = best.named_steps['scaler']
+    model.model = best.named_steps['estimator']
+    if 'n_jobs' in model.model.get_params():
+        model.model.set_params(n_jobs=None)
+    if model_type == 'regressor' and model._forest_predictor() is None:
+        model._record_residual_spread(np.asarray(y, dtype=np.float64) - model.model.predict(model.scaler.transform(X)))
+
+    logger.info(f"Best {scoring} {search.best_score_:.4f} with {best_params} after {elapsed:.1f}s")
+    return {
+        'model': model,
+        'best_params': best_params,
+        'best_score': float(search.best_score_),
+        'scoring': scoring,
+        'leaderboard': _leaderboard(search),
+        'elapsed_seconds': elapsed
+    }
+
+
+def write_leaderboard(results: Dict[str, Any], output_file: str) -> None:
+    """
+    Write the tuning leaderboard as CSV, or as a JSON report for a .json path.
+
+    Args:
+        results: Return value of tune_model
+        output_file: Path of the report
+    """
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    leaderboard = results['leaderboard']
+    if output_file.endswith('.json'):
+        report = {
+            'scoring': results['scoring'],
+            'best_score': results['best_score'],
+            'best_params': results['best_params'],
+            'elapsed_seconds': round(results['elapsed_seconds'], 3),
+            'candidates': json.loads(leaderboard.to_json(orient='records'))
+        }
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+    else:
+        leaderboard.to_csv(output_file, index=False)
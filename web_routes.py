@@ -8,8 +8,10 @@ from werkzeug.utils import secure_filename
 from app import db
 from models import Sample, Compound, Analysis, BatchJob, Version, ResearchLog, LiteratureReference
 from literature import initialize_entrez, fetch_pubmed_articles, fetch_species_literature, update_sample_literature
-from model import load_model
-from batch_processor import process_batch
+from model_serving import get_model_server
+from micro_batching import get_micro_batcher
+from job_queue import submit_batch_job, cancel_batch_job
+from result_cache import touch_cached_job
 from enhanced_identification import identify_dried_specimen
 from parameter_generator import SmartParameterGenerator, generate_smart_parameters
 from enhanced_vision_validator import EnhancedVisionValidator, validate_uploaded_specimen_image
@@ -165,8 +167,8 @@ def new_analysis():
             
             # Perform the analysis
             # In a production app, this would be a background job
-            # For simplicity, we'll do it inline here
-            model = load_model()
+            # For simplicity, we'll do it inline here with the served model
+            model = get_model_server().get_model()
             
             # Prepare data for the model
             features = {
@@ -175,7 +177,7 @@ def new_analysis():
             }
             
             # Get predictions
-            results = model.predict(features)
+            results = get_micro_batcher().predict(model, features).to_dict()
             
             # Update the analysis with results
             analysis.status = 'completed'
@@ -302,49 +304,20 @@ def new_batch_job():
                 else:
                     parameters_dict = {}
                 
-                # Create a new batch job
-                batch_job = BatchJob(
+                # Queue the job unless an identical one exists; a worker process picks it up
+                batch_job, cached = submit_batch_job(
                     name=name or f'Batch Job {datetime.utcnow().isoformat()}',
                     description=description,
                     input_file=file_path,
                     parameters=parameters_dict,
-                    status='queued'
+                    priority=request.form.get('priority', 0, type=int)
                 )
-                db.session.add(batch_job)
-                db.session.commit()
-                
-                # Start processing (for simplicity we'll do it inline)
-                batch_job.status = 'processing'
-                batch_job.start_time = datetime.utcnow()
-                db.session.commit()
-                
-                # Process the batch
-                try:
-                    result = process_batch(file_path, batch_job.id, parameters_dict)
-                    output_file = os.path.join(
-                        current_app.config['RESULTS_FOLDER'],
-                        f"batch_{batch_job.id}_results.csv"
-                    )
-                    
-                    # Save the results to a file
-                    result.to_csv(output_file, index=False)
-                    
-                    # Update the batch job record
-                    batch_job.status = 'completed'
-                    batch_job.end_time = datetime.utcnow()
-                    batch_job.output_file = output_file
-                    batch_job.total_records = len(result)
-                    batch_job.processed_records = len(result)
-                    db.session.commit()
-                    
-                    flash('Batch job processed successfully', 'success')
-                    
-                except Exception as e:
-                    batch_job.status = 'failed'
-                    batch_job.end_time = datetime.utcnow()
-                    batch_job.error_message = str(e)
-                    db.session.commit()
-                    flash(f'Error processing batch job: {str(e)}', 'error')
+                if cached and batch_job.status == 'completed':
+                    flash('An identical batch job already exists; showing its results', 'info')
+                elif cached:
+                    flash(f'An identical batch job is already {batch_job.status}; showing its progress', 'info')
+                else:
+                    flash('Batch job queued for processing', 'success')
                 
                 return redirect(url_for('web.view_batch_job', job_id=batch_job.id))
                 
@@ -364,6 +337,23 @@ def view_batch_job(job_id):
     return render_template('batch_details.html', job=job)
 
 
+@web_bp.route('/batch/<int:job_id>/cancel', methods=['POST'])
+def cancel_batch(job_id):
+    """Cancel a queued or running batch job."""
+    job = BatchJob.query.get_or_404(job_id)
+    
+    if job.is_finished:
+        flash(f'Batch job already {job.status}', 'error')
+    else:
+        job = cancel_batch_job(job_id)
+        if job.status == 'cancelled':
+            flash('Batch job cancelled', 'success')
+        else:
+            flash('Cancellation requested; the job will stop shortly', 'info')
+    
+    return redirect(url_for('web.view_batch_job', job_id=job_id))
+
+
 @web_bp.route('/batch/<int:job_id>/download')
 def download_batch_results(job_id):
     """Download the results of a batch job."""
@@ -373,6 +363,7 @@ def download_batch_results(job_id):
         flash('Results not available for download', 'error')
         return redirect(url_for('web.view_batch_job', job_id=job_id))
     
+    touch_cached_job(job)
     return send_file(job.output_file, as_attachment=True)
 
 
@@ -1005,7 +996,8 @@ def process_image():
                 analyze_species=analyze_species,
                 analyze_morphology=analyze_morphology,
                 analyze_color=analyze_color,
-                analyze_growth=analyze_growth
+                analyze_growth=analyze_growth,
+                sample_id=request.form.get('sample_id')
             )
             
             # Combine all analysis results
@@ -1030,7 +1022,8 @@ def process_image():
                 analyze_species=analyze_species,
                 analyze_morphology=analyze_morphology,
                 analyze_color=analyze_color,
-                analyze_growth=analyze_growth
+                analyze_growth=analyze_growth,
+                sample_id=request.form.get('sample_id')
             )
             
             results = cv_results.copy()